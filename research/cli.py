@@ -17,10 +17,13 @@ import subprocess
 import sys
 from pathlib import Path
 
+from research.common import profiling
 from research.common.corpus import load_case
 from research.common.provenance import build_system
+from research.q1_milp.cache import solve_cached
+from research.q1_milp.decompose import solve_decomposed
 from research.q1_milp.enumerate_optima import enumerate_optimal_supports
-from research.q1_milp.lexicographic import solve_lexicographic
+from research.q1_milp.lexicographic import DEFAULT_M
 from research.q1_milp.solvers import validate_solution
 from research.q2_diagnostics.rank_nullity import analyze
 from research.q3_layout.interchange import build_graph_json
@@ -53,11 +56,20 @@ def summarize(result, check):
         print(f'   ! idle machines (could not run): {names}')
     if result.leak_detected or not result.count_certified:
         print('   ! numerical caveat: gate count not fully certified')
+    if result.support_inherited:
+        print('   ! gate placement carried over from other pin values, '
+              'not re-minimized')
 
 
 def choose_alternative(supports, current):
     """One prompt, <= 10 options (user UX rule). Returns a support or None."""
-    print(f'\n{len(supports)} equally-optimal gate placements exist:')
+    n_gates = len(supports[0]['sources']) + len(supports[0]['sinks'])
+    if n_gates < len(current[0]) + len(current[1]):
+        # Only after an uncertified solve: its stage 1 settled for more gates.
+        print(f'\n{len(supports)} gate placements with only {n_gates} gates '
+              f'exist:')
+    else:
+        print(f'\n{len(supports)} equally-optimal gate placements exist:')
     for i, s in enumerate(supports):
         parts = []
         if s['sources']:
@@ -79,8 +91,10 @@ def main(argv=None):
     parser.add_argument('--engine', choices=ENGINES, default='elk')
     parser.add_argument('--style', choices=['layered', 'orthogonal'],
                         default='orthogonal')
-    parser.add_argument('--backend', choices=['highs', 'cbc', 'scip'],
-                        default='highs')
+    parser.add_argument('--backend', choices=['highs', 'cbc', 'scip', 'race'],
+                        default='highs',
+                        help='race: all three at once, first validated '
+                             'optimum per stage wins')
     parser.add_argument('--lead', metavar='NAME',
                         help='primary input to pin at the top (e.g. PMP)')
     parser.add_argument('--auto-subgraphs', action='store_true',
@@ -95,11 +109,36 @@ def main(argv=None):
                         help='render theme (default: dark)')
     parser.add_argument('--out', metavar='DIR', default='flow_out',
                         help='output directory (default: ./flow_out)')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='always re-solve; skip the on-disk result cache')
+    parser.add_argument('--profile', action='store_true',
+                        help='time every pipeline step; print a summary and '
+                             'write <stem>.profile.json + <stem>.trace.json '
+                             '(chrome://tracing) to --out')
     args = parser.parse_args(argv)
 
     if args.style not in ENGINES[args.engine][1]:
         parser.error(f'{args.engine} does not support --style {args.style}')
 
+    if not args.profile:
+        return run(args)
+    collector = profiling.enable()
+    try:
+        with profiling.span('cli'):
+            return run(args)
+    finally:
+        profiling.disable()
+        out_dir = Path(args.out)
+        out_dir.mkdir(parents=True, exist_ok=True)
+        stem = Path(args.chart).stem
+        collector.write_json(out_dir / f'{stem}.profile.json')
+        collector.write_chrome_trace(out_dir / f'{stem}.trace.json')
+        print(f'\n== profile\n{collector.summary()}')
+        print(f'wrote {out_dir / (stem + ".profile.json")} and '
+              f'{out_dir / (stem + ".trace.json")}')
+
+
+def run(args):
     case = load_case(args.chart)
     pins = [(p.edge, p.value) for p in case.pins]
     if not pins:
@@ -107,10 +146,11 @@ def main(argv=None):
               'the all-zero solution is optimal; pin something.')
     system = build_system(case.graph, pins)
 
-    result = solve_lexicographic(system, backend=args.backend)
+    solve = solve_decomposed if args.no_cache else solve_cached
+    result = solve(system, backend=args.backend)
     if result.status != 'optimal':
         print(f'solve failed: {result.status}')
-        bare = load_case(args.chart, with_externals=False)
+        bare = case.bare()
         report = analyze(build_system(bare.graph,
                                       [(p.edge, p.value) for p in bare.pins]))
         print(report.human())
@@ -123,13 +163,14 @@ def main(argv=None):
         # source an intermediate) count as ties and show up in the list.
         supports = enumerate_optimal_supports(system, backend=args.backend,
                                               floors=result.floors,
+                                              big_m=result.gate_m or DEFAULT_M,
                                               prefer_sinks=False)
         if len(supports) > 1:
             chosen = choose_alternative(
                 supports, (result.gated_sources, result.gated_sinks))
             if chosen is not None:
-                result = solve_lexicographic(system, backend=args.backend,
-                                             gate_support=chosen)
+                result = solve(system, backend=args.backend,
+                               gate_support=chosen)
                 check = validate_solution(system, result.values)
                 summarize(result, check)
 
@@ -152,12 +193,17 @@ def main(argv=None):
     out_dir.mkdir(parents=True, exist_ok=True)
     stem = Path(case.path).stem
     svg_path = out_dir / f'{stem}_{args.engine}_{args.style}.svg'
-    svg_path.write_text(to_svg(layout, graph_json,
-                               f'{case.name} — {args.engine} {args.style}',
-                               theme=args.theme))
+    with profiling.span('render.svg'):
+        svg_path.write_text(to_svg(layout, graph_json,
+                                   f'{case.name} — {args.engine} {args.style}',
+                                   theme=args.theme))
     png_path = svg_path.with_suffix('.png')
-    png_ok = subprocess.run(['convert', str(svg_path), str(png_path)],
-                            capture_output=True).returncode == 0
+    try:
+        with profiling.span('render.png'):
+            png_ok = subprocess.run(['convert', str(svg_path), str(png_path)],
+                                    capture_output=True).returncode == 0
+    except FileNotFoundError:
+        png_ok = False
     print(f'\nwrote {svg_path}' + (f' and {png_path}' if png_ok else
                                    ' (png conversion unavailable)'))
     return 0
@@ -0,0 +1,174 @@
+"""Compact, array-backed chart graph for the hot loops.
+
+Charts live as networkx MultiDiGraphs whose nodes and edges carry
+MachineNode / IngredientNode / EdgeData objects; every builder walked them
+with G.in_edges(idx) views and G.edges[u, v, key]['object'].name lookups,
+each allocating a view or hashing a 3-tuple. At 10k machines that was most
+of build_system's 2.5s.
+
+ChartGraph is the same chart laid out once:
+    nodes      position -> node idx, kind (MACHINE / INGREDIENT / EXTERNAL),
+               node object, interned ingredient id (ingredient nodes)
+    edges      edge id -> endpoint positions, multigraph key, interned
+               ingredient id, per-craft quantity at the machine endpoint,
+               EdgeData object
+    adjacency  CSR: out_ptr/out_edges and in_ptr/in_edges per node position,
+               in networkx iteration order, so anything that walks it
+               declares variables and rows in exactly the original order.
+
+ChartGraph.of(G) builds it once per graph and keeps it in networkx's own
+per-graph cache, which every graph mutation clears. to_networkx() is the
+adapter back for code that still wants a MultiDiGraph.
+"""
+
+from array import array
+
+import networkx as nx
+
+from src.data.basicTypes import ExternalNode, IngredientNode, MachineNode
+
+MACHINE, INGREDIENT, EXTERNAL = 0, 1, 2
+_CACHE_KEY = 'flow2.chart_graph'
+
+
+def _kind(obj) -> int:
+    if isinstance(obj, ExternalNode):      # subclasses MachineNode: check first
+        return EXTERNAL
+    if isinstance(obj, MachineNode):
+        return MACHINE
+    if isinstance(obj, IngredientNode):
+        return INGREDIENT
+    raise TypeError(f'unexpected node object {type(obj).__name__}')
+
+
+class ChartGraph:
+    __slots__ = ('node_ids', 'position', 'kinds', 'objects', 'ingredients',
+                 'ingredient_ids', 'node_ingredient', 'edge_u', 'edge_v',
+                 'edge_key', 'edge_ing', 'edge_qty', 'edge_objects',
+                 'out_ptr', 'out_edges', 'in_ptr', 'in_edges')
+
+    def __init__(self):
+        self.node_ids = []           # position -> graph node idx
+        self.position = {}           # graph node idx -> position
+        self.kinds = array('b')
+        self.objects = []            # position -> node object (shared, not copied)
+        self.ingredients = []        # ingredient id -> name
+        self.ingredient_ids = {}     # name -> ingredient id
+        self.node_ingredient = array('i')   # position -> ingredient id or -1
+        self.edge_u = array('i')     # edge id -> tail position
+        self.edge_v = array('i')     # edge id -> head position
+        self.edge_key = array('q')
+        self.edge_ing = array('i')
+        # per-craft qty at the machine end, as the YAML wrote it (int or
+        # float, so to_frac stays exact); 0 if the recipe lacks it
+        self.edge_qty = []
+        self.edge_objects = []       # edge id -> EdgeData (shared)
+        self.out_ptr = array('i', [0])
+        self.out_edges = array('i')
+        self.in_ptr = array('i', [0])
+        self.in_edges = array('i')
+
+    def intern(self, name: str) -> int:
+        ing = self.ingredient_ids.get(name)
+        if ing is None:
+            ing = self.ingredient_ids[name] = len(self.ingredients)
+            self.ingredients.append(name)
+        return ing
+
+    @classmethod
+    def of(cls, G: nx.MultiDiGraph) -> 'ChartGraph':
+        """The ChartGraph of G, built on first use and cached on G until G
+        is next mutated."""
+        cache = G.__networkx_cache__
+        chart = cache.get(_CACHE_KEY)
+        if chart is None:
+            chart = cache[_CACHE_KEY] = cls.from_networkx(G)
+        return chart
+
+    @classmethod
+    def from_networkx(cls, G: nx.MultiDiGraph) -> 'ChartGraph':
+        chart = cls()
+        position = chart.position
+        kinds, node_ing = [], []
+        for pos, (idx, obj) in enumerate(G.nodes(data='object')):
+            position[idx] = pos
+            chart.node_ids.append(idx)
+            chart.objects.append(obj)
+            kind = _kind(obj)
+            kinds.append(kind)
+            node_ing.append(chart.intern(obj.name) if kind == INGREDIENT else -1)
+
+        # The raw adjacency dicts (what G.succ / G.pred views wrap): the view
+        # layers cost more than the walk itself at this size.
+        objects = chart.objects
+        edge_u, edge_v, edge_key, edge_ing = [], [], [], []
+        edge_id, out_ptr = {}, [0]
+        for u, nbrs in G._succ.items():
+            pu = position[u]
+            for v, keydict in nbrs.items():
+                pv = position[v]
+                for key, data in keydict.items():
+                    obj = data['object']
+                    ing = obj.name
+                    if kinds[pv] == MACHINE:       # ingredient -> machine input
+                        qty = objects[pv].I.get(ing, 0)
+                    elif kinds[pu] != INGREDIENT:  # machine/external output
+                        qty = objects[pu].O.get(ing, 0)
+                    else:                          # ingredient -> sink
+                        qty = objects[pv].I.get(ing, 0)
+                    edge_id[u, v, key] = len(edge_u)
+                    edge_u.append(pu)
+                    edge_v.append(pv)
+                    edge_key.append(key)
+                    edge_ing.append(chart.intern(ing))
+                    chart.edge_qty.append(qty)
+                    chart.edge_objects.append(obj)
+            out_ptr.append(len(edge_u))
+        in_edges, in_ptr = [], [0]
+        for v, nbrs in G._pred.items():
+            for u, keydict in nbrs.items():
+                for key in keydict:
+                    in_edges.append(edge_id[u, v, key])
+            in_ptr.append(len(in_edges))
+
+        chart.kinds = array('b', kinds)
+        chart.node_ingredient = array('i', node_ing)
+        chart.edge_u = array('i', edge_u)
+        chart.edge_v = array('i', edge_v)
+        chart.edge_key = array('q', edge_key)
+        chart.edge_ing = array('i', edge_ing)
+        # Out-edges are numbered in G._succ order, so out_edges is 0..E-1.
+        chart.out_edges = array('i', range(len(edge_u)))
+        chart.out_ptr = array('i', out_ptr)
+        chart.in_edges = array('i', in_edges)
+        chart.in_ptr = array('i', in_ptr)
+        return chart
+
+    def __len__(self):
+        return len(self.node_ids)
+
+    def n_edges(self) -> int:
+        return len(self.edge_u)
+
+    def edge(self, e: int) -> tuple:
+        """(u, v) graph node indices of edge e."""
+        return self.node_ids[self.edge_u[e]], self.node_ids[self.edge_v[e]]
+
+    def out_of(self, pos: int):
+        return self.out_edges[self.out_ptr[pos]:self.out_ptr[pos + 1]]
+
+    def into(self, pos: int):
+        return self.in_edges[self.in_ptr[pos]:self.in_ptr[pos + 1]]
+
+    def ingredient(self, e: int) -> str:
+        return self.ingredients[self.edge_ing[e]]
+
+    def to_networkx(self) -> nx.MultiDiGraph:
+        G = nx.MultiDiGraph()
+        G.add_nodes_from((idx, {'object': obj})
+                         for idx, obj in zip(self.node_ids, self.objects))
+        G.add_edges_from(
+            (self.node_ids[u], self.node_ids[v], key, {'object': obj})
+            for u, v, key, obj in zip(self.edge_u, self.edge_v,
+                                      self.edge_key, self.edge_objects))
+        return G
@@ -0,0 +1,371 @@
+"""Compiled chart files: the preprocessed chart and its System, memory-mapped.
+
+Every run re-did YAML parse -> constructDisjointGraphFromFlow1Yaml ->
+produceConnectedGraphFromDisjoint -> removeIgnorableIngredients ->
+addExternalNodes -> build_system. compile_chart() runs that pipeline once
+and writes the result as a versioned binary file:
+
+    MAGIC | u32 version | u32 header length | JSON header | arrays
+
+The JSON header holds what is not array-shaped: the interned string table
+(machine, ingredient and variable names), pins, groups, v2 options and the
+type/offset/length of every array. The arrays (node kinds and recipe CSR,
+edges, variables, constraint CSR with exact int64 numerator/denominator)
+are 8-byte aligned in native (little-endian on every supported platform)
+order and read through memoryview.cast over an mmap, so nothing is copied
+before it is used and worker processes loading the same file share its
+pages through the page cache.
+
+load_compiled_case() rebuilds the networkx graph in one bulk pass from the
+arrays (no YAML, no connect/preprocess passes); load_compiled() also
+rebuilds the System without build_system.
+corpus.load_case dispatches here for COMPILED_SUFFIX paths.
+
+Run: uv run python -m research.common.compiled CHART [-o OUT.flowc]
+"""
+
+import argparse
+import json
+import mmap
+import struct
+from array import array
+from fractions import Fraction
+from pathlib import Path
+
+import networkx as nx
+
+from research.common.corpus import Case, Pin, load_case, view_key
+from research.common.profiling import profiled
+from research.common.provenance import (Constraint, System, VariableInfo,
+                                        build_system)
+from src.core.preProcessing import addExternalNodes
+from src.data.basicTypes import EdgeData, ExternalNode, IngredientNode, MachineNode
+
+MAGIC = b'FLOW2CHT'
+FORMAT_VERSION = 1
+COMPILED_SUFFIX = '.flowc'
+_PREFIX = struct.Struct('<8sII')
+
+_NODE_KINDS = (MachineNode, IngredientNode, ExternalNode)
+_VAR_KINDS = ('edge', 'src', 'snk')
+_TAG_KINDS = ('machine_ratio', 'balance', 'pin')
+_INT64 = 2 ** 63
+
+
+class _Strings:
+    """Interning table: every name is stored once and referenced by index."""
+
+    def __init__(self):
+        self.index = {}
+
+    def __call__(self, text) -> int:
+        if text is None:
+            return -1
+        return self.index.setdefault(text, len(self.index))
+
+    def table(self) -> list:
+        return list(self.index)
+
+
+def _numbers(values):
+    """Numbers as float64 plus an is-int flag, so 5 and 5.0 round-trip as
+    the YAML wrote them (floats round-trip exactly through float64)."""
+    return (array('d', (float(v) for v in values)),
+            array('b', (isinstance(v, int) for v in values)))
+
+
+def _system_arrays(system: System, strings: _Strings) -> dict:
+    """Variable and constraint arrays, or None when a coefficient does not
+    fit int64 or a tag is not one build_system emits."""
+    names = list(system.variables)
+    var_index = {name: i for i, name in enumerate(names)}
+    infos = [system.variables[n] for n in names]
+    out = {
+        'var_name': array('i', (strings(n) for n in names)),
+        'var_kind': array('b', (_VAR_KINDS.index(v.kind) for v in infos)),
+        'var_u': array('q', (v.edge[0] for v in infos)),
+        'var_v': array('q', (v.edge[1] for v in infos)),
+        'var_ing': array('i', (strings(v.ingredient) for v in infos)),
+        'var_machine': array('q', (-1 if v.machine_idx is None else v.machine_idx
+                                   for v in infos)),
+    }
+    ptr, col, num, den = array('q', [0]), array('i'), array('q'), array('q')
+    rhs_num, rhs_den = array('q'), array('q')
+    tag_kind, tag_node = array('b'), array('q')
+    tag_s = [array('i'), array('i'), array('i')]
+    for c in system.constraints:
+        fractions = [coeff for _, coeff in c.terms] + [c.rhs]
+        if any(abs(f.numerator) >= _INT64 or f.denominator >= _INT64
+               for f in fractions):
+            return None
+        kind = c.tag[0]
+        if kind == 'machine_ratio':
+            node, texts = c.tag[1], c.tag[2:]
+        elif kind in ('balance', 'pin'):
+            node, texts = -1, c.tag[1:]
+        else:
+            return None
+        for name, coeff in c.terms:
+            col.append(var_index[name])
+            num.append(coeff.numerator)
+            den.append(coeff.denominator)
+        ptr.append(len(col))
+        rhs_num.append(c.rhs.numerator)
+        rhs_den.append(c.rhs.denominator)
+        tag_kind.append(_TAG_KINDS.index(kind))
+        tag_node.append(node)
+        for k in range(3):
+            tag_s[k].append(strings(texts[k]) if k < len(texts) else -1)
+    out.update({'con_ptr': ptr, 'con_var': col, 'con_num': num, 'con_den': den,
+                'con_rhs_num': rhs_num, 'con_rhs_den': rhs_den,
+                'con_tag_kind': tag_kind, 'con_tag_node': tag_node,
+                'con_tag_s0': tag_s[0], 'con_tag_s1': tag_s[1],
+                'con_tag_s2': tag_s[2]})
+    return out
+
+
+@profiled()
+def compile_chart(name: str, out=None) -> Path:
+    """Load `name` (corpus name or yaml path) through the normal pipeline and
+    write it compiled. Default output: next to the yaml, COMPILED_SUFFIX."""
+    case = load_case(name)
+    system = build_system(case.graph, [(p.edge, p.value) for p in case.pins])
+    strings = _Strings()
+    G = case.graph
+
+    nodes = list(G.nodes)
+    objs = [G.nodes[n]['object'] for n in nodes]
+    arrays = {
+        'node_id': array('q', nodes),
+        'node_kind': array('b', (_NODE_KINDS.index(type(o)) for o in objs)),
+        'node_name': array('i', (strings(o.m if isinstance(o, MachineNode)
+                                         else o.name) for o in objs)),
+    }
+    # Machines: (eut, dur); ingredients: (base_quant, associated_machine_index)
+    # with base_direction in node_dir.
+    first = [o.eut if isinstance(o, MachineNode) else o.base_quant for o in objs]
+    second = [o.dur if isinstance(o, MachineNode) else o.associated_machine_index
+              for o in objs]
+    arrays['node_a'], arrays['node_a_int'] = _numbers(first)
+    arrays['node_b'], arrays['node_b_int'] = _numbers(second)
+    arrays['node_dir'] = array('i', (-1 if isinstance(o, MachineNode)
+                                     else strings(o.base_direction) for o in objs))
+    rec_ptr, rec_side, rec_ing, rec_qty = array('q', [0]), array('b'), array('i'), []
+    for o in objs:
+        if isinstance(o, MachineNode):
+            for side, recipe in enumerate((o.I, o.O)):
+                for ing, qty in recipe.items():
+                    rec_side.append(side)
+                    rec_ing.append(strings(ing))
+                    rec_qty.append(qty)
+        rec_ptr.append(len(rec_ing))
+    arrays.update({'rec_ptr': rec_ptr, 'rec_side': rec_side, 'rec_ing': rec_ing})
+    arrays['rec_qty'], arrays['rec_qty_int'] = _numbers(rec_qty)
+
+    edges = list(G.edges(keys=True, data='object'))
+    arrays.update({
+        'edge_u': array('q', (e[0] for e in edges)),
+        'edge_v': array('q', (e[1] for e in edges)),
+        'edge_key': array('q', (e[2] for e in edges)),
+        'edge_name': array('i', (strings(e[3].name) for e in edges)),
+    })
+    arrays['edge_q'], arrays['edge_q_int'] = _numbers([e[3].base_quant
+                                                       for e in edges])
+
+    system_arrays = _system_arrays(system, strings)
+    if system_arrays is not None:
+        arrays.update(system_arrays)
+
+    header = {
+        'name': case.name, 'source': str(case.path),
+        'strings': strings.table(),
+        'pins': [{'kind': p.kind, 'edge': list(p.edge),
+                  'ingredient': p.ingredient, 'value': p.value,
+                  'machine_yaml_index': p.machine_yaml_index}
+                 for p in case.pins],
+        'groups': [[node, group] for node, group in (case.groups or {}).items()],
+        'v2_options': case.v2_options,
+        'has_system': system_arrays is not None,
+        'arrays': {},
+    }
+    offset = 0                     # relative to the (aligned) array section
+    for key, arr in arrays.items():
+        header['arrays'][key] = [arr.typecode, offset, len(arr)]
+        offset += -(-len(arr) * arr.itemsize // 8) * 8
+    blob = json.dumps(header, separators=(',', ':')).encode()
+    blob += b' ' * (-(_PREFIX.size + len(blob)) % 8)
+
+    out = Path(out) if out is not None else case.path.with_suffix(COMPILED_SUFFIX)
+    with open(out, 'wb') as f:
+        f.write(_PREFIX.pack(MAGIC, FORMAT_VERSION, len(blob)))
+        f.write(blob)
+        for arr in arrays.values():
+            data = arr.tobytes()
+            f.write(data + b'\0' * (-len(data) % 8))
+    return out
+
+
+class CompiledChart:
+    """A memory-mapped compiled chart. Arrays are read lazily as
+    memoryviews; the mapping stays open as long as this object lives."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        with open(self.path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, length = _PREFIX.unpack_from(self._map)
+        if magic != MAGIC:
+            raise ValueError(f'{path}: not a compiled chart')
+        if version != FORMAT_VERSION:
+            raise ValueError(f'{path}: compiled chart format {version}, '
+                             f'this reader needs {FORMAT_VERSION}; recompile')
+        self.header = json.loads(self._map[_PREFIX.size:_PREFIX.size + length])
+        self._base = _PREFIX.size + length
+        self.strings = self.header['strings']
+
+    def array(self, key) -> memoryview:
+        typecode, offset, count = self.header['arrays'][key]
+        size = array(typecode).itemsize
+        start = self._base + offset
+        return memoryview(self._map)[start:start + count * size].cast(typecode)
+
+    def _numbers(self, key) -> list:
+        return [int(v) if is_int else v for v, is_int in
+                zip(self.array(key).tolist(), self.array(f'{key}_int').tolist())]
+
+    def graph(self, with_externals: bool = True) -> nx.MultiDiGraph:
+        s = self.strings
+        ids = self.array('node_id').tolist()
+        kinds = self.array('node_kind').tolist()
+        names = self.array('node_name').tolist()
+        first, second = self._numbers('node_a'), self._numbers('node_b')
+        dirs = self.array('node_dir').tolist()
+        rec_ptr = self.array('rec_ptr').tolist()
+        rec_side = self.array('rec_side').tolist()
+        rec_ing = self.array('rec_ing').tolist()
+        rec_qty = self._numbers('rec_qty')
+        nodes = []
+        for i, node in enumerate(ids):
+            cls = _NODE_KINDS[kinds[i]]
+            if cls is IngredientNode:
+                obj = IngredientNode(s[names[i]], first[i], s[dirs[i]], second[i])
+            elif cls is ExternalNode and not with_externals:
+                continue
+            else:
+                recipe = ({}, {})
+                for k in range(rec_ptr[i], rec_ptr[i + 1]):
+                    recipe[rec_side[k]][s[rec_ing[k]]] = rec_qty[k]
+                obj = cls(s[names[i]], recipe[0], recipe[1], first[i], second[i])
+            nodes.append((node, {'object': obj}))
+        # Fill the adjacency dicts directly (the layout MultiDiGraph.add_edge
+        # builds: _succ[u][v] and _pred[v][u] share one key dict): the
+        # per-edge add_edge bookkeeping was most of the load time.
+        G = nx.MultiDiGraph()
+        succ, pred = G._succ, G._pred
+        for node, attrs in nodes:
+            G._node[node] = attrs
+            succ[node] = {}
+            pred[node] = {}
+        for u, v, key, name, q in zip(
+                self.array('edge_u').tolist(), self.array('edge_v').tolist(),
+                self.array('edge_key').tolist(),
+                self.array('edge_name').tolist(), self._numbers('edge_q')):
+            if u not in succ or v not in succ:
+                continue                 # edge of a dropped external node
+            keydict = succ[u].get(v)
+            if keydict is None:
+                keydict = succ[u][v] = pred[v][u] = {}
+            keydict[key] = {'object': EdgeData(s[name], q)}
+        return G
+
+    def pins(self) -> list:
+        return [Pin(p['kind'], tuple(p['edge']), p['ingredient'], p['value'],
+                    p['machine_yaml_index']) for p in self.header['pins']]
+
+    def variant(self, with_externals: bool = True,
+                excluded_sources=frozenset()) -> nx.MultiDiGraph:
+        if excluded_sources and with_externals:
+            return addExternalNodes(self.graph(with_externals=False),
+                                    set(excluded_sources))
+        return self.graph(with_externals)
+
+    def case(self, with_externals: bool = True,
+             excluded_sources: set = frozenset()) -> Case:
+        """The Case load_case would return for the source yaml."""
+        case = Case(name=self.header['name'], path=self.path,
+                    graph=self.variant(with_externals, excluded_sources),
+                    pins=self.pins(), v2_options=self.header['v2_options'],
+                    groups={node: group for node, group in self.header['groups']},
+                    derive=self.variant)
+        case.views[view_key(with_externals, excluded_sources)] = case
+        return case
+
+    def system(self, graph: nx.MultiDiGraph) -> System:
+        """The stored System over `graph` (which must be this chart's
+        default with-externals graph), without build_system."""
+        if not self.header['has_system']:
+            return build_system(graph, [(p.edge, p.value) for p in self.pins()])
+        s = self.strings
+        names = [s[i] for i in self.array('var_name').tolist()]
+        variables, edge_to_var = {}, {}
+        for name, kind, u, v, ing, machine in zip(
+                names, self.array('var_kind').tolist(),
+                self.array('var_u').tolist(), self.array('var_v').tolist(),
+                self.array('var_ing').tolist(),
+                self.array('var_machine').tolist()):
+            variables[name] = VariableInfo(name, _VAR_KINDS[kind], (u, v), s[ing],
+                                           None if machine < 0 else machine)
+            edge_to_var[(u, v)] = name
+        ptr = self.array('con_ptr').tolist()
+        col = self.array('con_var').tolist()
+        num = self.array('con_num').tolist()
+        den = self.array('con_den').tolist()
+        tag_strings = [self.array(f'con_tag_s{k}').tolist() for k in range(3)]
+        fractions = {}                   # most coefficients are +-1 or repeat
+
+        def frac(n, d):
+            f = fractions.get((n, d))
+            if f is None:
+                f = fractions[n, d] = Fraction(n, d)
+            return f
+
+        constraints = []
+        for i, (rn, rd, kind, node) in enumerate(zip(
+                self.array('con_rhs_num').tolist(),
+                self.array('con_rhs_den').tolist(),
+                self.array('con_tag_kind').tolist(),
+                self.array('con_tag_node').tolist())):
+            terms = tuple((names[col[k]], frac(num[k], den[k]))
+                          for k in range(ptr[i], ptr[i + 1]))
+            texts = tuple(s[t[i]] for t in tag_strings if t[i] >= 0)
+            kind = _TAG_KINDS[kind]
+            tag = (kind, node, *texts) if kind == 'machine_ratio' else (kind, *texts)
+            constraints.append(Constraint(terms, frac(rn, rd), tag))
+        return System(constraints, variables, edge_to_var, graph)
+
+
+@profiled()
+def load_compiled_case(path, with_externals: bool = True,
+                       excluded_sources: set = frozenset()) -> Case:
+    return CompiledChart(path).case(with_externals, excluded_sources)
+
+
+@profiled()
+def load_compiled(path):
+    """(Case, System) for the default chart variant, straight from the file."""
+    chart = CompiledChart(path)
+    case = chart.case()
+    return case, chart.system(case.graph)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('chart', help='corpus name or yaml path')
+    parser.add_argument('-o', '--out', help=f'output path (default: '
+                        f'next to the yaml, {COMPILED_SUFFIX})')
+    args = parser.parse_args()
+    print(f'wrote {compile_chart(args.chart, args.out)}')
+
+
+if __name__ == '__main__':
+    main()
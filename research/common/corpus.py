@@ -2,16 +2,18 @@
 sees exactly the same graphs, water-removal behavior, and pin semantics.
 """
 
-from dataclasses import dataclass, field
+import functools
+from dataclasses import dataclass, field, replace
 from pathlib import Path
+from typing import Callable
 
 import networkx as nx
 
-from src.core.connectGraph import produceConnectedGraphFromDisjoint
-from src.core.flow1Compat import constructDisjointGraphFromFlow1Yaml
-from src.core.preProcessing import addExternalNodes, removeIgnorableIngredients
+from research.common.profiling import profiled, span
+from src.core.chartIndex import ChartIndex
+from src.core.flow1Compat import constructConnectedGraphFromFlow1Conf
+from src.core.preProcessing import addExternalNodes, ignorable_ingredients
 from src.core.sharedYamlLoad import loadYamlFile
-from src.data.basicTypes import IngredientNode, MachineNode
 
 REPO_ROOT = Path(__file__).resolve().parents[2]
 CORPUS_DIR = REPO_ROOT / 'temporaryFlowProjects'
@@ -28,6 +30,11 @@ class Pin:
     machine_yaml_index: int
 
 
+def view_key(with_externals: bool, excluded_sources) -> tuple:
+    return (with_externals,
+            frozenset(excluded_sources) if with_externals else frozenset())
+
+
 @dataclass
 class Case:
     name: str
@@ -36,6 +43,26 @@ class Case:
     pins: list                      # list[Pin]
     v2_options: dict                # {'no_source': [...], 'whitelisted_slack_variables': [...]}
     groups: dict = None             # machine node idx -> yaml `group:` name
+    # (with_externals, excluded_sources) -> graph, from the same parse; and
+    # the views derived so far, shared by every view of this chart.
+    derive: Callable = field(default=None, repr=False, compare=False)
+    views: dict = field(default_factory=dict, repr=False, compare=False)
+
+    def view(self, with_externals: bool = True,
+             excluded_sources=frozenset()) -> 'Case':
+        """This chart as load_case(name, with_externals, excluded_sources)
+        returns it, built on first use from the already-parsed chart. Pins,
+        groups and v2 options are shared: node indices agree across views."""
+        key = view_key(with_externals, excluded_sources)
+        if self.derive is None:        # hand-built Case: reload
+            return load_case(str(self.path), *key)
+        if key not in self.views:
+            self.views[key] = replace(self, graph=self.derive(*key))
+        return self.views[key]
+
+    def bare(self) -> 'Case':
+        """The view without external source/sink nodes (diagnostics)."""
+        return self.view(with_externals=False)
 
     def target_pins(self):
         return [p for p in self.pins if p.kind == 'target']
@@ -55,9 +82,10 @@ def list_cases(include_tests: bool = True) -> list:
 
 
 def _case_path(name: str) -> Path:
-    """Resolve a corpus name OR an arbitrary yaml file path (for the CLI)."""
+    """Resolve a corpus name OR an arbitrary yaml / compiled chart path (for
+    the CLI)."""
     direct = Path(name).expanduser()
-    if direct.suffix in ('.yaml', '.yml') and direct.exists():
+    if direct.suffix in ('.yaml', '.yml', '.flowc') and direct.exists():
         return direct
     path = CORPUS_DIR / f'{name}.yaml'
     if not path.exists():
@@ -67,19 +95,14 @@ def _case_path(name: str) -> Path:
 
 def _machine_groups(G: nx.MultiDiGraph, conf: list) -> dict:
     """machine node idx -> yaml `group:` name (for subgraph rendering)."""
-    machine_index_to_node = {}
-    machine_index = 0
-    for node_idx, node in G.nodes.items():
-        if isinstance(node['object'], MachineNode):
-            machine_index_to_node[machine_index] = node_idx
-            machine_index += 1
+    machine_nodes = ChartIndex.of(G).machine_nodes
     groups = {}
     machine_index = 0
     for machine_dict in conf:
         if not all(attr in machine_dict for attr in MACHINE_ATTRS):
             continue
         if 'group' in machine_dict:
-            groups[machine_index_to_node[machine_index]] = machine_dict['group']
+            groups[machine_nodes[machine_index]] = machine_dict['group']
         machine_index += 1
     return groups
 
@@ -94,51 +117,34 @@ def _resolve_pins(G: nx.MultiDiGraph, conf: list) -> list:
     'target' locks the named ingredient's edge at that machine to the given
     rate directly.
     """
-    machine_index_to_node = {}
-    machine_index = 0
-    for node_idx, node in G.nodes.items():
-        if isinstance(node['object'], MachineNode):
-            machine_index_to_node[machine_index] = node_idx
-            machine_index += 1
-
-    ingredient_to_node = {}
-    for node_idx, node in G.nodes.items():
-        nobj = node['object']
-        if isinstance(nobj, IngredientNode):
-            ingredient_to_node[nobj.name] = node_idx
-
+    index = ChartIndex.of(G)
     pins = []
     machine_index = 0
     for yaml_index, machine_dict in enumerate(conf):
         if not all(attr in machine_dict for attr in MACHINE_ATTRS):
             continue  # v2 style node
-        node_idx = machine_index_to_node[machine_index]
+        node_idx = index.machine_nodes[machine_index]
         machine_index += 1
         nobj = G.nodes[node_idx]['object']
+        edges = index.machine_edges[node_idx]
 
         if 'number' in machine_dict:
-            available = {ing for ing in list(nobj.I) + list(nobj.O)
-                         if ing in ingredient_to_node}
-            candidates = [ing for ing in list(nobj.I) if ing in available] or \
-                         [ing for ing in list(nobj.O) if ing in available]
+            candidates = [('I', ing) for ing in nobj.I if ('I', ing) in edges] or \
+                         [('O', ing) for ing in nobj.O if ('O', ing) in edges]
             if not candidates:
                 raise RuntimeError(f'cannot lock machine {nobj.m}: no lockable edges')
-            ing = candidates[0]
-            if ing in nobj.I:
-                edge = (ingredient_to_node[ing], node_idx)
-                per_craft = nobj.I[ing]
-            else:
-                edge = (node_idx, ingredient_to_node[ing])
-                per_craft = nobj.O[ing]
+            direction, ing = candidates[0]
+            edge = edges[direction, ing]
+            per_craft = getattr(nobj, direction)[ing]
             rate = per_craft * machine_dict['number'] / nobj.dur
             pins.append(Pin('number', edge, ing, rate, yaml_index))
 
         elif 'target' in machine_dict:
             for target_name, target_quantity in machine_dict['target'].items():
                 if target_name in nobj.I:
-                    edge = (ingredient_to_node[target_name], node_idx)
+                    edge = index.machineEdge(node_idx, 'I', target_name)
                 elif target_name in nobj.O:
-                    edge = (node_idx, ingredient_to_node[target_name])
+                    edge = index.machineEdge(node_idx, 'O', target_name)
                 else:
                     raise RuntimeError(
                         f'target {target_name} not an ingredient of machine {nobj.m}')
@@ -156,16 +162,29 @@ def _v2_options(conf: list) -> dict:
     return options
 
 
+def _graph_variant(conf, with_externals: bool,
+                   excluded_sources=frozenset()) -> nx.MultiDiGraph:
+    G = constructConnectedGraphFromFlow1Conf(conf, ignorable_ingredients)
+    if with_externals:
+        G = addExternalNodes(G, set(excluded_sources))
+    return G
+
+
+@profiled()
 def load_case(name: str, with_externals: bool = True,
               excluded_sources: set = frozenset()) -> Case:
     path = _case_path(name)
-    G = constructDisjointGraphFromFlow1Yaml(path)
-    G = produceConnectedGraphFromDisjoint(G)
-    G = removeIgnorableIngredients(G)
-    if with_externals:
-        G = addExternalNodes(G, set(excluded_sources))
+    if path.suffix == '.flowc':
+        from research.common.compiled import load_compiled_case
+        return load_compiled_case(path, with_externals, excluded_sources)
     conf = loadYamlFile(path)
-    pins = _resolve_pins(G, conf)
-    return Case(name=name, path=path, graph=G, pins=pins,
+    with span('load_case.graph'):
+        G = _graph_variant(conf, with_externals, excluded_sources)
+    with span('load_case.pins'):
+        pins = _resolve_pins(G, conf)
+    case = Case(name=name, path=path, graph=G, pins=pins,
                 v2_options=_v2_options(conf),
-                groups=_machine_groups(G, conf))
+                groups=_machine_groups(G, conf),
+                derive=functools.partial(_graph_variant, conf))
+    case.views[view_key(with_externals, excluded_sources)] = case
+    return case
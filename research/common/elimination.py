@@ -0,0 +1,150 @@
+"""Sparse exact Gaussian elimination over Fraction.
+
+Chart systems are extremely sparse (a balance row touches the handful of
+edges at one ingredient node, a ratio row two edges of one machine), so a
+dense sympy Matrix spends nearly all its time multiplying zeros. Here rows
+are {column: Fraction} dicts and pivots are chosen Markowitz-style: the
+shortest remaining row, and within it the column with the fewest remaining
+entries, which keeps fill-in — and therefore Fraction growth — small.
+
+eliminate() returns an Echelon in reduced form: every pivot row holds its
+pivot (coefficient 1) plus free columns only, so the particular solution
+and a nullspace basis read straight off it.
+"""
+
+import heapq
+from dataclasses import dataclass, field
+from fractions import Fraction
+
+
+@dataclass
+class Echelon:
+    n_cols: int
+    reduced: dict          # pivot column -> {free column: coefficient}
+    rhs: dict              # pivot column -> Fraction
+    consistent: bool
+    # Original row indices whose combination reduced to 0 = nonzero (empty
+    # when consistent): a certificate of the conflict, not necessarily minimal.
+    conflict_rows: list = field(default_factory=list)
+
+    @property
+    def rank(self) -> int:
+        return len(self.reduced)
+
+    @property
+    def nullity(self) -> int:
+        return self.n_cols - self.rank
+
+    def free_columns(self) -> list:
+        return [c for c in range(self.n_cols) if c not in self.reduced]
+
+    def particular(self) -> list:
+        """A solution with every free column at 0 (None if inconsistent)."""
+        if not self.consistent:
+            return None
+        x = [Fraction(0)] * self.n_cols
+        for c, value in self.rhs.items():
+            x[c] = value
+        return x
+
+    def nullspace(self) -> list:
+        """One basis vector per free column f (x_f = 1, other free columns
+        0), as sparse {column: Fraction} dicts."""
+        by_free = {f: {f: Fraction(1)} for f in self.free_columns()}
+        for c, row in self.reduced.items():
+            for f, coeff in row.items():
+                by_free[f][c] = -coeff
+        return [by_free[f] for f in sorted(by_free)]
+
+    def parametrization(self) -> list:
+        """The whole solution set, per column: (constant, {free column:
+        coefficient}) with x_c = constant + sum(coefficient * x_f). A free
+        column is (0, {itself: 1}); a column fixed in every solution has no
+        free terms. None if inconsistent."""
+        if not self.consistent:
+            return None
+        out = []
+        for c in range(self.n_cols):
+            if c in self.reduced:
+                out.append((self.rhs[c],
+                            {f: -v for f, v in self.reduced[c].items()}))
+            else:
+                out.append((Fraction(0), {c: Fraction(1)}))
+        return out
+
+
+def eliminate(rows, rhs, n_cols: int) -> Echelon:
+    """rows: iterable of {column: number} (zeros may be omitted); rhs: the
+    matching right-hand sides. Inputs are not modified."""
+    active = {}
+    for i, (row, b) in enumerate(zip(rows, rhs)):
+        active[i] = ({c: Fraction(v) for c, v in row.items() if v != 0},
+                     Fraction(b), {i})
+    col_rows = {}
+    for i, (row, _, _) in active.items():
+        for c in row:
+            col_rows.setdefault(c, set()).add(i)
+
+    heap = [(len(row), i) for i, (row, _, _) in active.items()]
+    heapq.heapify(heap)
+    order = []                 # (pivot column, row, rhs) in pivot order
+    consistent, conflict = True, []
+
+    while heap:
+        length, i = heapq.heappop(heap)
+        if i not in active or len(active[i][0]) != length:
+            continue           # stale heap entry
+        row, b, origin = active.pop(i)
+        for c in row:
+            col_rows[c].discard(i)
+        if not row:
+            if b != 0 and consistent:
+                consistent, conflict = False, sorted(origin)
+            continue
+        pivot = min(row, key=lambda c: (len(col_rows[c]), c))
+        scale = row[pivot]
+        if scale != 1:
+            row = {c: v / scale for c, v in row.items()}
+            b = b / scale
+        order.append((pivot, row, b))
+
+        for k in list(col_rows[pivot]):
+            krow, kb, korigin = active[k]
+            factor = krow[pivot]
+            for c, v in row.items():
+                new = krow.get(c, 0) - factor * v
+                if new:
+                    if c not in krow:
+                        col_rows[c].add(k)
+                    krow[c] = new
+                elif c in krow:
+                    del krow[c]
+                    col_rows[c].discard(k)
+            active[k] = (krow, kb - factor * b, korigin | origin)
+            heapq.heappush(heap, (len(krow), k))
+
+    # Back substitution in reverse pivot order: a pivot row only contains
+    # columns pivoted after it (already reduced) and free columns.
+    reduced, values = {}, {}
+    for pivot, row, b in reversed(order):
+        out = {}
+        for c, v in row.items():
+            if c == pivot:
+                continue
+            if c in reduced:
+                b -= v * values[c]
+                for f, w in reduced[c].items():
+                    new = out.get(f, 0) - v * w
+                    if new:
+                        out[f] = new
+                    else:
+                        out.pop(f, None)
+            else:
+                new = out.get(c, 0) + v
+                if new:
+                    out[c] = new
+                else:
+                    out.pop(c, None)
+        reduced[pivot] = out
+        values[pivot] = b
+    return Echelon(n_cols, reduced, values, consistent, conflict)
@@ -1,9 +1,14 @@
-"""Exact rational matrix view of a System, for rank/nullspace analysis."""
+"""Exact rational matrix view of a System, for rank/nullspace analysis.
+
+sparse_system_matrix + elimination.eliminate is the working path; the dense
+sympy system_matrix is kept for interactive exploration.
+"""
 
 from fractions import Fraction
 
 import sympy
 
+from research.common.elimination import eliminate
 from research.common.provenance import System
 
 
@@ -37,9 +42,27 @@ def system_matrix(system: System, include_kinds=('edge',)):
     return A, b, var_order
 
 
+def sparse_system_matrix(system: System, include_kinds=('edge',)):
+    """system_matrix's rows as sparse {column index: Fraction} dicts:
+    returns (rows, rhs, var_order) with the same row selection."""
+    var_order = [name for name, info in system.variables.items()
+                 if info.kind in include_kinds]
+    var_index = {name: i for i, name in enumerate(var_order)}
+
+    rows, rhs = [], []
+    for con in system.constraints:
+        coeffs = con.coeff_dict()
+        if any(name not in var_index for name in coeffs):
+            continue
+        rows.append({var_index[name]: Fraction(coeff)
+                     for name, coeff in coeffs.items()})
+        rhs.append(Fraction(con.rhs))
+    return rows, rhs, var_order
+
+
 def rank_nullity(system: System, include_kinds=('edge',)):
-    A, _, var_order = system_matrix(system, include_kinds)
-    rank = A.rank()
+    rows, rhs, var_order = sparse_system_matrix(system, include_kinds)
+    rank = eliminate(rows, rhs, len(var_order)).rank
     return {'rank': rank,
             'n_vars': len(var_order),
             'nullity': len(var_order) - rank}
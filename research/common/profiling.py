@@ -0,0 +1,182 @@
+"""Opt-in timing spans for the load -> solve -> layout pipeline.
+
+    from research.common import profiling
+    profiling.enable()
+    ...                                  # run the pipeline
+    print(profiling.collector().summary())
+    profiling.collector().write_chrome_trace('trace.json')  # chrome://tracing
+
+Instrumented code uses `with span('name', key=value):` or the `@profiled()`
+decorator. While disabled (the default), span() returns a shared no-op
+context manager: one global read and no allocation, so the hooks can stay
+in hot paths permanently.
+"""
+
+import functools
+import json
+import os
+import threading
+import time
+from contextlib import nullcontext
+from dataclasses import asdict, dataclass, field
+
+_NOOP = nullcontext()
+_collector = None
+
+
+@dataclass
+class Span:
+    name: str
+    start: float            # seconds since the collector was created
+    duration: float
+    depth: int
+    thread: int
+    args: dict = field(default_factory=dict)
+
+
+class Collector:
+    """Closed spans in completion order. Nesting depth is tracked per
+    thread, so spans from worker threads do not corrupt each other."""
+
+    def __init__(self):
+        self.origin = time.perf_counter()
+        self.spans = []
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def _open(self):
+        depth = getattr(self._local, 'depth', 0)
+        self._local.depth = depth + 1
+        return depth
+
+    def _close(self, name, start, depth, args):
+        end = time.perf_counter()
+        self._local.depth = depth
+        span = Span(name, start - self.origin, end - start, depth,
+                    threading.get_ident(), args)
+        with self._lock:
+            self.spans.append(span)
+
+    def totals(self) -> dict:
+        """name -> (calls, total seconds, self seconds). Self time excludes
+        time spent in nested spans on the same thread."""
+        child_time = [0.0] * len(self.spans)
+        ordered = sorted(range(len(self.spans)),
+                         key=lambda i: (self.spans[i].thread,
+                                        self.spans[i].start,
+                                        self.spans[i].depth))
+        stack = []                # indices of currently open ancestors
+        for i in ordered:
+            s = self.spans[i]
+            while stack and (self.spans[stack[-1]].thread != s.thread or
+                             self.spans[stack[-1]].depth >= s.depth):
+                stack.pop()
+            if stack:
+                child_time[stack[-1]] += s.duration
+            stack.append(i)
+        out = {}
+        for s, inner in zip(self.spans, child_time):
+            calls, total, own = out.get(s.name, (0, 0.0, 0.0))
+            out[s.name] = (calls + 1, total + s.duration,
+                           own + s.duration - inner)
+        return out
+
+    def summary(self) -> str:
+        totals = self.totals()
+        wall = max((s.start + s.duration for s in self.spans), default=0.0) \
+            - min((s.start for s in self.spans), default=0.0)
+        lines = [f'{"span":<32} {"calls":>5} {"total s":>9} {"self s":>9} '
+                 f'{"self %":>6}']
+        for name, (calls, total, own) in sorted(
+                totals.items(), key=lambda kv: -kv[1][2]):
+            share = 100 * own / wall if wall else 0.0
+            lines.append(f'{name:<32} {calls:>5} {total:>9.3f} {own:>9.3f} '
+                         f'{share:>5.1f}%')
+        lines.append(f'{"(wall)":<32} {"":>5} {wall:>9.3f}')
+        return '\n'.join(lines)
+
+    def to_json(self) -> dict:
+        return {'spans': [asdict(s) for s in self.spans],
+                'totals': {name: {'calls': c, 'total': t, 'self': o}
+                           for name, (c, t, o) in self.totals().items()}}
+
+    def to_chrome_trace(self) -> dict:
+        """Trace Event Format: load in chrome://tracing or ui.perfetto.dev."""
+        pid = os.getpid()
+        events = [{'name': s.name, 'ph': 'X', 'pid': pid, 'tid': s.thread,
+                   'ts': s.start * 1e6, 'dur': s.duration * 1e6,
+                   'args': {k: _jsonable(v) for k, v in s.args.items()}}
+                  for s in self.spans]
+        return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+    def write_json(self, path):
+        with open(path, 'w') as f:
+            json.dump(self.to_json(), f, indent=1, default=repr)
+
+    def write_chrome_trace(self, path):
+        with open(path, 'w') as f:
+            json.dump(self.to_chrome_trace(), f)
+
+
+def _jsonable(value):
+    return value if isinstance(value, (str, int, float, bool, type(None))) \
+        else repr(value)
+
+
+class _Span:
+    __slots__ = ('collector', 'name', 'args', 'start', 'depth')
+
+    def __init__(self, collector, name, args):
+        self.collector = collector
+        self.name = name
+        self.args = args
+
+    def __enter__(self):
+        self.depth = self.collector._open()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.collector._close(self.name, self.start, self.depth, self.args)
+        return False
+
+
+def enable() -> Collector:
+    """Start collecting into a fresh global Collector and return it."""
+    global _collector
+    _collector = Collector()
+    return _collector
+
+
+def disable():
+    global _collector
+    _collector = None
+
+
+def collector():
+    """The active Collector, or None while profiling is off."""
+    return _collector
+
+
+def span(name: str, **args):
+    """Context manager timing the enclosed block as `name`; keyword args
+    are attached to the span (chart size, backend, M, ...)."""
+    c = _collector
+    if c is None:
+        return _NOOP
+    return _Span(c, name, args)
+
+
+def profiled(name: str = None):
+    """Decorator form of span(); defaults to module.qualname."""
+    def wrap(fn):
+        label = name or f'{fn.__module__.rsplit(".", 1)[-1]}.{fn.__qualname__}'
+
+        @functools.wraps(fn)
+        def inner(*a, **kw):
+            if _collector is None:
+                return fn(*a, **kw)
+            with _Span(_collector, label, {}):
+                return fn(*a, **kw)
+        return inner
+    return wrap
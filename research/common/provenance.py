@@ -17,7 +17,8 @@ from typing import Optional, Union
 
 import networkx as nx
 
-from src.data.basicTypes import ExternalNode, IngredientNode, MachineNode
+from research.common.chartgraph import EXTERNAL, INGREDIENT, MACHINE, ChartGraph
+from research.common.profiling import profiled
 
 Number = Union[int, float, Fraction]
 
@@ -77,33 +78,57 @@ class System:
     def intermediates(self) -> list:
         """Ingredient names that are both produced and consumed by machines
         (the candidate set for binary-gated sources/sinks)."""
-        result = []
-        G = self.graph
-        for idx, node in G.nodes.items():
-            nobj = node['object']
-            if not isinstance(nobj, IngredientNode):
+        chart = ChartGraph.of(self.graph)
+        kinds, result = chart.kinds, []
+        for pos, kind in enumerate(kinds):
+            if kind != INGREDIENT:
                 continue
-            internal_in = any(
-                not isinstance(G.nodes[e[0]]['object'], ExternalNode)
-                for e in G.in_edges(idx))
-            internal_out = any(
-                not isinstance(G.nodes[e[1]]['object'], ExternalNode)
-                for e in G.out_edges(idx))
-            if internal_in and internal_out:
-                result.append(nobj.name)
+            if any(kinds[chart.edge_u[e]] != EXTERNAL for e in chart.into(pos)) \
+                    and any(kinds[chart.edge_v[e]] != EXTERNAL
+                            for e in chart.out_of(pos)):
+                result.append(chart.objects[pos].name)
         return result
 
+    def components(self) -> list:
+        """Split into independent Systems: connected components of the
+        constraint-variable bipartite graph, largest first. Blocks share
+        no variable and no constraint, so each solves on its own; they
+        keep the full graph (node lookups), not a subgraph."""
+        parent = {name: name for name in self.variables}
+
+        def find(name):
+            while parent[name] != name:
+                parent[name] = parent[parent[name]]
+                name = parent[name]
+            return name
+
+        for c in self.constraints:
+            root = find(c.terms[0][0])
+            for name, _ in c.terms[1:]:
+                other = find(name)
+                if other != root:
+                    parent[other] = root
+        blocks = {}
+        for name in self.variables:
+            blocks.setdefault(find(name), ([], []))[0].append(name)
+        for c in self.constraints:
+            blocks[find(c.terms[0][0])][1].append(c)
+        out = []
+        for names, constraints in sorted(blocks.values(),
+                                         key=lambda b: -len(b[0])):
+            variables = {n: self.variables[n] for n in names}
+            edge_to_var = {e: n for e, n in self.edge_to_var.items()
+                           if n in variables}
+            out.append(System(constraints, variables, edge_to_var, self.graph))
+        return out
+
     def external_vars(self, ingredient: Optional[str] = None) -> list:
         return [v.name for v in self.variables.values()
                 if v.kind in ('src', 'snk')
                 and (ingredient is None or v.ingredient == ingredient)]
 
 
-def _edge_ingredient(G, edge) -> str:
-    key = edge[2] if len(edge) == 3 else 0
-    return G.edges[edge[0], edge[1], key]['object'].name
-
-
+@profiled()
 def build_system(G: nx.MultiDiGraph, pins=(), ratio_form: str = 'star') -> System:
     """Build the exact equality system for a connected graph (externals already
     added by preProcessing.addExternalNodes, or not — both work).
@@ -112,32 +137,42 @@ def build_system(G: nx.MultiDiGraph, pins=(), ratio_form: str = 'star') -> Syste
     clean rank/IIS); 'pairwise' reproduces graphToEquations' |I|*|O| rows.
     """
     assert ratio_form in ('star', 'pairwise')
+    chart = ChartGraph.of(G)
     variables = {}
     edge_to_var = {}
     counters = {'edge': 0, 'src': 0, 'snk': 0}
+    prefixes = {'edge': 'x', 'src': 'src', 'snk': 'snk'}
+    edges = [chart.edge(e) for e in range(chart.n_edges())]
 
-    def declare(edge, kind, ingredient, machine_idx):
-        prefix = {'edge': 'x', 'src': 'src', 'snk': 'snk'}[kind]
-        name = f'{prefix}{counters[kind]}'
+    def declare(e, kind, machine_idx):
+        name = f'{prefixes[kind]}{counters[kind]}'
         counters[kind] += 1
-        variables[name] = VariableInfo(name, kind, tuple(edge[:2]), ingredient, machine_idx)
-        edge_to_var[tuple(edge[:2])] = name
-        return name
+        variables[name] = VariableInfo(name, kind, edges[e], chart.ingredient(e),
+                                       machine_idx)
+        edge_to_var[edges[e]] = name
 
     # Declare one variable per (machine|external) <-> ingredient edge.
-    for idx, node in G.nodes.items():
-        nobj = node['object']
-        if isinstance(nobj, ExternalNode):
-            # ExternalNode subclasses MachineNode, so check it first.
-            for edge in G.out_edges(idx):
-                declare(edge, 'src', _edge_ingredient(G, edge), None)
-            for edge in G.in_edges(idx):
-                declare(edge, 'snk', _edge_ingredient(G, edge), None)
-        elif isinstance(nobj, MachineNode):
-            for edge in list(G.in_edges(idx)) + list(G.out_edges(idx)):
-                declare(edge, 'edge', _edge_ingredient(G, edge), idx)
+    for pos, kind in enumerate(chart.kinds):
+        if kind == EXTERNAL:
+            for e in chart.out_of(pos):
+                declare(e, 'src', None)
+            for e in chart.into(pos):
+                declare(e, 'snk', None)
+        elif kind == MACHINE:
+            for e in chart.into(pos) + chart.out_of(pos):
+                declare(e, 'edge', chart.node_ids[pos])
+    edge_var = [edge_to_var.get(edge) for edge in edges]
 
     constraints = []
+    fractions = {}                       # recipe quantities repeat a lot
+    zero, one, minus_one = Fraction(0), Fraction(1), Fraction(-1)
+
+    def per_craft(e):
+        qty = chart.edge_qty[e]
+        frac = fractions.get(qty)
+        if frac is None:
+            frac = fractions[qty] = to_frac(qty)
+        return chart.ingredient(e), frac
 
     # Machine ratio constraints. NOTE: unlike graphToEquations (which skips a
     # machine whose input or output side is empty), we couple ALL remaining
@@ -145,59 +180,53 @@ def build_system(G: nx.MultiDiGraph, pins=(), ratio_form: str = 'star') -> Syste
     # input — and without coupling its outputs, hydrogen and oxygen would
     # become independent free variables (observed: solver emitting hydrogen
     # without the mandatory co-produced oxygen).
-    for idx, node in G.nodes.items():
-        nobj = node['object']
-        if isinstance(nobj, ExternalNode) or not isinstance(nobj, MachineNode):
+    for pos, kind in enumerate(chart.kinds):
+        if kind != MACHINE:
             continue
-        in_edges = list(G.in_edges(idx))
-        out_edges = list(G.out_edges(idx))
+        in_edges = chart.into(pos)
+        out_edges = chart.out_of(pos)
         if len(in_edges) + len(out_edges) < 2:
             continue
-
-        def per_craft(edge):
-            ing = _edge_ingredient(G, edge)
-            qty = nobj.I[ing] if edge[1] == idx else nobj.O[ing]
-            return ing, to_frac(qty)
+        idx, nobj = chart.node_ids[pos], chart.objects[pos]
 
         all_edges = in_edges + out_edges
         if ratio_form == 'star':
             ref = all_edges[0]
             ref_ing, ref_qty = per_craft(ref)
-            for edge in all_edges[1:]:
-                ing, qty = per_craft(edge)
+            for e in all_edges[1:]:
+                ing, qty = per_craft(e)
                 # flow(edge)/qty = crafts = flow(ref)/ref_qty
                 constraints.append(Constraint(
-                    terms=((edge_to_var[tuple(edge[:2])], ref_qty),
-                           (edge_to_var[tuple(ref[:2])], -qty)),
-                    rhs=Fraction(0),
+                    terms=((edge_var[e], ref_qty), (edge_var[ref], -qty)),
+                    rhs=zero,
                     tag=('machine_ratio', idx, nobj.m, ref_ing, ing),
                 ))
         else:
-            for in_edge in in_edges:
-                in_ing, in_qty = per_craft(in_edge)
-                for out_edge in out_edges:
-                    out_ing, out_qty = per_craft(out_edge)
+            for in_e in in_edges:
+                in_ing, in_qty = per_craft(in_e)
+                for out_e in out_edges:
+                    out_ing, out_qty = per_craft(out_e)
                     # matches graphToEquations: x_in * (O/I) - x_out == 0
                     constraints.append(Constraint(
-                        terms=((edge_to_var[tuple(in_edge[:2])], out_qty / in_qty),
-                               (edge_to_var[tuple(out_edge[:2])], Fraction(-1))),
-                        rhs=Fraction(0),
+                        terms=((edge_var[in_e], out_qty / in_qty),
+                               (edge_var[out_e], minus_one)),
+                        rhs=zero,
                         tag=('machine_ratio', idx, nobj.m, in_ing, out_ing),
                     ))
 
     # Ingredient balance constraints.
-    for idx, node in G.nodes.items():
-        nobj = node['object']
-        if not isinstance(nobj, IngredientNode):
+    for pos, kind in enumerate(chart.kinds):
+        if kind != INGREDIENT:
             continue
-        in_edges = list(G.in_edges(idx))
-        out_edges = list(G.out_edges(idx))
+        in_edges = chart.into(pos)
+        out_edges = chart.out_of(pos)
         if not in_edges or not out_edges:
             continue
-        terms = ([(edge_to_var[tuple(e[:2])], Fraction(1)) for e in in_edges]
-                 + [(edge_to_var[tuple(e[:2])], Fraction(-1)) for e in out_edges])
+        terms = ([(edge_var[e], one) for e in in_edges]
+                 + [(edge_var[e], minus_one) for e in out_edges])
         constraints.append(Constraint(
-            terms=tuple(terms), rhs=Fraction(0), tag=('balance', nobj.name)))
+            terms=tuple(terms), rhs=zero,
+            tag=('balance', chart.objects[pos].name)))
 
     # User pins: (edge, value) pairs resolved by corpus.load_case.
     for edge, value in pins:
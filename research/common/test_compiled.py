@@ -0,0 +1,41 @@
+"""Compiled charts reproduce exactly what the YAML pipeline builds."""
+
+import pytest
+
+from research.common.compiled import (FORMAT_VERSION, CompiledChart,
+                                      compile_chart, load_compiled)
+from research.common.corpus import load_case
+from research.common.provenance import build_system
+
+
+def _graph_items(G):
+    return ([(n, type(d['object']), d['object']) for n, d in G.nodes(data=True)],
+            list(G.edges(keys=True, data='object')))
+
+
+@pytest.mark.parametrize('name', ['palladium_line', 'testProjects/loopGraph'])
+def test_compiled_chart_round_trips(name, tmp_path):
+    path = compile_chart(name, tmp_path / 'chart.flowc')
+    ref = load_case(name)
+    case, system = load_compiled(path)
+    assert _graph_items(case.graph) == _graph_items(ref.graph)
+    assert case.pins == ref.pins and case.groups == ref.groups
+    assert case.v2_options == ref.v2_options
+    built = build_system(ref.graph, [(p.edge, p.value) for p in ref.pins])
+    assert system.constraints == built.constraints
+    assert system.variables == built.variables
+
+    # Other variants come from the same file via load_case's dispatch.
+    for kw in ({'with_externals': False},
+               {'excluded_sources': {ref.pins[0].ingredient}}):
+        assert _graph_items(load_case(str(path), **kw).graph) == \
+            _graph_items(load_case(name, **kw).graph)
+
+
+def test_compiled_chart_rejects_other_versions(tmp_path):
+    path = compile_chart('testProjects/loopGraph', tmp_path / 'chart.flowc')
+    data = bytearray(path.read_bytes())
+    data[8:12] = (FORMAT_VERSION + 1).to_bytes(4, 'little')
+    path.write_bytes(bytes(data))
+    with pytest.raises(ValueError, match='recompile'):
+        CompiledChart(path)
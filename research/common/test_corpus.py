@@ -0,0 +1,110 @@
+"""The single-pass builder and Case views match the original src.core
+pipeline node for node; the src.core equation forms agree."""
+
+import contextlib
+import io
+
+import pytest
+from pulp import PULP_CBC_CMD, value
+
+from research.common.chartgraph import ChartGraph
+from research.common.corpus import _case_path, list_cases, load_case
+from src.core.addUserLocking import addPulpUserChosenQuantityFromFlow1Yaml
+from src.core.chartIndex import ChartIndex
+from src.core.connectGraph import produceConnectedGraphFromDisjoint
+from src.core.flow1Compat import constructDisjointGraphFromFlow1Yaml
+from src.core.graphToEquations import constructPuLPFromGraph
+from src.core.preProcessing import addExternalNodes, removeIgnorableIngredients
+from src.core.sourceExclusion import SourceExclusionEngine, findExcludableSources
+
+
+def _graph_items(G):
+    return ([(n, type(d['object']), d['object']) for n, d in G.nodes(data=True)],
+            list(G.edges(keys=True, data='object')))
+
+
+def _pipeline(name, with_externals=True, excluded_sources=()):
+    G = constructDisjointGraphFromFlow1Yaml(_case_path(name))
+    G = removeIgnorableIngredients(produceConnectedGraphFromDisjoint(G))
+    return addExternalNodes(G, set(excluded_sources)) if with_externals else G
+
+
+@pytest.mark.parametrize('name', list_cases())
+def test_views_match_the_multi_pass_pipeline(name):
+    case = load_case(name)
+    assert _graph_items(case.graph) == _graph_items(_pipeline(name))
+    assert _graph_items(case.bare().graph) == \
+        _graph_items(_pipeline(name, with_externals=False))
+    excluded = {case.pins[0].ingredient} if case.pins else set()
+    assert _graph_items(case.view(excluded_sources=excluded).graph) == \
+        _graph_items(_pipeline(name, excluded_sources=excluded))
+    # Views are built once and all share pins.
+    assert case.bare() is case.bare() and case.bare().view() is case
+    assert case.bare().pins is case.pins
+
+
+@pytest.mark.parametrize('name', ['palladium_line', 'testProjects/loopGraph'])
+def test_chart_graph_round_trips_and_follows_mutation(name):
+    G = load_case(name).graph
+    chart = ChartGraph.of(G)
+    assert ChartGraph.of(G) is chart
+    assert _graph_items(chart.to_networkx()) == _graph_items(G)
+    for pos, idx in enumerate(chart.node_ids):
+        assert [chart.edge(e) for e in chart.out_of(pos)] == list(G.out_edges(idx))
+        assert [chart.edge(e) for e in chart.into(pos)] == list(G.in_edges(idx))
+    G = G.copy()
+    chart = ChartGraph.of(G)
+    G.remove_node(chart.node_ids[0])
+    assert ChartGraph.of(G) is not chart and len(ChartGraph.of(G)) == len(G)
+
+
+@pytest.mark.parametrize('name', ['palladium_line', 'light_fuel_hydrogen_loop'])
+def test_sparse_equation_forms_match_pairwise(name):
+    def solve(form):
+        G = _pipeline(name)
+        problem, edge_to_variable = constructPuLPFromGraph(G, form)
+        with contextlib.redirect_stdout(io.StringIO()):
+            problem = addPulpUserChosenQuantityFromFlow1Yaml(
+                G, edge_to_variable, problem, _case_path(name))
+            assert problem.solve(PULP_CBC_CMD(msg=0)) == 1
+        return value(problem.objective), len(problem.constraints)
+
+    pairwise, n_pairwise = solve('pairwise')
+    for form in ('star', 'extent'):
+        objective, n_rows = solve(form)
+        assert objective == pytest.approx(pairwise, rel=1e-9)
+        assert n_rows < n_pairwise
+
+
+def test_source_exclusion_engine_matches_rebuilt_charts():
+    name = 'palladium_line'
+    with contextlib.redirect_stdout(io.StringIO()):
+        engine = SourceExclusionEngine(_case_path(name))
+        excluded = findExcludableSources(engine)
+    assert len(excluded) == 8 and 'salt' in excluded
+
+    # A zero upper bound is the same LP as building without those sources.
+    with contextlib.redirect_stdout(io.StringIO()):
+        G = _pipeline(name, excluded_sources=excluded)
+        problem, edge_to_variable = constructPuLPFromGraph(G, 'star')
+        problem = addPulpUserChosenQuantityFromFlow1Yaml(
+            G, edge_to_variable, problem, _case_path(name))
+        assert problem.solve(PULP_CBC_CMD(msg=0)) == 1
+    engine.solve(excluded)
+    assert engine.h.getObjectiveValue() == pytest.approx(value(problem.objective), rel=1e-6)
+
+
+def test_chart_index_is_shared_and_follows_mutation():
+    G = _pipeline('palladium_line', with_externals=False)
+    index = ChartIndex.of(G)
+    assert ChartIndex.of(G) is index
+    machines = [n for n, k in index.kind.items() if k == 'machine']
+    assert machines == index.machine_nodes
+    for idx in machines:
+        nobj = G.nodes[idx]['object']
+        for (direction, ing), (u, v) in index.machine_edges[idx].items():
+            assert ing in getattr(nobj, direction)
+            assert G.nodes[v if direction == 'O' else u]['object'].name == ing
+    addExternalNodes(G)
+    assert ChartIndex.of(G) is not index
+    assert 'external' in ChartIndex.of(G).kind.values()
@@ -0,0 +1,31 @@
+"""Opt-in profiling spans: nesting, self time, Chrome trace export."""
+
+from research.common import profiling
+from research.common.corpus import load_case
+from research.common.provenance import build_system
+from research.q1_milp.lexicographic import solve_lexicographic
+
+
+def test_profiling_spans_nest_and_export():
+    """Opt-in spans cover load -> build -> every stage; self time never
+    exceeds total, and the Chrome trace has one event per span."""
+    collector = profiling.enable()
+    try:
+        case = load_case('mk1')
+        system = build_system(case.graph,
+                              [(p.edge, p.value) for p in case.pins])
+        solve_lexicographic(system)
+    finally:
+        profiling.disable()
+    totals = collector.totals()
+    for name in ('corpus.load_case', 'provenance.build_system',
+                 'lexicographic.solve_lexicographic', 'lex.stage1',
+                 'lex.stage2', 'lex.stage3', 'highs.run'):
+        assert name in totals, name
+    for calls, total, own in totals.values():
+        assert 0.0 <= own <= total + 1e-9
+    solve_total = totals['lexicographic.solve_lexicographic'][1]
+    assert totals['highs.run'][1] <= solve_total
+    trace = collector.to_chrome_trace()['traceEvents']
+    assert len(trace) == len(collector.spans)
+    assert profiling.span('off') is profiling.span('also off')
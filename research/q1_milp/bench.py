@@ -1,8 +1,22 @@
-"""Solver benchmark: corpus x backends -> research/q1_milp/bench_results.md.
-Run: uv run python -m research.q1_milp.bench
+"""Solver benchmark: corpus x backends -> research/q1_milp/bench_results.md
+(+ bench_results.json / .csv with per-stage timings).
+
+Every (case, backend) pair runs in its own process, --jobs at a time, and is
+killed after --timeout seconds, so the run is bounded by the slowest single
+job rather than the sum (CBC alone spends ~30s DNF-ing palladium_line), and
+a solver crash or hang costs one cell, not the run.
+
+Run: uv run python -m research.q1_milp.bench [--jobs N] [--timeout S]
 """
 
+import argparse
+import csv
+import importlib
+import json
+import multiprocessing
+import os
 import time
+from multiprocessing.connection import wait
 from pathlib import Path
 
 from research.common.corpus import list_cases, load_case
@@ -12,9 +26,101 @@ from research.q1_milp.solvers import validate_solution
 
 BACKENDS = ['cbc', 'highs', 'scip']
 OUT = Path(__file__).with_name('bench_results.md')
+# Four 15s stages plus big-M retries; anything past this is a hang.
+JOB_TIMEOUT_S = 120
+# Then one column per stage_walls key any row has (exact, native, ...).
+CSV_FIELDS = ['case', 'backend', 'status', 'machines', 'gates',
+              'machines_used', 'floors_dropped', 'validated', 'wall']
 
 
-def main():
+def run_job(name, backend) -> dict:
+    """Solve one (case, backend) pair; wall covers solve_lexicographic only,
+    not YAML loading or System building."""
+    case = load_case(name)
+    system = build_system(case.graph, [(p.edge, p.value) for p in case.pins])
+    t0 = time.perf_counter()
+    r = solve_lexicographic(system, backend=backend)
+    wall = time.perf_counter() - t0
+    row = {'case': name, 'backend': backend, 'status': r.status,
+           'machines': r.machines_total, 'wall': round(wall, 3),
+           'stage_walls': {k: round(v, 3) for k, v in r.stage_walls.items()}}
+    if r.status == 'optimal':
+        row.update(gates=r.source_count, machines_used=r.machines_used,
+                   floors_dropped=r.machines_used < r.machines_total,
+                   validated=validate_solution(system, r.values)['ok'])
+    return row
+
+
+def _worker(conn, name, backend):
+    try:
+        row = run_job(name, backend)
+    except Exception as exc:
+        row = {'case': name, 'backend': backend, 'status': 'error',
+               'error': f'{type(exc).__name__}: {exc}'}
+    conn.send(row)
+    conn.close()
+
+
+def run_parallel(jobs, n_jobs=None, timeout=JOB_TIMEOUT_S) -> list:
+    """Run (case, backend) jobs in separate processes, n_jobs at a time.
+    Jobs over `timeout` are killed and reported as status 'timeout'; rows
+    come back in job order."""
+    n_jobs = n_jobs or os.cpu_count() or 1
+    # Import the solver libraries once here: forked workers inherit them
+    # instead of paying ~0.3s each inside their timed solve.
+    for package in ('highspy', 'pulp', 'pyscipopt'):
+        importlib.import_module(package)
+    queue = list(enumerate(jobs))
+    running = {}            # conn -> (index, job, process, started)
+    rows = [None] * len(jobs)
+    while queue or running:
+        while queue and len(running) < n_jobs:
+            index, (name, backend) = queue.pop(0)
+            recv, send = multiprocessing.Pipe(duplex=False)
+            proc = multiprocessing.Process(target=_worker,
+                                           args=(send, name, backend))
+            proc.start()
+            send.close()
+            running[recv] = (index, (name, backend), proc, time.monotonic())
+        next_deadline = min(started + timeout
+                            for *_, started in running.values())
+        wait(list(running), max(0.0, next_deadline - time.monotonic()))
+        now = time.monotonic()
+        for conn, (index, (name, backend), proc, started) in \
+                list(running.items()):
+            if conn.poll():
+                try:
+                    row = conn.recv()
+                except EOFError:          # died without reporting
+                    row = {'case': name, 'backend': backend,
+                           'status': 'error', 'error': 'worker crashed'}
+            elif now - started >= timeout:
+                proc.kill()
+                row = {'case': name, 'backend': backend, 'status': 'timeout',
+                       'wall': round(now - started, 3)}
+            else:
+                continue
+            proc.join()
+            conn.close()
+            del running[conn]
+            rows[index] = row
+            print(f'  {name} {backend}: {row["status"]} '
+                  f'{row.get("wall", "")}')
+    return rows
+
+
+def _cell(row) -> str:
+    if row['status'] != 'optimal':
+        wall = f', {row["wall"]:.1f}s' if 'wall' in row else ''
+        return f'DNF ({row["status"]}{wall})'
+    cell = (f'{row["gates"]} / {row["machines_used"]}m / {row["wall"]:.2f}s / '
+            f'{"yes" if row["validated"] else "NO"}')
+    if row['floors_dropped']:
+        cell += ' (floors dropped)'
+    return cell
+
+
+def write_markdown(rows, cases, backends, path=OUT):
     lines = ['# Solver benchmark (zero-config lexicographic MILP)',
              '',
              'All charts solved with target pins only, uniform weights, '
@@ -27,32 +133,51 @@ def main():
              'floor-free answer (fewer gates, idle machines).',
              '',
              '| case | machines | ' +
-             ' | '.join(f'{b}' for b in BACKENDS) + ' |',
-             '|---|---|' + '---|' * len(BACKENDS)]
-    for name in list_cases():
-        case = load_case(name)
-        pins = [(p.edge, p.value) for p in case.pins]
-        system = build_system(case.graph, pins)
-        cells = []
-        machines = None
-        for backend in BACKENDS:
-            t0 = time.perf_counter()
-            r = solve_lexicographic(system, backend=backend)
-            wall = time.perf_counter() - t0
-            machines = r.machines_total
-            if r.status != 'optimal':
-                cells.append(f'DNF ({r.status}, {wall:.1f}s)')
-                continue
-            ok = validate_solution(system, r.values)['ok']
-            cell = (f'{r.source_count} / {r.machines_used}m / {wall:.2f}s / '
-                    f'{"yes" if ok else "NO"}')
-            if r.machines_used < r.machines_total:
-                cell += ' (floors dropped)'
-            cells.append(cell)
-        lines.append(f'| {name} | {machines} | ' + ' | '.join(cells) + ' |')
-        print(lines[-1])
-    OUT.write_text('\n'.join(lines) + '\n')
-    print(f'\nwrote {OUT}')
+             ' | '.join(f'{b}' for b in backends) + ' |',
+             '|---|---|' + '---|' * len(backends)]
+    by_key = {(row['case'], row['backend']): row for row in rows}
+    for name in cases:
+        case_rows = [by_key[name, b] for b in backends]
+        machines = max((row['machines'] for row in case_rows
+                        if row.get('machines')), default='?')
+        lines.append(f'| {name} | {machines} | ' +
+                     ' | '.join(_cell(row) for row in case_rows) + ' |')
+    path.write_text('\n'.join(lines) + '\n')
+
+
+def write_machine_readable(rows, path=OUT):
+    path.with_suffix('.json').write_text(json.dumps(rows, indent=1) + '\n')
+    stages = sorted({stage for row in rows
+                     for stage in row.get('stage_walls', {})})
+    with open(path.with_suffix('.csv'), 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=CSV_FIELDS + stages)
+        writer.writeheader()
+        for row in rows:
+            flat = {k: row.get(k, '') for k in CSV_FIELDS}
+            flat.update(row.get('stage_walls', {}))
+            writer.writerow(flat)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--case', help='single case instead of full corpus')
+    parser.add_argument('--backend', choices=BACKENDS,
+                        help='single backend instead of all')
+    parser.add_argument('--jobs', type=int, default=None,
+                        help='parallel jobs (default: CPU count)')
+    parser.add_argument('--timeout', type=float, default=JOB_TIMEOUT_S,
+                        help='seconds before a job is killed')
+    args = parser.parse_args()
+    cases = [args.case] if args.case else list_cases()
+    backends = [args.backend] if args.backend else BACKENDS
+
+    t0 = time.perf_counter()
+    rows = run_parallel([(c, b) for c in cases for b in backends],
+                        args.jobs, args.timeout)
+    write_markdown(rows, cases, backends)
+    write_machine_readable(rows)
+    print(f'\nwrote {OUT} (+ .json, .csv) in '
+          f'{time.perf_counter() - t0:.1f}s')
 
 
 if __name__ == '__main__':
@@ -0,0 +1,260 @@
+"""On-disk cache of solve_lexicographic results.
+
+Re-rendering a chart with another layout engine or theme re-solved the same
+multi-stage MILP every time (1.4s on palladium_line). Results are keyed by a
+canonical hash of the exact System — sorted variables, sorted Fraction
+coefficients, rhs and provenance tags, so pins are covered — plus the solve
+options and a version key. Bump CACHE_VERSION whenever the formulation or
+stage logic changes in a way that alters answers; solver library versions
+and the lexicographic tolerances are part of the key automatically.
+
+Only 'optimal' results are stored: a timeout depends on the machine and the
+load at the time, not on the chart.
+
+Users iterate on target rates, and every edit is a new key. So each stored
+result is also filed under its chart's shape — the key with the pin values
+left out — together with those values. A miss whose shape is on file and
+whose pins all moved by the same factor (always, with the usual single
+pin) is the stored result rescaled, without any solver
+(lexicographic.rescale_result). On request (inherit_support) other pin
+changes keep the stored gate support and re-solve only stages 2-3, as
+LPs; that support is not re-minimized, which the result reports.
+"""
+
+import dataclasses
+import hashlib
+import json
+import os
+import tempfile
+from fractions import Fraction
+from importlib import metadata
+from pathlib import Path
+
+from research.common.profiling import span
+from research.common.provenance import System
+from research.q1_milp import lexicographic
+from research.q1_milp.decompose import solve_decomposed
+from research.q1_milp.lexicographic import LexResult, rescale_result
+from research.q1_milp.solvers import RACE_BACKENDS
+
+CACHE_VERSION = 3
+DEFAULT_DIR = Path(os.environ.get('XDG_CACHE_HOME', '~/.cache')).expanduser() \
+    / 'flowv2' / 'lex'
+DEFAULT_MAX_BYTES = 256 * 2 ** 20
+
+# Module constants that change answers without changing the System.
+_TUNING = ('DEFAULT_M', 'QTY_EPS', 'ZERO', 'USE_EPS', 'USE_EPS_DETECT',
+           'STAGE_TIME_LIMIT', 'SNK_WEIGHT', 'SRC_TIEBREAK')
+_SOLVER_PACKAGES = {'highs': 'highspy', 'cbc': 'pulp', 'scip': 'pyscipopt'}
+
+
+def _frac(value) -> str:
+    return f'{value.numerator}/{value.denominator}'
+
+
+def system_fingerprint(system: System, pins: bool = True) -> str:
+    """sha256 over a canonical text form of the System: independent of
+    constraint order and term order, exact in the coefficients. pins=False
+    leaves the pin values out (the chart's shape)."""
+    lines = []
+    G = system.graph
+    machines = set()
+    for name in sorted(system.variables):
+        info = system.variables[name]
+        lines.append(f'v|{name}|{info.kind}|{info.edge}|{info.ingredient}|'
+                     f'{info.machine_idx}')
+        if info.machine_idx is not None:
+            machines.add(info.machine_idx)
+    # The stage-0 floors read per-craft quantities off the machine objects.
+    for idx in sorted(machines):
+        nobj = G.nodes[idx]['object']
+        lines.append(f'm|{idx}|{nobj.m}|{sorted(nobj.I.items())}|'
+                     f'{sorted(nobj.O.items())}')
+    rows = []
+    for con in system.constraints:
+        terms = ','.join(f'{v}:{_frac(c)}' for v, c in sorted(con.terms))
+        rhs = _frac(con.rhs) if pins or con.tag[0] != 'pin' else '*'
+        rows.append(f'c|{terms}|{rhs}|{con.tag!r}')
+    lines.extend(sorted(rows))
+    return hashlib.sha256('\n'.join(lines).encode()).hexdigest()
+
+
+def _version_key(backend: str) -> str:
+    backends = RACE_BACKENDS if backend == 'race' else (backend,)
+    versions = []
+    for name in backends:
+        package = _SOLVER_PACKAGES.get(name, name)
+        try:
+            versions.append(f'{package}={metadata.version(package)}')
+        except metadata.PackageNotFoundError:
+            versions.append(f'{package}=unknown')
+    tuning = {name: getattr(lexicographic, name) for name in _TUNING}
+    return f'{CACHE_VERSION}|{",".join(versions)}|{sorted(tuning.items())}'
+
+
+def pin_values(system: System) -> list:
+    """(pinned variable, value) per pin row, in a canonical order."""
+    return sorted((con.tag[1], con.rhs) for con in system.constraints
+                  if con.tag[0] == 'pin')
+
+
+def pin_factor(old: list, new: list):
+    """The factor f > 0 with new = f * old for every pin, or None. old and
+    new are pin_values of two systems of one shape."""
+    factor = None
+    for (var, a), (other, b) in zip(old, new):
+        if var != other or (a == 0) != (b == 0):
+            return None
+        if a != 0:
+            if factor is None:
+                factor = b / a
+            elif b / a != factor:
+                return None
+    return factor if factor is not None and factor > 0 else None
+
+
+def solve_key(system: System, backend: str = 'highs', pins: bool = True,
+              **options) -> str:
+    """Cache key for solve_lexicographic(system, backend, **options);
+    pins=False gives the shape key (see system_fingerprint)."""
+    support = options.get('gate_support')
+    if support is not None:
+        options['gate_support'] = {k: sorted(v) for k, v in support.items()}
+    options.pop('msg', None)
+    payload = json.dumps({'system': system_fingerprint(system, pins),
+                          'backend': backend,
+                          'version': _version_key(backend),
+                          'options': options}, sort_keys=True, default=repr)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def _decode(data: dict) -> LexResult:
+    for name in ('terminal_sources', 'terminal_sinks', 'idle_machines'):
+        if data.get(name) is not None:
+            data[name] = [tuple(item) for item in data[name]]
+    return LexResult(**data)
+
+
+class SolveCache:
+    """One JSON file per result under `root`, and one per shape under
+    root/shapes. Hits refresh the file's mtime; puts evict least-recently-
+    used files until the directory is under max_bytes."""
+
+    def __init__(self, root=DEFAULT_DIR, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+
+    def _path(self, key: str) -> Path:
+        return self.root / f'{key}.json'
+
+    def _shape_path(self, key: str) -> Path:
+        return self.root / 'shapes' / f'{key}.json'
+
+    def _read(self, path: Path):
+        try:
+            data = json.loads(path.read_text())
+        except (OSError, ValueError):
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass           # evicted by another process since the read
+        return data
+
+    def _write(self, path: Path, data):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Write-then-rename: concurrent readers never see a partial file.
+        fd, tmp = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+        with os.fdopen(fd, 'w') as f:
+            json.dump(data, f)
+        os.replace(tmp, path)
+        self.evict()
+
+    def get(self, key: str):
+        data = self._read(self._path(key))
+        return None if data is None else _decode(data)
+
+    def put(self, key: str, result: LexResult):
+        self._write(self._path(key), dataclasses.asdict(result))
+
+    def get_shape(self, key: str):
+        """(pin values, result) last filed under this shape key, or None."""
+        data = self._read(self._shape_path(key))
+        if data is None:
+            return None
+        pins = [(var, Fraction(value)) for var, value in data['pins']]
+        return pins, _decode(data['result'])
+
+    def put_shape(self, key: str, pins: list, result: LexResult):
+        self._write(self._shape_path(key),
+                    {'pins': [(var, _frac(value)) for var, value in pins],
+                     'result': dataclasses.asdict(result)})
+
+    def evict(self):
+        entries = []
+        for path in self.root.rglob('*.json'):
+            try:
+                st = path.stat()
+            except OSError:
+                continue          # removed by a concurrent evict
+            entries.append((st.st_mtime, st.st_size, path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+
+
+def _retarget(system: System, backend: str, pins: list, shape,
+              options: dict, inherit_support: bool):
+    """A result for system from the one filed under its shape, or None."""
+    base_pins, base = shape
+    factor = pin_factor(base_pins, pins)
+    if factor is not None:
+        with span('cache.rescale'):
+            return rescale_result(base, float(factor))
+    if not inherit_support or base.source_count == 0:
+        return None        # the gateless fast paths already skip the MILP
+    support = options.get('gate_support') or {'sources': base.gated_sources,
+                                              'sinks': base.gated_sinks}
+    with span('cache.retarget'):
+        result = solve_decomposed(system, backend=backend,
+                                  **{**options, 'gate_support': support})
+    if result.status != 'optimal':
+        return None
+    if 'gate_support' not in options:
+        # Optimal for other pins: a good support, not a proven minimum
+        result = dataclasses.replace(result, support_inherited=True)
+    return result
+
+
+def solve_cached(system: System, backend: str = 'highs',
+                 cache: SolveCache = None, retarget: bool = True,
+                 inherit_support: bool = False, **options) -> LexResult:
+    """solve_lexicographic (block-wise, see decompose) through the cache.
+    cache=None uses the default directory; pass SolveCache(...) to relocate
+    or resize it. retarget=False re-solves on every pin change instead of
+    rescaling the shape's stored result. inherit_support=True also reuses
+    the stored gate support when the pins did not all move by one factor;
+    such results have support_inherited set."""
+    cache = cache or SolveCache()
+    with span('cache.lookup'):
+        key = solve_key(system, backend, **options)
+        hit = cache.get(key)
+    if hit is not None:
+        return hit
+    pins = pin_values(system)
+    with span('cache.lookup', shape=True):
+        shape_key = solve_key(system, backend, pins=False, **options)
+        shape = cache.get_shape(shape_key) if retarget else None
+    if shape is not None:
+        result = _retarget(system, backend, pins, shape, options,
+                           inherit_support)
+        if result is not None:
+            return result
+    result = solve_decomposed(system, backend=backend, **options)
+    if result.status == 'optimal':
+        cache.put(key, result)
+        cache.put_shape(shape_key, pins, result)
+    return result
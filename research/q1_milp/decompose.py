@@ -0,0 +1,122 @@
+"""Solve independent blocks of a chart separately and stitch the results.
+
+A chart whose constraint-variable graph falls apart into several connected
+components (System.components) is several charts sharing a canvas: no row
+couples them, so every lexicographic stage objective is a sum of per-block
+terms and the stacked per-block optima are an optimum of the whole. Solving
+blocks separately keeps each MILP small and spreads the blocks over
+worker processes.
+
+One honest difference from the monolithic solve: stage-0 floors are
+scaled per block (to that block's slowest running machine) instead of to
+the slowest machine of the whole chart.
+
+The flow1 corpus charts are all a single component, where this is exactly
+solve_lexicographic. Synthetic mega-charts (research.synthetic) and user
+bases made of several unrelated production lines split into dozens to
+hundreds of blocks.
+"""
+
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from research.common.profiling import profiled, span
+from research.common.provenance import System
+from research.q1_milp.lexicographic import LexResult, solve_lexicographic
+from research.q1_milp.solvers import process_context
+
+# Below this many variables in total, worker start-up (a forkserver child
+# imports the solver stack) costs more than the blocks take to solve.
+PARALLEL_MIN_VARS = 2000
+
+
+def _solve_blocks(blocks, options) -> list:
+    return [solve_lexicographic(block, **options) for block in blocks]
+
+
+def _partition(blocks, n_jobs) -> list:
+    """Largest-first greedy split of blocks into n_jobs groups of similar
+    total size; one group per worker so the graph is pickled once each."""
+    groups = [[] for _ in range(n_jobs)]
+    sizes = [0] * n_jobs
+    for block in blocks:           # already largest first
+        k = sizes.index(min(sizes))
+        groups[k].append(block)
+        sizes[k] += len(block.variables)
+    return [g for g in groups if g]
+
+
+def stitch(results: list, backend: str) -> LexResult:
+    """Combine per-block LexResults into one for the whole chart. Objective
+    values and counts add up; stage walls are summed solver time. The first
+    block that did not solve (largest first) decides the status."""
+    failed = next((r for r in results if r.status != 'optimal'), None)
+    values = {}
+    for r in results:
+        values.update(r.values)
+    walls = {}
+    for r in results:
+        for stage, seconds in r.stage_walls.items():
+            walls[stage] = walls.get(stage, 0.0) + seconds
+    big_m = max((r.big_m for r in results), default=0.0)
+    machines_total = sum(r.machines_total for r in results)
+    certified = all(r.count_certified for r in results)
+    if failed is not None:
+        return LexResult(failed.status, values, [], [], [], [],
+                         failed.source_count, math.nan, math.nan, walls,
+                         big_m, backend, machines_total=machines_total,
+                         floors_used=any(r.floors_used for r in results),
+                         count_certified=certified)
+    floors, gate_m = {}, {}
+    for r in results:
+        floors.update(r.floors or {})
+        gate_m.update(r.gate_m or {})
+    return LexResult(
+        'optimal', values,
+        sorted(i for r in results for i in r.gated_sources),
+        sorted(i for r in results for i in r.gated_sinks),
+        sorted(t for r in results for t in r.terminal_sources),
+        sorted(t for r in results for t in r.terminal_sinks),
+        sum(r.source_count for r in results),
+        sum(r.external_quantity for r in results),
+        sum(r.total_flow for r in results),
+        walls, big_m, backend,
+        leak_detected=any(r.leak_detected for r in results),
+        machines_total=machines_total,
+        machines_used=sum(r.machines_used for r in results),
+        idle_machines=sorted(m for r in results for m in r.idle_machines or ()),
+        floors_used=any(r.floors_used for r in results),
+        count_certified=certified,
+        floors=floors or None, gate_m=gate_m or None)
+
+
+@profiled()
+def solve_decomposed(system: System, backend: str = 'highs',
+                     n_jobs: int = None, **options) -> LexResult:
+    """solve_lexicographic per independent block, stitched. Single-block
+    systems go straight to solve_lexicographic. n_jobs: worker processes
+    (default: one per CPU); small charts and backend='race' (whose racers
+    are child processes already) solve their blocks in this process."""
+    with span('decompose.split'):
+        blocks = system.components()
+    if len(blocks) == 1:
+        return solve_lexicographic(system, backend, **options)
+    options = {'backend': backend, **options}
+    n_jobs = min(n_jobs or os.cpu_count() or 1, len(blocks))
+    with span('decompose.solve', blocks=len(blocks), n_jobs=n_jobs):
+        if n_jobs == 1 or backend == 'race' or \
+                len(system.variables) < PARALLEL_MIN_VARS:
+            results = _solve_blocks(blocks, options)
+        else:
+            groups = _partition(blocks, n_jobs)
+            with ProcessPoolExecutor(len(groups),
+                                     mp_context=process_context()) as pool:
+                futures = [pool.submit(_solve_blocks, g, options)
+                           for g in groups]
+                by_block = {}
+                for group, future in zip(groups, futures):
+                    for block, result in zip(group, future.result()):
+                        by_block[id(block)] = result
+            results = [by_block[id(block)] for block in blocks]
+    return stitch(results, backend)
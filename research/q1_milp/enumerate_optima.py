@@ -4,19 +4,25 @@ UX rationale: equal-count (and even equal-quantity) optima are real — e.g.
 palladium_line can source `formic acid` or its 1:1 precursor
 `carbon monoxide` interchangeably. A tool should present such choices, not
 pick silently.
+
+The model is built once: each found support only appends its no-good row to
+a live solver Session. The previous optimum is deliberately not used as a
+MIP start — the new cut makes it infeasible, and HiGHS's repair attempt on
+an infeasible start perturbs the search rather than shortening it.
 """
 
 from research.common.provenance import System
 from research.q1_milp.lexicographic import (
     STAGE_TIME_LIMIT, ZERO, _base_model, _flow_support, _gate_map, DEFAULT_M,
     SNK_WEIGHT, SRC_TIEBREAK)
-from research.q1_milp.solvers import solve
+from research.q1_milp.solvers import open_session
 
 
 def enumerate_optimal_supports(system: System, backend: str = 'highs',
-                               big_m: float = DEFAULT_M, max_solutions: int = 10,
+                               big_m=DEFAULT_M, max_solutions: int = 10,
                                prefer_sinks: bool = True,
-                               floors: dict = None) -> list:
+                               floors: dict = None,
+                               gate_encoding: str = 'big_m') -> list:
     # max_solutions=10 per user feedback: ONE prompt with up to ~10 choices
     # is acceptable UX; anything beyond that should not be asked.
     """Return every gate support achieving the stage-1 optimum, as
@@ -24,8 +30,17 @@ def enumerate_optimal_supports(system: System, backend: str = 'highs',
 
     floors: pass LexResult.floors so enumeration runs under the same
     all-machines-run conditions as the solve — otherwise it enumerates the
-    floor-free (bootstrap) optima, which have a different gate count."""
+    floor-free (bootstrap) optima, which have a different gate count.
+
+    big_m: one M for every gate, or LexResult.gate_m so the link rows carry
+    the Ms the solve ended with (grown, or per gate); gates missing from it
+    (blocks solved without a MILP) get DEFAULT_M.
+
+    gate_encoding: as in solve_lexicographic."""
     gates = _gate_map(system)
+    if isinstance(big_m, dict):
+        big_m = {**{gate[kind]: DEFAULT_M for gate in gates.values()
+                    for kind in ('src', 'snk') if kind in gate}, **big_m}
 
     weights = {}
     for gate in gates.values():
@@ -34,27 +49,17 @@ def enumerate_optimal_supports(system: System, backend: str = 'highs',
         if 'y_snk' in gate:
             weights[gate['y_snk']] = SNK_WEIGHT
 
-    cuts = []
+    session = open_session(_base_model(system, gates, big_m, gate_encoding),
+                           backend, system=system)
+    session.set_bounds({ref: (floor, None)
+                        for ref, floor in (floors or {}).items()})
+    session.set_objective(weights)
+
     best_obj = None
     solutions = []
     while len(solutions) < max_solutions:
-        model = _base_model(system, gates, big_m)
-        model.highs_presolve_off = True
-        for ref, floor in (floors or {}).items():
-            model.bounds[ref] = (floor, None)
-        model.objective = dict(weights)
-        for i, support in enumerate(cuts):
-            # forbid this exact support: sum_{on}(1-y) + sum_{off} y >= 1
-            terms = {}
-            rhs = 1.0
-            for y, on in support.items():
-                if on:
-                    terms[y] = -1.0
-                    rhs -= 1.0
-                else:
-                    terms[y] = 1.0
-            model.add(terms, '>=', rhs, name=f'nogood{i}')
-        result = solve(model, backend, time_limit=STAGE_TIME_LIMIT)
+        result = session.solve(STAGE_TIME_LIMIT, presolve_off=True,
+                               warm_start=False)
         if result.status != 'optimal':
             break
         if best_obj is None:
@@ -67,7 +72,16 @@ def enumerate_optimal_supports(system: System, backend: str = 'highs',
         expected = sum(weights[y] for y, on in support.items() if on)
         if expected > result.objective + 0.5:
             break
-        cuts.append(support)
+        # forbid this exact support: sum_{on}(1-y) + sum_{off} y >= 1
+        terms = {}
+        rhs = 1.0
+        for y, on in support.items():
+            if on:
+                terms[y] = -1.0
+                rhs -= 1.0
+            else:
+                terms[y] = 1.0
+        session.add_row(terms, '>=', rhs, name=f'nogood{len(solutions)}')
         by_ing = {'sources': [], 'sinks': []}
         for ing, gate in sorted(gates.items()):
             if support.get(gate.get('y_src', ''), 0):
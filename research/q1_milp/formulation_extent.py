@@ -14,21 +14,22 @@ from fractions import Fraction
 
 import networkx as nx
 
+from research.common.chartgraph import EXTERNAL, INGREDIENT, MACHINE, ChartGraph
 from research.common.provenance import (Constraint, System, VariableInfo,
                                         to_frac)
-from src.data.basicTypes import ExternalNode, IngredientNode, MachineNode
 
 
 def build_extent_system(G: nx.MultiDiGraph, pins=()) -> System:
+    chart = ChartGraph.of(G)
     variables = {}
     edge_to_var = {}
     counters = {'src': 0, 'snk': 0}
 
     machine_t = {}
-    for idx, node in G.nodes.items():
-        nobj = node['object']
-        if isinstance(nobj, ExternalNode) or not isinstance(nobj, MachineNode):
+    for pos, kind in enumerate(chart.kinds):
+        if kind != MACHINE:
             continue
+        idx, nobj = chart.node_ids[pos], chart.objects[pos]
         name = f't{idx}'
         machine_t[idx] = name
         # Register t_m as an 'edge' variable whose per-craft quantity is 1:
@@ -40,43 +41,45 @@ def build_extent_system(G: nx.MultiDiGraph, pins=()) -> System:
         edge = (-1, idx) if first_ing in nobj.I else (idx, -1)
         variables[name] = VariableInfo(name, 'edge', edge, first_ing, idx)
 
-    def _external_var(edge, kind, ingredient):
+    def _external_var(e, kind):
         name = f'{kind}{counters[kind]}'
         counters[kind] += 1
-        variables[name] = VariableInfo(name, kind, tuple(edge[:2]), ingredient, None)
-        edge_to_var[tuple(edge[:2])] = name
+        edge = chart.edge(e)
+        variables[name] = VariableInfo(name, kind, edge, chart.ingredient(e), None)
+        edge_to_var[edge] = name
         return name
 
-    for idx, node in G.nodes.items():
-        nobj = node['object']
-        if isinstance(nobj, ExternalNode):
-            for edge in G.out_edges(idx):
-                key = edge[2] if len(edge) == 3 else 0
-                ing = G.edges[edge[0], edge[1], key]['object'].name
-                _external_var(edge, 'src', ing)
-            for edge in G.in_edges(idx):
-                key = edge[2] if len(edge) == 3 else 0
-                ing = G.edges[edge[0], edge[1], key]['object'].name
-                _external_var(edge, 'snk', ing)
+    for pos, kind in enumerate(chart.kinds):
+        if kind == EXTERNAL:
+            for e in chart.out_of(pos):
+                _external_var(e, 'src')
+            for e in chart.into(pos):
+                _external_var(e, 'snk')
 
     constraints = []
-    for idx, node in G.nodes.items():
-        nobj = node['object']
-        if not isinstance(nobj, IngredientNode):
+    kinds = chart.kinds
+    for pos, kind in enumerate(kinds):
+        if kind != INGREDIENT:
             continue
-        ing = nobj.name
+        ing = chart.objects[pos].name
+        in_edges, out_edges = chart.into(pos), chart.out_of(pos)
+        # Only machines adjacent to the ingredient node mention it.
+        machines = sorted({chart.edge_u[e] for e in in_edges
+                           if kinds[chart.edge_u[e]] == MACHINE} |
+                          {chart.edge_v[e] for e in out_edges
+                           if kinds[chart.edge_v[e]] == MACHINE})
         terms = {}
-        for m_idx, t_name in machine_t.items():
-            mobj = G.nodes[m_idx]['object']
+        for m_pos in machines:
+            mobj = chart.objects[m_pos]
             coeff = to_frac(mobj.O.get(ing, 0)) - to_frac(mobj.I.get(ing, 0))
             if coeff:
-                terms[t_name] = terms.get(t_name, Fraction(0)) + coeff
-        for edge in G.in_edges(idx):
-            if isinstance(G.nodes[edge[0]]['object'], ExternalNode):
-                terms[edge_to_var[tuple(edge[:2])]] = Fraction(1)
-        for edge in G.out_edges(idx):
-            if isinstance(G.nodes[edge[1]]['object'], ExternalNode):
-                terms[edge_to_var[tuple(edge[:2])]] = Fraction(-1)
+                terms[machine_t[chart.node_ids[m_pos]]] = coeff
+        for e in in_edges:
+            if kinds[chart.edge_u[e]] == EXTERNAL:
+                terms[edge_to_var[chart.edge(e)]] = Fraction(1)
+        for e in out_edges:
+            if kinds[chart.edge_v[e]] == EXTERNAL:
+                terms[edge_to_var[chart.edge(e)]] = Fraction(-1)
         if not terms:
             continue
         constraints.append(Constraint(terms=tuple(terms.items()),
@@ -103,21 +106,14 @@ def build_extent_system(G: nx.MultiDiGraph, pins=()) -> System:
 
 def derived_edge_flows(system: System, values: dict) -> dict:
     """(u, v) -> flow for every machine<->ingredient edge, from extents."""
-    G = system.graph
+    chart = ChartGraph.of(system.graph)
     flows = {}
-    for idx, node in G.nodes.items():
-        nobj = node['object']
-        if isinstance(nobj, ExternalNode) or not isinstance(nobj, MachineNode):
+    for pos, kind in enumerate(chart.kinds):
+        if kind != MACHINE:
             continue
-        t = values.get(f't{idx}', 0.0)
-        for edge in G.in_edges(idx):
-            key = edge[2] if len(edge) == 3 else 0
-            ing = G.edges[edge[0], edge[1], key]['object'].name
-            flows[tuple(edge[:2])] = float(nobj.I[ing]) * t
-        for edge in G.out_edges(idx):
-            key = edge[2] if len(edge) == 3 else 0
-            ing = G.edges[edge[0], edge[1], key]['object'].name
-            flows[tuple(edge[:2])] = float(nobj.O[ing]) * t
+        t = values.get(f't{chart.node_ids[pos]}', 0.0)
+        for e in chart.into(pos) + chart.out_of(pos):
+            flows[chart.edge(e)] = float(chart.edge_qty[e]) * t
     for info in system.variables.values():
         if info.kind in ('src', 'snk'):
             flows[info.edge] = values.get(info.name, 0.0)
@@ -24,15 +24,43 @@ Two hard-won correctness details (see research.md):
   exploit to reroute around the chain.
 - Stage 3 only runs with the gates that carried flow in stage 2; otherwise
   "minimize flow" rediscovers the degenerate dump-to-sink solutions.
+
+Big-M is one global M per solve: every gate link starts at big_m, and
+stage 1 retries with M x10 (at most max_m_growths times) while it is
+infeasible or presses a gated flow against M. No valid tighter M exists in
+general: with a source and a sink on every ingredient, a gated flow is
+bounded only by the optimum it is part of.
+
+Most charts need no intermediate gate at all. solve_lexicographic first
+solves stage 2 as an LP with every gate shut (same floor pass): if that is
+feasible with all machines running, count 0 is certified and no binaries
+are ever built (lp_fast_path).
+
+gate_encoding='indicator' drops the link rows altogether for native
+indicator constraints (y = 0 forces the flow to 0), on the backends in
+solvers.INDICATOR_BACKENDS. No M means no leak window and no growth;
+the flow-derived support checks stay, as they cost nothing.
+
+The base model is built once per solve and every stage, floor pass and
+M update is applied to one solver Session as deltas (bounds, objective,
+cap rows, link coefficients). With HiGHS the model stays live and warm
+starts from the previous stage; other backends rebuild per solve.
 """
 
+import dataclasses
 import math
+import time
 from dataclasses import dataclass
 
+from research.common.profiling import profiled, span
 from research.common.provenance import System
-from research.q1_milp.solvers import Model, Solution, model_from_system, solve
+from research.q1_milp.propagate import propagate
+from research.q1_milp.solvers import (INDICATOR_BACKENDS, Model, Session,
+                                     Solution, model_from_system, open_session)
 
-DEFAULT_M = 1e6
+DEFAULT_M = 1e6     # starting big-M, grown x10 while stage 1 presses it
+GATE_ENCODINGS = ('big_m', 'indicator')
+LEX_MODES = ('staged', 'native')
 QTY_EPS = 1e-7      # relative slack on the stage-2 quantity cap in stage 3
 ZERO = 1e-6         # flows below this count as zero when deriving support
 USE_EPS = 1e-4          # fallback pass-2 floor scale (crafts/s)
@@ -64,7 +92,7 @@ class LexResult:
     external_quantity: float    # stage-2 objective value
     total_flow: float           # stage-3 objective value
     stage_walls: dict
-    big_m: float
+    big_m: float                # final gate-link M (0.0: no big-M links)
     backend: str
     leak_detected: bool = False  # FINAL solution passes flow through a closed gate
     machines_total: int = 0     # machines in the chart
@@ -78,15 +106,22 @@ class LexResult:
     # The machine floors actually applied (ref edge var -> lower bound), or
     # None. Enumeration must reuse these to stay consistent with the solve.
     floors: dict = None
+    # Gated var -> the big-M its link row had in the final model, or None
+    # (no MILP, or indicator gates). Enumeration must reuse these.
+    gate_m: dict = None
+    # True when the gate support was carried over from a solve with other
+    # pins (cache.solve_cached(inherit_support=True)), not minimized here.
+    support_inherited: bool = False
 
 
 def _gate_map(system: System):
+    externals = {}
+    for info in system.variables.values():
+        if info.kind in ('src', 'snk'):
+            externals.setdefault(info.ingredient, {})[info.kind] = info.name
     gates = {}
     for ing in system.intermediates():
-        entry = {}
-        for info in system.variables.values():
-            if info.ingredient == ing and info.kind in ('src', 'snk'):
-                entry[info.kind] = info.name
+        entry = dict(externals.get(ing, {}))
         if entry:
             if 'src' in entry:
                 entry['y_src'] = f'y_src[{ing}]'
@@ -96,17 +131,37 @@ def _gate_map(system: System):
     return gates
 
 
-def _base_model(system: System, gates: dict, big_m: float) -> Model:
+def _gate_m(big_m, var: str) -> float:
+    """big_m is one M for every gate or {gated var: M}."""
+    return big_m[var] if isinstance(big_m, dict) else big_m
+
+
+def _base_model(system: System, gates: dict, big_m,
+                encoding: str = 'big_m') -> Model:
+    assert encoding in GATE_ENCODINGS, encoding
     model = model_from_system(system)
     for ing, gate in gates.items():
         for kind, y_kind in (('src', 'y_src'), ('snk', 'y_snk')):
             if kind in gate:
                 model.binaries.add(gate[y_kind])
-                model.add({gate[kind]: 1.0, gate[y_kind]: -big_m}, '<=', 0.0,
-                          name=f'link_{kind}[{ing}]')
+                if encoding == 'indicator':
+                    model.indicators[gate[kind]] = gate[y_kind]
+                    continue
+                model.add({gate[kind]: 1.0,
+                           gate[y_kind]: -_gate_m(big_m, gate[kind])},
+                          '<=', 0.0, name=f'link_{kind}[{ing}]')
     return model
 
 
+def _set_big_m(session: Session, gates: dict, big_m):
+    """Rewrite the gate-link coefficients of a live _base_model session."""
+    for ing, gate in gates.items():
+        for kind, y_kind in (('src', 'y_src'), ('snk', 'y_snk')):
+            if kind in gate:
+                session.set_coeff(f'link_{kind}[{ing}]', gate[y_kind],
+                                  -_gate_m(big_m, gate[kind]))
+
+
 def _flow_support(gates: dict, values: dict) -> dict:
     """y variable name -> 0/1 from the flows actually carried."""
     support = {}
@@ -127,15 +182,38 @@ def _machine_refs(system: System) -> dict:
     return refs
 
 
+@profiled()
 def solve_lexicographic(system: System, backend: str = 'highs',
                         big_m: float = DEFAULT_M, msg: bool = False,
-                        max_m_growths: int = 3,
                         prefer_sinks: bool = True,
                         use_all_machines: bool = True,
-                        gate_support: dict = None) -> LexResult:
-    """gate_support: optional {'sources': [ing...], 'sinks': [ing...]} from
+                        gate_support: dict = None,
+                        gate_encoding: str = 'big_m',
+                        lex_mode: str = 'staged',
+                        lp_fast_path: bool = True,
+                        exact_path: bool = True,
+                        max_m_growths: int = 3) -> LexResult:
+    """big_m: the gate-link M, grown x10 (at most max_m_growths times)
+    while stage 1 is infeasible or presses a gated flow against it.
+
+    gate_encoding: 'big_m' (any backend) or 'indicator' (a backend in
+    solvers.INDICATOR_BACKENDS; ValueError otherwise).
+
+    lex_mode='native' hands stages 1-3 to the backend as one hierarchical
+    solve per floor pass (HiGHS only). Its answer is kept only if it passes
+    the flow-derived support checks; otherwise, and on other backends or
+    with gate_support, the staged emulation runs.
+
+    exact_path, lp_fast_path: first try every intermediate gate shut, by
+    exact propagation and then as a pure LP (see solve_exact and
+    solve_gateless); charts that need no gate never build the MILP.
+
+    gate_support: optional {'sources': [ing...], 'sinks': [ing...]} from
     enumerate_optimal_supports — pins stage 1 to that user-chosen support so
-    stages 2-3 optimize within the chosen alternative."""
+    stages 2-3 optimize within the chosen alternative.
+
+    backend='race' runs every stage on all backends at once and keeps the
+    first validated optimum (see solvers.RaceSession)."""
     gates = _gate_map(system)
     external = system.external_vars()
     internal = [v.name for v in system.variables.values() if v.kind == 'edge']
@@ -186,10 +264,10 @@ def solve_lexicographic(system: System, backend: str = 'highs',
         machine_floors.update({ref: qty * eps
                                for ref, qty in per_craft_ref.items()})
 
-    def add_machine_floor(model):
-        if floors_active:
-            for ref, floor in machine_floors.items():
-                model.bounds[ref] = (floor, None)
+    def floor_bounds():
+        if not floors_active:
+            return {}
+        return {ref: (floor, None) for ref, floor in machine_floors.items()}
 
     def stage1_weights():
         weights = {}
@@ -200,27 +278,72 @@ def solve_lexicographic(system: System, backend: str = 'highs',
                 weights[gate['y_snk']] = SNK_WEIGHT
         return weights
 
+    # Per-gate M of the live session (empty until the MILP is built)
+    gate_m = {}
+    session = None
+
     # ---- Stage 1: minimize number of active intermediate sources/sinks
-    def solve_stage1(start_m):
-        s1, attempt_m = None, start_m
-        for _ in range(max_m_growths + 1):
-            model = _base_model(system, gates, attempt_m)
-            add_machine_floor(model)
-            model.objective = stage1_weights()
-            s1 = solve(model, backend, time_limit=STAGE_TIME_LIMIT, msg=msg)
+    def solve_stage1():
+        for attempt in range(1 + (max_m_growths if gate_m else 0)):
+            if attempt:
+                grown = {v: 10 * m for v, m in gate_m.items()}
+                _set_big_m(session, gates, grown)
+                gate_m.update(grown)
+            session.set_bounds(floor_bounds())
+            session.set_objective(stage1_weights())
+            with span('lex.stage1', big_m=max_m(), floors=floors_active):
+                s1 = session.solve(STAGE_TIME_LIMIT)
             walls['stage1'] += s1.wall_seconds
-            if s1.status == 'timeout':
-                break             # over budget: growing M won't help
-            if s1.status != 'optimal':
-                # An M too small makes gated-but-needed flow impossible, which
-                # also presents as infeasibility — retry larger first.
-                attempt_m *= 10
+            # An M too small makes gated-but-needed flow impossible, which
+            # also presents as infeasibility; a timeout won't improve.
+            if s1.status == 'timeout' or (s1.status == 'optimal'
+                                          and not pressed(s1.values)):
+                break
+        return s1
+
+    def max_m():
+        return max(gate_m.values(), default=0.0)
+
+    def pressed(values):
+        """A gated flow at its M: the bound may have cut off the optimum."""
+        return any(values.get(v, 0.0) > 0.9 * m for v, m in gate_m.items())
+
+    def finish(values, support, quantity, total_flow, certified):
+        """The LexResult for a final solution and its gate support."""
+        gated_sources, gated_sinks = [], []
+        terminal_sources, terminal_sinks = [], []
+        leak_final = False
+        for info in sorted(system.variables.values(), key=lambda i: i.name):
+            if info.kind not in ('src', 'snk'):
                 continue
-            if any(s1.values.get(v, 0.0) > 0.9 * attempt_m for v in gated_vars):
-                attempt_m *= 10   # a gated flow is pressed against the cap
+            qty = values.get(info.name, 0.0)
+            if qty <= ZERO:
                 continue
-            break
-        return s1, attempt_m
+            if info.name in gated_vars:
+                (gated_sources if info.kind == 'src' else gated_sinks).append(
+                    info.ingredient)
+                y_kind = 'y_src' if info.kind == 'src' else 'y_snk'
+                if not support.get(gates[info.ingredient][y_kind], 0):
+                    leak_final = True   # flow through a gate held shut
+            else:
+                (terminal_sources if info.kind == 'src'
+                 else terminal_sinks).append((info.ingredient, qty))
+
+        used_final = {m_idx: crafts_rate(values, ref) > USE_EPS_DETECT
+                      for m_idx, ref in refs.items()}
+        idle = [(m_idx, system.graph.nodes[m_idx]['object'].m)
+                for m_idx, used in sorted(used_final.items()) if not used]
+        return LexResult('optimal', values, gated_sources, gated_sinks,
+                         terminal_sources, terminal_sinks,
+                         len(gated_sources) + len(gated_sinks),
+                         quantity, total_flow, walls, max_m(), backend,
+                         leak_final,
+                         machines_total=len(refs),
+                         machines_used=sum(used_final.values()),
+                         idle_machines=idle, floors_used=floors_active,
+                         count_certified=certified,
+                         floors=dict(machine_floors) if floors_active else None,
+                         gate_m=dict(gate_m) or None)
 
     fixed_gate_bounds = None
     if gate_support is not None:
@@ -233,8 +356,153 @@ def solve_lexicographic(system: System, backend: str = 'highs',
                 fixed_gate_bounds[gate['y_snk']] = \
                     1.0 if ing in gate_support.get('sinks', ()) else 0.0
 
+    def solve_native():
+        """Stages 1-3 as one hierarchical solve per floor pass, or None to
+        fall back to the stages. The count objective is held within 0.5 of
+        optimal (the count_cap row), the quantity within QTY_EPS (qty_cap).
+        Unlike stage 3, the gates stay free in the last objective, so the
+        support is re-derived from flows and must not exceed what the
+        binaries paid for."""
+        nonlocal floors_active
+        weights = stage1_weights()
+        objectives = [(weights, 0.5, 0.0),
+                      ({v: 1.0 for v in external}, QTY_EPS, QTY_EPS),
+                      ({v: 1.0 for v in internal}, 0.0, 0.0)]
+
+        def run():
+            session.set_bounds(floor_bounds())
+            with span('lex.native', floors=floors_active):
+                sol = session.solve_hierarchy(objectives, STAGE_TIME_LIMIT)
+            walls['native'] = walls.get('native', 0.0) + sol.wall_seconds
+            return sol
+
+        sol = run()                # pass 1: floor-free
+        if sol.status == 'optimal' and use_all_machines and refs and any(
+                crafts_rate(sol.values, ref) <= USE_EPS_DETECT
+                for ref in refs.values()):
+            set_floors_from(sol.values)
+            floors_active = True
+            floored = run()
+            if floored.status == 'optimal':
+                sol = floored
+            else:
+                floors_active = False
+        if sol.status != 'optimal' or pressed(sol.values):
+            return None
+        support = _flow_support(gates, sol.values)
+        paid = sum(w * round(sol.values.get(y, 0.0)) for y, w in weights.items())
+        if sum(weights[y] for y, on in support.items() if on) > paid + 0.5:
+            return None            # flow through a closed gate
+        values = sol.values
+        return finish(values, support,
+                      sum(values.get(v, 0.0) for v in external),
+                      sum(values.get(v, 0.0) for v in internal), True)
+
+    def solve_exact():
+        """Stages 0-3 by exact propagation (see propagate.py), or None.
+        With the gates shut, a terminal ingredient's external only needs
+        the direction its machines imply (made only: sink; used only:
+        source); stage 2 would zero the other. A unique nonnegative
+        solution with every machine running is then the optimum."""
+        fixed = dict.fromkeys(gated_vars, 0)
+        for con in system.constraints:
+            if con.tag[0] != 'balance' or con.tag[1] in gates:
+                continue
+            machine = [c for v, c in con.terms
+                       if system.variables[v].kind == 'edge']
+            for v, _ in con.terms:
+                kind = system.variables[v].kind
+                if (kind == 'src' and all(c > 0 for c in machine)) \
+                        or (kind == 'snk' and all(c < 0 for c in machine)):
+                    fixed[v] = 0
+        start = time.perf_counter()
+        flows = propagate(system, fixed)
+        walls['exact'] = time.perf_counter() - start
+        if not flows.determined \
+                or any(x < 0 for x in flows.values.values()):
+            return None
+        values = {v: float(x) for v, x in flows.values.items()}
+        if use_all_machines and any(crafts_rate(values, ref) <= USE_EPS_DETECT
+                                    for ref in refs.values()):
+            return None            # an idle machine: the floor logic decides
+        return finish(values, dict.fromkeys(stage1_weights(), 0),
+                      float(sum(flows.values[v] for v in external)),
+                      float(sum(flows.values[v] for v in internal)), True)
+
+    def solve_gateless():
+        """Stage-1 fast path: with every intermediate gate shut, stage 2 is
+        a plain LP. If that LP is feasible with every machine running
+        (after the same floor pass as stage 1), a count of 0 is optimal
+        and certified, and stages 2-3 run as LPs without building the
+        binaries at all. None when some gate is needed."""
+        nonlocal floors_active
+
+        def give_up():
+            # The check's LPs count as stage-1 time for the MILP path
+            nonlocal floors_active
+            floors_active = False
+            walls['stage1'] += (walls.pop('stage2', 0.0)
+                                + walls.pop('stage3', 0.0))
+
+        model = model_from_system(system)
+        model.bounds.update({v: (0.0, 0.0) for v in gated_vars})
+        lp = open_session(model, backend, msg, system=system)
+        lp.set_objective({v: 1.0 for v in external})
+        with span('lex.gateless'):
+            s2 = lp.solve(STAGE_TIME_LIMIT)
+        walls['stage2'] = s2.wall_seconds
+        if s2.status == 'optimal' and use_all_machines and refs and any(
+                crafts_rate(s2.values, ref) <= USE_EPS_DETECT
+                for ref in refs.values()):
+            set_floors_from(s2.values)
+            floors_active = True
+            lp.set_bounds(floor_bounds())
+            with span('lex.gateless', floors=True):
+                s2 = lp.solve(STAGE_TIME_LIMIT)
+            walls['stage2'] += s2.wall_seconds
+        if s2.status != 'optimal':
+            return give_up()
+        quantity = s2.objective
+        lp.add_row({v: 1.0 for v in external}, '<=',
+                   quantity * (1 + QTY_EPS) + QTY_EPS, name='qty_cap')
+        lp.set_objective({v: 1.0 for v in internal})
+        with span('lex.stage3', gateless=True):
+            s3 = lp.solve(STAGE_TIME_LIMIT)
+        walls['stage3'] = s3.wall_seconds
+        if s3.status != 'optimal':
+            return give_up()
+        return finish(s3.values, dict.fromkeys(stage1_weights(), 0),
+                      quantity, s3.objective, True)
+
+    assert lex_mode in LEX_MODES, lex_mode
+    if gate_encoding == 'indicator' and backend not in INDICATOR_BACKENDS:
+        raise ValueError(f'gate_encoding=indicator needs a backend in '
+                         f'{INDICATOR_BACKENDS}, not {backend!r}')
+    if exact_path and fixed_gate_bounds is None:
+        exact = solve_exact()
+        if exact is not None:
+            return exact
+    if lp_fast_path and fixed_gate_bounds is None:
+        gateless = solve_gateless()
+        if gateless is not None:
+            return gateless
+
+    with span('lex.base_model'):
+        session = open_session(_base_model(system, gates, big_m, gate_encoding),
+                               backend, msg, system=system)
+    # Indicator gates have no M: nothing to grow, nothing to press.
+    if gate_encoding == 'big_m':
+        gate_m.update(dict.fromkeys(gated_vars, big_m))
+
+    if lex_mode == 'native' and fixed_gate_bounds is None \
+            and session.native_hierarchy:
+        native = solve_native()
+        if native is not None:
+            return native
+        floors_active = False      # the stages start floor-free again
+
     if fixed_gate_bounds is None:
-        s1, big_m = solve_stage1(big_m)      # pass 1: floor-free
+        s1 = solve_stage1()      # pass 1: floor-free
         if s1.status == 'optimal' and use_all_machines and refs:
             idle = [ref for ref in refs.values()
                     if crafts_rate(s1.values, ref) <= USE_EPS_DETECT]
@@ -242,14 +510,18 @@ def solve_lexicographic(system: System, backend: str = 'highs',
                 # Bootstrap degeneracy: retry with scaled floors (pass 2).
                 set_floors_from(s1.values)
                 floors_active = True
-                s1_floored, m_floored = solve_stage1(big_m)
+                pass1_m = dict(gate_m)
+                s1_floored = solve_stage1()
                 if s1_floored.status == 'optimal':
-                    s1, big_m = s1_floored, m_floored
+                    s1 = s1_floored
                 else:
                     floors_active = False    # keep honest pass-1 result
+                    if pass1_m != gate_m:
+                        _set_big_m(session, gates, pass1_m)
+                        gate_m.update(pass1_m)
         if s1.status != 'optimal':
             return LexResult(s1.status, s1.values, [], [], [], [], -1,
-                             math.nan, math.nan, walls, big_m, backend,
+                             math.nan, math.nan, walls, max_m(), backend,
                              machines_total=len(refs), floors_used=floors_active)
 
         support1 = _flow_support(gates, s1.values)
@@ -257,7 +529,7 @@ def solve_lexicographic(system: System, backend: str = 'highs',
         # Certification check: the solver claimed a better objective than the
         # support its own flows used — an intermediate big-M/tolerance leak.
         expected_obj = sum(stage1_weights()[y] for y, on in support1.items() if on)
-        certified = s1.objective >= expected_obj - 0.5
+        certified = s1.objective >= expected_obj - 0.5 and not pressed(s1.values)
     else:
         count = int(sum(fixed_gate_bounds.values()))
         certified = True
@@ -267,16 +539,20 @@ def solve_lexicographic(system: System, backend: str = 'highs',
     # lexicographic stage picking the least external flow among minimal-count
     # placements. With a user-chosen gate_support, the binaries are fixed to
     # that support instead.
-    model = _base_model(system, gates, big_m)
-    model.highs_presolve_off = True
-    add_machine_floor(model)
+    gate_bounds = {}
     if fixed_gate_bounds is None:
-        model.add(stage1_weights(), '<=', s1.objective + 0.5, name='count_cap')
+        session.add_row(stage1_weights(), '<=', s1.objective + 0.5,
+                        name='count_cap')
     else:
-        for y, val in fixed_gate_bounds.items():
-            model.bounds[y] = (val, val)
-    model.objective = {v: 1.0 for v in external}
-    s2 = solve(model, backend, time_limit=STAGE_TIME_LIMIT, msg=msg)
+        gate_bounds = {y: (val, val) for y, val in fixed_gate_bounds.items()}
+    session.set_bounds({**floor_bounds(), **gate_bounds})
+    session.set_objective({v: 1.0 for v in external})
+    # An uncertified stage-1 optimum leaks through a closed gate; seeding
+    # stage 2 with it steers HiGHS into refining the leak (palladium_line:
+    # 18 gates carrying flow against a cap of 10).
+    with span('lex.stage2', certified=certified):
+        s2 = session.solve(STAGE_TIME_LIMIT, presolve_off=True,
+                           warm_start=certified)
     walls['stage2'] = s2.wall_seconds
     if s2.status == 'optimal' and fixed_gate_bounds is not None \
             and use_all_machines and refs and not floors_active:
@@ -287,14 +563,9 @@ def solve_lexicographic(system: System, backend: str = 'highs',
                for ref in refs.values()):
             set_floors_from(s2.values)
             floors_active = True
-            model = _base_model(system, gates, big_m)
-            model.highs_presolve_off = True
-            add_machine_floor(model)
-            for y, val in fixed_gate_bounds.items():
-                model.bounds[y] = (val, val)
-            model.objective = {v: 1.0 for v in external}
-            s2_floored = solve(model, backend, time_limit=STAGE_TIME_LIMIT,
-                               msg=msg)
+            session.set_bounds({**floor_bounds(), **gate_bounds})
+            with span('lex.stage2', floors=True):
+                s2_floored = session.solve(STAGE_TIME_LIMIT, presolve_off=True)
             walls['stage2'] += s2_floored.wall_seconds
             if s2_floored.status == 'optimal':
                 s2 = s2_floored
@@ -302,7 +573,7 @@ def solve_lexicographic(system: System, backend: str = 'highs',
                 floors_active = False
     if s2.status != 'optimal':
         return LexResult(s2.status, s2.values, [], [], [], [], count,
-                         math.nan, math.nan, walls, big_m, backend,
+                         math.nan, math.nan, walls, max_m(), backend,
                          count_certified=certified)
     quantity = s2.objective
     certified = certified and (
@@ -311,53 +582,49 @@ def solve_lexicographic(system: System, backend: str = 'highs',
     # ---- Stage 3: gates re-fixed to stage-2 flow support, cap quantity,
     #      minimize total internal flow
     support = _flow_support(gates, s2.values)
-    model = _base_model(system, gates, big_m)
-    model.highs_presolve_off = True
-    add_machine_floor(model)
-    for y, val in support.items():
-        model.bounds[y] = (float(val), float(val))
-    model.add({v: 1.0 for v in external}, '<=',
-              quantity * (1 + QTY_EPS) + QTY_EPS, name='qty_cap')
-    model.objective = {v: 1.0 for v in internal}
-    s3 = solve(model, backend, time_limit=STAGE_TIME_LIMIT, msg=msg)
+    if fixed_gate_bounds is None:
+        session.remove_row('count_cap')
+    session.set_bounds({**floor_bounds(),
+                        **{y: (float(val), float(val))
+                           for y, val in support.items()}})
+    session.add_row({v: 1.0 for v in external}, '<=',
+                    quantity * (1 + QTY_EPS) + QTY_EPS, name='qty_cap')
+    session.set_objective({v: 1.0 for v in internal})
+    with span('lex.stage3'):
+        s3 = session.solve(STAGE_TIME_LIMIT, presolve_off=True)
     walls['stage3'] = s3.wall_seconds
     if s3.status != 'optimal':
         return LexResult(s3.status, s2.values, [], [], [], [], count, quantity,
-                         math.nan, walls, big_m, backend,
+                         math.nan, walls, max_m(), backend,
                          count_certified=certified)
 
-    gated_sources, gated_sinks = [], []
-    terminal_sources, terminal_sinks = [], []
-    leak_final = False
-    for info in sorted(system.variables.values(), key=lambda i: i.name):
-        if info.kind not in ('src', 'snk'):
-            continue
-        qty = s3.values.get(info.name, 0.0)
-        if qty <= ZERO:
-            continue
-        if info.name in gated_vars:
-            (gated_sources if info.kind == 'src' else gated_sinks).append(
-                info.ingredient)
-            y_kind = 'y_src' if info.kind == 'src' else 'y_snk'
-            if not support.get(gates[info.ingredient][y_kind], 0):
-                leak_final = True   # flow through a gate stage 3 held shut
-        else:
-            (terminal_sources if info.kind == 'src' else terminal_sinks).append(
-                (info.ingredient, qty))
-
-    used_final = {m_idx: crafts_rate(s3.values, ref) > USE_EPS_DETECT
-                  for m_idx, ref in refs.items()}
-    idle = [(m_idx, system.graph.nodes[m_idx]['object'].m)
-            for m_idx, used in sorted(used_final.items()) if not used]
-    return LexResult('optimal', s3.values, gated_sources, gated_sinks,
-                     terminal_sources, terminal_sinks,
-                     len(gated_sources) + len(gated_sinks),
-                     quantity, s3.objective, walls, big_m, backend, leak_final,
-                     machines_total=len(refs),
-                     machines_used=sum(used_final.values()),
-                     idle_machines=idle, floors_used=floors_active,
-                     count_certified=certified,
-                     floors=dict(machine_floors) if floors_active else None)
+    return finish(s3.values, support, quantity, s3.objective, certified)
+
+
+def rescale_result(result: LexResult, factor: float) -> LexResult:
+    """result for every pin multiplied by factor (> 0). Every row except
+    the pins is homogeneous, and the stage objectives and the pass-2
+    floors are linear in the flows, so the optimum scales with the same
+    gate support. No solver runs, so stage_walls is empty, and big_m stays
+    the M of the model that was actually solved; gate_m scales with the
+    flows, so enumeration's link rows still carry them. ZERO and
+    USE_EPS_DETECT are absolute: a factor that pushes flows across them can
+    differ from a fresh solve."""
+    assert factor > 0, factor
+    return dataclasses.replace(
+        result,
+        values={v: x if v.startswith(('y_src[', 'y_snk[')) else x * factor
+                for v, x in result.values.items()},
+        terminal_sources=[(ing, q * factor)
+                          for ing, q in result.terminal_sources],
+        terminal_sinks=[(ing, q * factor) for ing, q in result.terminal_sinks],
+        external_quantity=result.external_quantity * factor,
+        total_flow=result.total_flow * factor,
+        stage_walls={},
+        floors=None if result.floors is None else
+        {ref: x * factor for ref, x in result.floors.items()},
+        gate_m=None if result.gate_m is None else
+        {v: m * factor for v, m in result.gate_m.items()})
 
 
 def edge_values(system: System, result: LexResult) -> dict:
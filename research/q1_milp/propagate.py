@@ -0,0 +1,155 @@
+"""Exact flow propagation: answer pin-determined charts without a solver.
+
+Most charts are fully determined once the gates are shut: a pin fixes one
+machine, its ratio rows fix the rest of its edges, each balance row then
+fixes the one flow it still lacks, and so on through the chart in both
+directions. That is a queue of single-unknown rows, all in Fraction
+arithmetic. Recycle loops stall the queue: every balance row on the loop
+still has two unknowns. The rows left at a stall are split into connected
+pieces and each piece is solved on its own by sparse exact elimination
+(elimination.eliminate); whatever a piece determines goes back on the
+queue. Rows hanging off a loop are peeled from its piece first, so only
+the loop core itself is eliminated. If a stall makes no progress the
+chart has freedom the lexicographic objective must resolve, and
+propagation gives up.
+
+lexicographic.solve_lexicographic uses this as its first fast path: with
+every intermediate gate shut (and each terminal ingredient's unneeded
+external at 0), a unique nonnegative solution with every machine running
+IS the lexicographic optimum, so no LP or MILP is needed.
+"""
+
+from dataclasses import dataclass, field
+from fractions import Fraction
+
+from research.common.elimination import eliminate
+from research.common.profiling import profiled
+from research.common.provenance import System
+
+
+@dataclass
+class Propagation:
+    values: dict                 # var -> Fraction, every determined variable
+    consistent: bool             # False: some row cannot hold
+    determined: bool             # every variable has a value
+    # Variable count of each piece solved by elimination (the loop cores)
+    local_solves: list = field(default_factory=list)
+
+
+def _core(piece: list, unknown) -> list:
+    """Peel rows that own an unknown no other row has: such a row only
+    fixes that unknown once the rest is known, so the queue handles it
+    after the core is solved. What remains are the loops."""
+    uses = {}
+    for i in piece:
+        for v in unknown(i):
+            uses[v] = uses.get(v, 0) + 1
+    core = set(piece)
+    peeled = True
+    while peeled:
+        peeled = False
+        for i in list(core):
+            if any(uses[v] == 1 for v in unknown(i)):
+                core.discard(i)
+                for v in unknown(i):
+                    uses[v] -= 1
+                peeled = True
+    return [i for i in piece if i in core]
+
+
+def _components(rows: list, unknown) -> list:
+    """Connected pieces of the rows, joined through shared unknowns."""
+    parent = {}
+
+    def find(v):
+        while parent.setdefault(v, v) != v:
+            parent[v] = parent[parent[v]]
+            v = parent[v]
+        return v
+
+    for i in rows:
+        names = unknown(i)
+        root = find(names[0])
+        for v in names[1:]:
+            other = find(v)
+            if other != root:
+                parent[other] = root
+    pieces = {}
+    for i in rows:
+        pieces.setdefault(find(unknown(i)[0]), []).append(i)
+    return sorted(pieces.values(), key=len)
+
+
+@profiled()
+def propagate(system: System, fixed: dict = None) -> Propagation:
+    """Solve system's equality rows exactly, with `fixed` (var -> number)
+    taken as given. Stops early, consistent=False, on the first row that
+    cannot hold; determined=False if some variable stays free."""
+    values = {v: Fraction(x) for v, x in (fixed or {}).items()}
+    rows = [(con.terms, con.rhs) for con in system.constraints]
+    var_rows = {}
+    for i, (terms, _) in enumerate(rows):
+        for v, _ in terms:
+            var_rows.setdefault(v, []).append(i)
+    open_count = [sum(1 for v, _ in terms if v not in values)
+                  for terms, _ in rows]
+    queue = [i for i, n in enumerate(open_count) if n <= 1]
+    local_solves = []
+
+    def residual(i):
+        terms, rhs = rows[i]
+        return rhs - sum(c * values[v] for v, c in terms if v in values)
+
+    def assign(v, x):
+        values[v] = x
+        for i in var_rows.get(v, ()):
+            open_count[i] -= 1
+            if open_count[i] <= 1:
+                queue.append(i)
+
+    def result(consistent):
+        return Propagation(values, consistent,
+                           consistent and all(v in values
+                                              for v in system.variables),
+                           local_solves)
+
+    while True:
+        while queue:
+            i = queue.pop()
+            if open_count[i] == 0:
+                if residual(i) != 0:
+                    return result(False)
+                open_count[i] = -1        # checked; never again
+            elif open_count[i] == 1:
+                terms, _ = rows[i]
+                v, c = next((v, c) for v, c in terms if v not in values)
+                assign(v, residual(i) / c)
+
+        stalled = [i for i, n in enumerate(open_count) if n > 1]
+        if not stalled:
+            return result(True)
+
+        def unknown(i):
+            return [v for v, _ in rows[i][0] if v not in values]
+
+        progress = False
+        for piece in _components(stalled, unknown):
+            piece = _core(piece, unknown)
+            if not piece:
+                continue
+            columns = list(dict.fromkeys(v for i in piece for v in unknown(i)))
+            index = {v: j for j, v in enumerate(columns)}
+            echelon = eliminate(
+                [{index[v]: c for v, c in rows[i][0] if v in index}
+                 for i in piece],
+                [residual(i) for i in piece], len(columns))
+            local_solves.append(len(columns))
+            solution = echelon.parametrization()
+            if solution is None:
+                return result(False)
+            for v, (constant, free) in zip(columns, solution):
+                if not free:
+                    assign(v, constant)
+                    progress = True
+        if not progress:
+            return result(True)
@@ -1,13 +1,19 @@
 """Backend-neutral (MI)LP model + adapters for CBC (PuLP), HiGHS, and SCIP.
 
 The model is built once from a provenance.System; each backend translates it,
-so benchmarks compare solvers rather than model-building code.
+so benchmarks compare solvers rather than model-building code. Backends never
+walk Model.rows directly: Model.compile() flattens the rows once into CSR
+arrays, and each adapter passes those in bulk.
 """
 
+import os
+import tempfile
 import time
 from dataclasses import dataclass, field
 from fractions import Fraction
 
+from research.common.profiling import profiled, span
+
 
 @dataclass
 class Row:
@@ -17,6 +23,33 @@ class Row:
     name: str = ''
 
 
+@dataclass
+class CompiledModel:
+    """Row matrix of a Model in CSR form, plus the column-name index.
+    Row i's entries are indices/data[indptr[i]:indptr[i + 1]]."""
+    names: list            # column order; var -> column via `index`
+    index: dict
+    indptr: object         # np.ndarray[int32], len(rows) + 1
+    indices: object        # np.ndarray[int32]
+    data: object           # np.ndarray[float64]
+    sense: list            # per row: '==' | '<=' | '>='
+    rhs: object            # np.ndarray[float64]
+    row_names: list
+
+    @property
+    def n_rows(self):
+        return len(self.sense)
+
+    def row_bounds(self, inf):
+        """(lower, upper) activity arrays for the rows."""
+        import numpy as np
+
+        sense = np.array(self.sense, dtype=object)
+        lower = np.where(sense == '<=', -inf, self.rhs)
+        upper = np.where(sense == '>=', inf, self.rhs)
+        return lower.astype(float), upper.astype(float)
+
+
 @dataclass
 class Model:
     rows: list = field(default_factory=list)
@@ -28,9 +61,49 @@ class Model:
     # infeasible (observed on palladium_line stage 2); set by callers that
     # add such rows. Other backends ignore it.
     highs_presolve_off: bool = False
+    # var -> binary: the binary at 0 forces var <= 0, as a native indicator
+    # constraint instead of a big-M row. INDICATOR_BACKENDS only.
+    indicators: dict = field(default_factory=dict)
 
     def add(self, terms, sense, rhs, name=''):
         self.rows.append(Row(dict(terms), sense, float(rhs), name))
+        self.__dict__.pop('_compiled', None)
+
+    def compile(self) -> CompiledModel:
+        """CSR view of the rows (cached until the next add()). Columns follow
+        var_names() order, so every backend sees the same column order."""
+        import numpy as np
+
+        cached = self.__dict__.get('_compiled')
+        if cached is not None and cached[0] == len(self.rows):
+            return cached[1]
+        names = self.var_names()
+        index = {v: i for i, v in enumerate(names)}
+        lengths = [len(row.terms) for row in self.rows]
+        indptr = np.zeros(len(self.rows) + 1, dtype=np.int32)
+        np.cumsum(lengths, out=indptr[1:])
+        indices = np.fromiter((index[v] for row in self.rows for v in row.terms),
+                              dtype=np.int32, count=int(indptr[-1]))
+        data = np.fromiter((c for row in self.rows for c in row.terms.values()),
+                           dtype=float, count=int(indptr[-1]))
+        compiled = CompiledModel(
+            names, index, indptr, indices, data,
+            [row.sense for row in self.rows],
+            np.array([row.rhs for row in self.rows], dtype=float),
+            [row.name for row in self.rows])
+        self.__dict__['_compiled'] = (len(self.rows), compiled)
+        return compiled
+
+    def column_bounds(self, names, inf):
+        """(lower, upper) arrays over `names`, with None mapped to -inf/inf."""
+        import numpy as np
+
+        pairs = [self.bound(v) for v in names]
+        lower = np.array([-inf if lo is None else lo for lo, _ in pairs],
+                         dtype=float)
+        upper = np.array([inf if hi is None else hi for _, hi in pairs],
+                         dtype=float)
+        return lower, upper
 
     def var_names(self):
         names = {}
@@ -43,6 +116,9 @@ class Model:
             names[v] = None
         for v in self.bounds:
             names[v] = None
+        for v, y in self.indicators.items():
+            names[v] = None
+            names[y] = None
         return list(names)
 
     def bound(self, var):
@@ -62,6 +138,7 @@ class Solution:
     backend: str
 
 
+@profiled()
 def model_from_system(system, float_coeffs=True) -> Model:
     """Rows are normalized by their largest |coefficient|: recipe quantities
     span ~0.05 (dusts) to ~20000 (fluids), and unscaled ratio rows at that
@@ -92,32 +169,55 @@ def validate_solution(system, values, tol=1e-4) -> dict:
 # Backends
 # --------------------------------------------------------------------------
 
+def _columns(model: Model, compiled: CompiledModel):
+    """Column order for a translation: the compiled row columns, then any
+    variable that appears only in the objective/bounds/binaries."""
+    extras = [v for v in dict.fromkeys(
+        list(model.objective) + list(model.binaries) + list(model.bounds)
+        + list(model.indicators) + list(model.indicators.values()))
+        if v not in compiled.index]
+    if not extras:
+        return compiled.names, compiled.index
+    names = compiled.names + extras
+    return names, {v: i for i, v in enumerate(names)}
+
+
 def _solve_pulp(model: Model, time_limit, msg) -> Solution:
     import pulp
 
+    compiled = model.compile()
+    names, _ = _columns(model, compiled)
     prob = pulp.LpProblem('model', pulp.LpMinimize)
     lp_vars = {}
-    for name in model.var_names():
+    for name in names:
         lo, hi = model.bound(name)
         # PuLP's cat='Binary' silently resets bounds to (0, 1), which would
         # discard gate-fixing bounds like (0, 0) — use Integer + explicit bounds.
         cat = 'Integer' if name in model.binaries else 'Continuous'
         lp_vars[name] = pulp.LpVariable(name, lowBound=lo, upBound=hi, cat=cat)
 
-    prob += pulp.lpSum(coeff * lp_vars[v] for v, coeff in model.objective.items())
-    for row in model.rows:
-        expr = pulp.lpSum(coeff * lp_vars[v] for v, coeff in row.terms.items())
-        if row.sense == '==':
-            prob += expr == row.rhs, row.name or None
-        elif row.sense == '<=':
-            prob += expr <= row.rhs, row.name or None
-        else:
-            prob += expr >= row.rhs, row.name or None
+    prob += pulp.LpAffineExpression(
+        [(lp_vars[v], coeff) for v, coeff in model.objective.items()])
+    # Rows straight from the CSR slices: LpAffineExpression takes the
+    # (var, coeff) pairs in one call instead of lpSum's term-by-term adds.
+    columns = [lp_vars[v] for v in compiled.names]
+    senses = {'==': pulp.LpConstraintEQ, '<=': pulp.LpConstraintLE,
+              '>=': pulp.LpConstraintGE}
+    indptr, indices, data = compiled.indptr, compiled.indices, compiled.data
+    for i in range(compiled.n_rows):
+        lo, hi = indptr[i], indptr[i + 1]
+        expr = pulp.LpAffineExpression(
+            zip([columns[j] for j in indices[lo:hi]], data[lo:hi].tolist()))
+        prob.addConstraint(
+            pulp.LpConstraint(expr, senses[compiled.sense[i]],
+                              rhs=float(compiled.rhs[i])),
+            compiled.row_names[i] or None)
 
     start = time.perf_counter()
-    status_code = prob.solve(pulp.PULP_CBC_CMD(
-        msg=msg, timeLimit=time_limit,
-        options=['integerTolerance 1e-9', 'primalTolerance 1e-9']))
+    with span('cbc.run'):
+        status_code = prob.solve(pulp.PULP_CBC_CMD(
+            msg=msg, timeLimit=time_limit,
+            options=['integerTolerance 1e-9', 'primalTolerance 1e-9']))
     wall = time.perf_counter() - start
     status = {1: 'optimal', -1: 'infeasible', -2: 'unbounded'}.get(status_code, 'other')
     values = {name: (var.value() if var.value() is not None else 0.0)
@@ -125,7 +225,19 @@ def _solve_pulp(model: Model, time_limit, msg) -> Solution:
     return Solution(status, values, pulp.value(prob.objective) or 0.0, wall, 'cbc')
 
 
-def _solve_highs(model: Model, time_limit, msg) -> Solution:
+def _row_bounds(sense, rhs, inf):
+    if sense == '==':
+        return rhs, rhs
+    if sense == '<=':
+        return -inf, rhs
+    return rhs, inf
+
+
+@profiled('highs.translate')
+def _build_highs(model: Model, msg):
+    """Translate a Model into a fresh Highs instance with one passModel call
+    over the compiled CSR matrix. Returns (h, names, index) so callers can
+    map solution vectors back to variable names."""
     import highspy
     import numpy as np
 
@@ -136,36 +248,35 @@ def _solve_highs(model: Model, time_limit, msg) -> Solution:
     # 1e-9 would be tighter still, but below HiGHS's primal feasibility
     # tolerance it produces spurious infeasibility (seen on palladium_line).
     h.setOptionValue('mip_feasibility_tolerance', 1e-8)
-    if model.highs_presolve_off:
-        h.setOptionValue('presolve', 'off')
-    if time_limit:
-        h.setOptionValue('time_limit', float(time_limit))
 
-    names = model.var_names()
-    index = {v: i for i, v in enumerate(names)}
+    compiled = model.compile()
+    names, index = _columns(model, compiled)
     inf = highspy.kHighsInf
 
-    lower = np.array([model.bound(v)[0] if model.bound(v)[0] is not None else -inf
-                      for v in names])
-    upper = np.array([model.bound(v)[1] if model.bound(v)[1] is not None else inf
-                      for v in names])
-    cost = np.array([float(model.objective.get(v, 0.0)) for v in names])
-    h.addVars(len(names), lower, upper)
-    h.changeColsCost(len(names), np.arange(len(names)), cost)
-
-    for v in model.binaries:
-        h.changeColIntegrality(index[v], highspy.HighsVarType.kInteger)
-
-    for row in model.rows:
-        idxs = np.array([index[v] for v in row.terms], dtype=np.int32)
-        coeffs = np.array(list(row.terms.values()))
-        if row.sense == '==':
-            lo, hi = row.rhs, row.rhs
-        elif row.sense == '<=':
-            lo, hi = -inf, row.rhs
-        else:
-            lo, hi = row.rhs, inf
-        h.addRow(lo, hi, len(idxs), idxs, coeffs)
+    lp = highspy.HighsLp()
+    lp.num_col_ = len(names)
+    lp.num_row_ = compiled.n_rows
+    lp.col_lower_, lp.col_upper_ = model.column_bounds(names, inf)
+    lp.col_cost_ = np.array([float(model.objective.get(v, 0.0)) for v in names])
+    lp.row_lower_, lp.row_upper_ = compiled.row_bounds(inf)
+    lp.a_matrix_.format_ = highspy.MatrixFormat.kRowwise
+    lp.a_matrix_.num_col_ = len(names)
+    lp.a_matrix_.num_row_ = compiled.n_rows
+    lp.a_matrix_.start_ = compiled.indptr
+    lp.a_matrix_.index_ = compiled.indices
+    lp.a_matrix_.value_ = compiled.data
+    if model.binaries:
+        integrality = [highspy.HighsVarType.kContinuous] * len(names)
+        for v in model.binaries:
+            integrality[index[v]] = highspy.HighsVarType.kInteger
+        lp.integrality_ = integrality
+    h.passModel(lp)
+    return h, names, index
+
+
+@profiled('highs.run')
+def _run_highs(h, names, index):
+    import highspy
 
     start = time.perf_counter()
     h.run()
@@ -185,8 +296,71 @@ def _solve_highs(model: Model, time_limit, msg) -> Solution:
     return Solution(status, values, objective, wall, 'highs')
 
 
+def _solve_highs(model: Model, time_limit, msg) -> Solution:
+    h, names, index = _build_highs(model, msg)
+    if model.highs_presolve_off:
+        h.setOptionValue('presolve', 'off')
+    if time_limit:
+        h.setOptionValue('time_limit', float(time_limit))
+    return _run_highs(h, names, index)
+
+
+def write_mps(model: Model, path, names=None):
+    """Free-format MPS export from the compiled matrix. Columns and rows are
+    written as c{j}/r{i}: variable names like 'y_src[sulfuric acid]' are not
+    MPS-safe. `names` (default: the compiled column order) fixes the column
+    numbering."""
+    compiled = model.compile()
+    if names is None:
+        names, _ = _columns(model, compiled)
+    kind = {'==': 'E', '<=': 'L', '>=': 'G'}
+    lines = ['NAME model', 'ROWS', ' N obj']
+    lines += [f' {kind[sense]} r{i}' for i, sense in enumerate(compiled.sense)]
+
+    # Column-major entries: transpose the CSR once.
+    by_col = [[] for _ in names]
+    indptr, indices, data = compiled.indptr, compiled.indices, compiled.data
+    for i in range(compiled.n_rows):
+        for j, c in zip(indices[indptr[i]:indptr[i + 1]].tolist(),
+                        data[indptr[i]:indptr[i + 1]].tolist()):
+            by_col[j].append(f' c{j} r{i} {c!r}')
+    lines.append('COLUMNS')
+    integer = False
+    for j, v in enumerate(names):
+        if (v in model.binaries) != integer:
+            integer = not integer
+            lines.append(f' M{j} \'MARKER\' \'{"INTORG" if integer else "INTEND"}\'')
+        cost = float(model.objective.get(v, 0.0))
+        if cost:
+            lines.append(f' c{j} obj {cost!r}')
+        lines += by_col[j]
+        if not cost and not by_col[j]:
+            lines.append(f' c{j} obj 0.0')
+    if integer:
+        lines.append(f' M{len(names)} \'MARKER\' \'INTEND\'')
+    lines.append('RHS')
+    lines += [f' rhs r{i} {float(r)!r}' for i, r in enumerate(compiled.rhs)
+              if r]
+    lines.append('BOUNDS')
+    for j, v in enumerate(names):
+        lo, hi = model.bound(v)
+        if lo is None and hi is None:
+            lines.append(f' FR bnd c{j}')
+            continue
+        if lo is None:
+            lines.append(f' MI bnd c{j}')
+        elif lo != 0.0:
+            lines.append(f' LO bnd c{j} {float(lo)!r}')
+        if hi is not None:
+            lines.append(f' UP bnd c{j} {float(hi)!r}')
+    lines.append('ENDATA')
+    with open(path, 'w') as f:
+        f.write('\n'.join(lines) + '\n')
+    return names
+
+
 def _solve_scip(model: Model, time_limit, msg) -> Solution:
-    from pyscipopt import Model as ScipModel, quicksum
+    from pyscipopt import Model as ScipModel
 
     scip = ScipModel()
     if not msg:
@@ -196,26 +370,25 @@ def _solve_scip(model: Model, time_limit, msg) -> Solution:
     if time_limit:
         scip.setParam('limits/time', float(time_limit))
 
-    scip_vars = {}
-    for name in model.var_names():
-        lo, hi = model.bound(name)
-        vtype = 'B' if name in model.binaries else 'C'
-        scip_vars[name] = scip.addVar(name=name, vtype=vtype, lb=lo, ub=hi)
-
-    scip.setObjective(
-        quicksum(coeff * scip_vars[v] for v, coeff in model.objective.items()),
-        'minimize')
-    for row in model.rows:
-        expr = quicksum(coeff * scip_vars[v] for v, coeff in row.terms.items())
-        if row.sense == '==':
-            scip.addCons(expr == row.rhs)
-        elif row.sense == '<=':
-            scip.addCons(expr <= row.rhs)
-        else:
-            scip.addCons(expr >= row.rhs)
+    # Bulk load: SCIP's own MPS reader builds every row in C, replacing a
+    # quicksum expression per row.
+    with span('scip.translate'):
+        fd, path = tempfile.mkstemp(suffix='.mps')
+        os.close(fd)
+        try:
+            names = write_mps(model, path)
+            scip.readProblem(path)
+        finally:
+            os.unlink(path)
+        by_col = {var.name: var for var in scip.getVars()}
+        scip_vars = {name: by_col[f'c{j}'] for j, name in enumerate(names)}
+        for var, y in model.indicators.items():
+            scip.addConsIndicator(scip_vars[var] <= 0, scip_vars[y],
+                                  activeone=False, name=f'ind[{var}]')
 
     start = time.perf_counter()
-    scip.optimize()
+    with span('scip.run'):
+        scip.optimize()
     wall = time.perf_counter() - start
 
     status = scip.getStatus()
@@ -236,7 +409,388 @@ BACKENDS = {
     'highs': _solve_highs,
     'scip': _solve_scip,
 }
+# Backends that take Model.indicators natively. HiGHS has no indicator or
+# SOS constraints, and PuLP's CBC command drops SOS sets without a word.
+INDICATOR_BACKENDS = ('scip',)
+
+
+def _check_indicators(model: Model, backend: str):
+    if model.indicators and backend not in INDICATOR_BACKENDS:
+        raise ValueError(f'backend {backend!r} has no indicator constraints '
+                         f'(supported: {", ".join(INDICATOR_BACKENDS)})')
 
 
 def solve(model: Model, backend: str = 'highs', time_limit=None, msg=False) -> Solution:
-    return BACKENDS[backend](model, time_limit, msg)
+    _check_indicators(model, backend)
+    with span(f'solve[{backend}]', rows=len(model.rows)):
+        return BACKENDS[backend](model, time_limit, msg)
+
+
+# --------------------------------------------------------------------------
+# Sessions: one base model, many solves
+# --------------------------------------------------------------------------
+
+class Session:
+    """A base Model plus per-solve deltas: objective, bound overrides,
+    appended rows and coefficient changes. Multi-stage drivers (the
+    lexicographic stages, M growth, floor passes) express each stage as
+    deltas against one base model instead of rebuilding it.
+
+    This generic version re-translates the materialized model on every
+    solve; HighsSession keeps the backend model alive between solves.
+    """
+
+    def __init__(self, model: Model, backend: str = 'highs', msg=False):
+        self.model = model
+        self.backend = backend
+        self.msg = msg
+        self.objective = dict(model.objective)
+        self.overrides = {}      # var -> (lo, hi), over model.bounds
+        self.extra_rows = {}     # name -> Row appended after model.rows
+        self.coeffs = {}         # (row name, var) -> coefficient override
+
+    def set_objective(self, objective: dict):
+        self.objective = dict(objective)
+
+    def set_bounds(self, bounds: dict):
+        """Replace the current overrides; unlisted variables revert to the
+        base model's bounds."""
+        self.overrides = dict(bounds)
+
+    def add_row(self, terms, sense, rhs, name):
+        assert name and name not in self.extra_rows, name
+        self.extra_rows[name] = Row(dict(terms), sense, float(rhs), name)
+
+    def remove_row(self, name):
+        del self.extra_rows[name]
+
+    def set_coeff(self, row_name, var, coeff):
+        self.coeffs[row_name, var] = float(coeff)
+
+    def current_model(self, presolve_off=False) -> Model:
+        """The model the next solve would see, as a standalone Model."""
+        patched = {}
+        for (row_name, var), coeff in self.coeffs.items():
+            patched.setdefault(row_name, {})[var] = coeff
+        rows = []
+        for row in list(self.model.rows) + list(self.extra_rows.values()):
+            if row.name in patched:
+                row = Row({**row.terms, **patched[row.name]}, row.sense,
+                          row.rhs, row.name)
+            rows.append(row)
+        return Model(rows=rows, objective=dict(self.objective),
+                     binaries=set(self.model.binaries),
+                     bounds={**self.model.bounds, **self.overrides},
+                     highs_presolve_off=presolve_off,
+                     indicators=dict(self.model.indicators))
+
+    # True if the session has solve_hierarchy: all the lexicographic
+    # objectives in one backend call (HighsSession only)
+    native_hierarchy = False
+
+    def solve(self, time_limit=None, presolve_off=False,
+              warm_start=True) -> Solution:
+        return solve(self.current_model(presolve_off), self.backend,
+                     time_limit=time_limit, msg=self.msg)
+
+
+class HighsSession(Session):
+    """Session backed by one live Highs instance: the constraint matrix is
+    passed once, then only costs, column bounds, a few appended rows and
+    single coefficients change between solves. LP re-solves start from the
+    retained basis; MIP re-solves are seeded with the previous optimum as
+    an incumbent (HiGHS discards it if the new deltas make it infeasible).
+    solve_hierarchy uses HiGHS's own lexicographic multi-objective mode.
+    """
+
+    native_hierarchy = True
+
+    def __init__(self, model: Model, msg=False):
+        import highspy
+        import numpy as np
+
+        super().__init__(model, 'highs', msg)
+        self._inf = highspy.kHighsInf
+        self.h, self.names, self.index = _build_highs(model, msg)
+        lp = self.h.getLp()
+        self._lower = np.array(lp.col_lower_)
+        self._upper = np.array(lp.col_upper_)
+        self._rows = {row.name: i for i, row in enumerate(model.rows)
+                      if row.name}
+        self._n_rows = len(model.rows)
+        self._incumbent = None
+        self._warm = bool(model.binaries)
+        self._cost_idx = np.array(
+            [self.index[v] for v in self.objective], dtype=np.int32)
+
+    def _col_bounds(self, var, bounds):
+        lo, hi = bounds.get(var, self.model.bounds.get(var, (0.0, None)))
+        if var in self.model.binaries:
+            lo = 0.0 if lo is None else max(lo, 0.0)
+            hi = 1.0 if hi is None else min(hi, 1.0)
+        return (-self._inf if lo is None else lo,
+                self._inf if hi is None else hi)
+
+    def set_objective(self, objective: dict):
+        import numpy as np
+
+        super().set_objective(objective)
+        # Zero the previous objective's columns, then write the new costs.
+        if len(self._cost_idx):
+            self.h.changeColsCost(len(self._cost_idx), self._cost_idx,
+                                  np.zeros(len(self._cost_idx)))
+        self._cost_idx = np.array([self.index[v] for v in objective],
+                                  dtype=np.int32)
+        if len(self._cost_idx):
+            self.h.changeColsCost(
+                len(self._cost_idx), self._cost_idx,
+                np.array([float(c) for c in objective.values()]))
+
+    def set_bounds(self, bounds: dict):
+        import numpy as np
+
+        touched = list(dict.fromkeys(list(self.overrides) + list(bounds)))
+        super().set_bounds(bounds)
+        if not touched:
+            return
+        pairs = [self._col_bounds(v, bounds) for v in touched]
+        idxs = np.array([self.index[v] for v in touched], dtype=np.int32)
+        self._lower[idxs] = [lo for lo, _ in pairs]
+        self._upper[idxs] = [hi for _, hi in pairs]
+        self.h.changeColsBounds(len(touched), idxs, self._lower[idxs],
+                                self._upper[idxs])
+
+    def add_row(self, terms, sense, rhs, name):
+        import numpy as np
+
+        super().add_row(terms, sense, rhs, name)
+        lo, hi = _row_bounds(sense, float(rhs), self._inf)
+        idxs = np.array([self.index[v] for v in terms], dtype=np.int32)
+        self.h.addRow(lo, hi, len(idxs), idxs,
+                      np.array([float(c) for c in terms.values()]))
+        self._rows[name] = self._n_rows
+        self._n_rows += 1
+
+    def remove_row(self, name):
+        import numpy as np
+
+        super().remove_row(name)
+        idx = self._rows.pop(name)
+        self.h.deleteRows(1, np.array([idx], dtype=np.int32))
+        self._n_rows -= 1
+        for other, i in self._rows.items():
+            if i > idx:
+                self._rows[other] = i - 1
+
+    def set_coeff(self, row_name, var, coeff):
+        super().set_coeff(row_name, var, coeff)
+        self.h.changeCoeff(self._rows[row_name], self.index[var], float(coeff))
+
+    def _seedable(self) -> bool:
+        """Only seed an incumbent that still satisfies the column bounds.
+        HiGHS tries to repair an infeasible one, which perturbs its search
+        (observed: the floored palladium_line pass, seeded with the floor-free
+        optimum, drifted into a big-M leak solution one gate "cheaper")."""
+        import numpy as np
+
+        x = self._incumbent
+        if x is None:
+            return False
+        return bool(np.all(x >= self._lower - 1e-9)
+                    and np.all(x <= self._upper + 1e-9))
+
+    def solve(self, time_limit=None, presolve_off=False,
+              warm_start=True) -> Solution:
+        """warm_start=False skips the incumbent seed for this solve — callers
+        pass it when the previous optimum is known to exploit a big-M leak,
+        which a seeded search would happily keep refining."""
+        import numpy as np
+
+        h = self.h
+        h.setOptionValue('presolve', 'off' if presolve_off else 'choose')
+        h.setOptionValue('time_limit',
+                         float(time_limit) if time_limit else self._inf)
+        if warm_start and self._warm and self._seedable():
+            h.setSolution(len(self.names),
+                          np.arange(len(self.names), dtype=np.int32),
+                          self._incumbent)
+        result = _run_highs(h, self.names, self.index)
+        if result.status == 'optimal':
+            self._incumbent = np.array(h.getSolution().col_value)
+        return result
+
+    def solve_hierarchy(self, objectives, time_limit=None,
+                        presolve_off=False) -> Solution:
+        """objectives: [(terms, abs_tol, rel_tol), ...], most important
+        first; each later one is minimized with the earlier ones held within
+        their tolerances of optimal. Solution.objective is meaningless."""
+        import highspy
+        import numpy as np
+
+        h = self.h
+        h.setOptionValue('blend_multi_objectives', False)
+        for rank, (terms, abs_tol, rel_tol) in enumerate(objectives):
+            objective = highspy.HighsLinearObjective()
+            coefficients = np.zeros(len(self.names))
+            for v, c in terms.items():
+                coefficients[self.index[v]] = c
+            objective.coefficients = coefficients
+            objective.weight, objective.offset = 1.0, 0.0
+            objective.abs_tolerance, objective.rel_tolerance = abs_tol, rel_tol
+            objective.priority = len(objectives) - rank
+            h.addLinearObjective(objective)
+        try:
+            return self.solve(time_limit, presolve_off)
+        finally:
+            h.clearLinearObjectives()
+
+
+# --------------------------------------------------------------------------
+# Race: every backend at once, first validated optimum wins
+# --------------------------------------------------------------------------
+
+RACE_BACKENDS = ('highs', 'cbc', 'scip')
+# Solvers overrun their own time limit slightly (CBC cleanup, SCIP
+# presolve rounds); racers still running this long after it are killed.
+RACE_GRACE_SECONDS = 5.0
+
+_process_ctx = None
+_racers = {}
+
+
+def process_context():
+    """Multiprocessing context for solver children (racers, decompose
+    workers). forkserver: forking this process after HiGHS has started its
+    thread pool is unsafe, and a process (unlike a thread) can be killed in the
+    middle of a C solver call."""
+    global _process_ctx
+    if _process_ctx is None:
+        import multiprocessing
+
+        _process_ctx = multiprocessing.get_context('forkserver')
+        _process_ctx.set_forkserver_preload(
+            ['research.q1_milp.solvers', 'highspy', 'pulp', 'pyscipopt'])
+    return _process_ctx
+
+
+def _race_worker(conn, backend):
+    while True:
+        try:
+            model, time_limit = conn.recv()
+        except EOFError:
+            return
+        try:
+            result = solve(model, backend, time_limit=time_limit)
+        except Exception:
+            result = Solution('other', {}, 0.0, 0.0, backend)
+        conn.send(result)
+
+
+class _Racer:
+    """One long-lived worker process per backend. Starting a process costs
+    0.3-0.7s (the child re-imports the calling script), so racers persist
+    across stages and solves; only a loser still running when the race is
+    decided is killed, and its replacement starts booting immediately."""
+
+    def __init__(self, backend):
+        ctx = process_context()
+        self.backend = backend
+        self.conn, child = ctx.Pipe()
+        self.proc = ctx.Process(target=_race_worker, args=(child, backend),
+                                daemon=True)
+        self.proc.start()
+        child.close()
+
+    def kill(self):
+        self.proc.kill()
+        self.proc.join()
+        self.conn.close()
+
+
+def _racer(backend) -> _Racer:
+    racer = _racers.get(backend)
+    if racer is None or not racer.proc.is_alive():
+        racer = _racers[backend] = _Racer(backend)
+    return racer
+
+
+class RaceSession(Session):
+    """Solves each request on every RACE_BACKENDS solver in parallel
+    processes and returns the first optimal answer that passes
+    validate_solution against `system`; the losers are killed. Backends
+    win on different charts (CBC DNFs on palladium_line, SCIP is fastest on
+    some mid-size charts), so racing gives per-chart best latency without
+    knowing in advance which solver suits which chart.
+
+    Racers receive a materialized Model, so there is no warm start; the
+    returned Solution's backend is 'race:<winner>'. If nothing validates,
+    the first finisher (by RACE_BACKENDS order) is returned as-is."""
+
+    def __init__(self, model: Model, system, msg=False):
+        super().__init__(model, 'race', msg)
+        self.system = system
+
+    @profiled('race.solve')
+    def solve(self, time_limit=None, presolve_off=False,
+              warm_start=True) -> Solution:
+        from multiprocessing.connection import wait
+
+        model = self.current_model(presolve_off)
+        start = time.perf_counter()
+        pending = {}
+        for backend in RACE_BACKENDS:
+            racer = _racer(backend)
+            racer.conn.send((model, time_limit))
+            pending[racer.conn] = racer
+        deadline = (time.monotonic() + time_limit + RACE_GRACE_SECONDS
+                    if time_limit else None)
+
+        finished, winner = {}, None
+        while pending and winner is None:
+            timeout = (None if deadline is None
+                       else max(0.0, deadline - time.monotonic()))
+            ready = wait(list(pending), timeout)
+            if not ready:
+                break
+            for conn in ready:
+                racer = pending.pop(conn)
+                try:
+                    result = conn.recv()
+                except EOFError:        # racer crashed; respawned on demand
+                    racer.kill()
+                    result = Solution('other', {}, 0.0, 0.0, racer.backend)
+                finished[racer.backend] = result
+                if result.status == 'optimal' and \
+                        validate_solution(self.system, result.values)['ok']:
+                    winner = result
+                    break
+        for conn, racer in pending.items():
+            if conn.poll():             # finished too: just drain it
+                conn.recv()
+            else:
+                racer.kill()
+                _racers[racer.backend] = _Racer(racer.backend)
+        wall = time.perf_counter() - start
+
+        if winner is None:
+            winner = next((finished[b] for b in RACE_BACKENDS if b in finished),
+                          None)
+        if winner is None:
+            return Solution('timeout', {v: 0.0 for v in model.var_names()},
+                            0.0, wall, 'race')
+        values = winner.values or {v: 0.0 for v in model.var_names()}
+        return Solution(winner.status, values, winner.objective, wall,
+                        f'race:{winner.backend}')
+
+
+def open_session(model: Model, backend: str = 'highs', msg=False,
+                 system=None) -> Session:
+    """system: the provenance.System the model was built from; required
+    for backend='race', whose answers are validated against it."""
+    _check_indicators(model, backend)
+    if backend == 'highs':
+        return HighsSession(model, msg)
+    if backend == 'race':
+        assert system is not None, 'race needs the System to validate against'
+        return RaceSession(model, system, msg)
+    return Session(model, backend, msg)
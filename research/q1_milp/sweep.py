@@ -0,0 +1,199 @@
+"""Parametric sweeps: one chart solved across a range of one parameter.
+
+"How do the external inputs and gate placements change as the PMP target
+goes from 0.1/s to 10/s, or as this recipe's output varies?" A sweep takes
+a parameter and a list of values and returns one table row per value:
+status, gate count, external quantity, internal flow, the gate support and
+the flow on every external ingredient. Rows whose gate support differs
+from the previous row's are the breakpoints.
+
+Parameters:
+    ('pin', var)                          rhs of the pin row on var (a row
+                                          is added if var is not pinned yet)
+    ('recipe', machine_idx, 'I'|'O', ing) per-craft quantity of ing in that
+                                          machine's recipe
+
+Pin sweeps lean on the homogeneity of everything but the pins (see
+lexicographic.rescale_result): a point whose pins are a positive multiple
+of any point already solved in its chunk is that point rescaled, so
+sweeping the only pin costs one solve per chunk however many points there
+are. Other points solve in order, each through solve_decomposed and its
+exact/LP fast paths. With n_jobs > 1 the values are cut into contiguous
+chunks, one per worker, so each worker gets the chart once and still
+walks its points in order.
+"""
+
+import csv
+import dataclasses
+import os
+from concurrent.futures import ProcessPoolExecutor
+from fractions import Fraction
+
+import numpy as np
+
+from research.common.profiling import profiled, span
+from research.common.provenance import Constraint, System, build_system, \
+    to_frac
+from research.q1_milp.cache import pin_factor, pin_values
+from research.q1_milp.decompose import solve_decomposed
+from research.q1_milp.lexicographic import rescale_result
+from research.q1_milp.solvers import process_context
+
+PARAMETER_KINDS = ('pin', 'recipe')
+
+
+def _with_pin(system: System, var: str, value) -> System:
+    rhs = to_frac(value)
+    constraints = [dataclasses.replace(con, rhs=rhs)
+                   if con.tag == ('pin', var) else con
+                   for con in system.constraints]
+    if ('pin', var) not in (con.tag for con in system.constraints):
+        constraints.append(Constraint(terms=((var, Fraction(1)),), rhs=rhs,
+                                      tag=('pin', var)))
+    return dataclasses.replace(system, constraints=constraints)
+
+
+def _with_recipe(system: System, machine_idx: int, direction: str,
+                 ingredient: str, value) -> System:
+    G = system.graph.copy()
+    nobj = G.nodes[machine_idx]['object']
+    side = dict(getattr(nobj, direction))
+    side[ingredient] = value
+    G.nodes[machine_idx]['object'] = dataclasses.replace(
+        nobj, **{direction: side})
+    pins = [(system.variables[con.tag[1]].edge, con.rhs)
+            for con in system.constraints if con.tag[0] == 'pin']
+    return build_system(G, pins)
+
+
+def variant(system: System, parameter: tuple, value) -> System:
+    """system with the parameter set to value. ValueError if the parameter
+    does not name a variable or recipe entry of the chart."""
+    kind = parameter[0]
+    if kind == 'pin':
+        (var,) = parameter[1:]
+        if var not in system.variables:
+            raise ValueError(f'no variable {var!r} to pin')
+        return _with_pin(system, var, value)
+    if kind == 'recipe':
+        machine_idx, direction, ingredient = parameter[1:]
+        nobj = system.graph.nodes[machine_idx]['object'] \
+            if machine_idx in system.graph else None
+        if direction not in ('I', 'O') or \
+                ingredient not in getattr(nobj, direction, {}):
+            raise ValueError(f'machine {machine_idx} has no {direction} '
+                             f'quantity for {ingredient!r}')
+        return _with_recipe(system, machine_idx, direction, ingredient, value)
+    raise ValueError(f'parameter kind must be one of {PARAMETER_KINDS}, '
+                     f'not {kind!r}')
+
+
+def _solve_chunk(system: System, parameter: tuple, values: list,
+                 options: dict) -> list:
+    """Solve the points in order; a pin point whose pins are a multiple of
+    any solved point's pins (latest first) is that point rescaled."""
+    results, anchors = [], []
+    for value in values:
+        point = variant(system, parameter, value)
+        pins = pin_values(point)
+        rescaled = None
+        if parameter[0] == 'pin':
+            for anchor_pins, anchor in reversed(anchors):
+                factor = pin_factor(anchor_pins, pins)
+                if factor is not None:
+                    rescaled = rescale_result(anchor, float(factor))
+                    break
+        if rescaled is not None:
+            results.append(rescaled)
+            continue
+        result = solve_decomposed(point, n_jobs=1, **options)
+        if result.status == 'optimal':
+            anchors.append((pins, result))
+        results.append(result)
+    return results
+
+
+@dataclasses.dataclass
+class Sweep:
+    parameter: tuple
+    values: np.ndarray
+    results: list                # LexResult per value
+    externals: dict              # external var -> (kind, ingredient)
+
+    def supports(self) -> list:
+        """(gated sources, gated sinks) per point, None if not optimal."""
+        return [(tuple(r.gated_sources), tuple(r.gated_sinks))
+                if r.status == 'optimal' else None for r in self.results]
+
+    def breakpoints(self) -> list:
+        """Indices i whose gate support differs from point i-1's (both
+        optimal): the change lies between values[i-1] and values[i]."""
+        supports = self.supports()
+        return [i for i in range(1, len(supports))
+                if None not in (supports[i - 1], supports[i])
+                and supports[i] != supports[i - 1]]
+
+    def columns(self) -> list:
+        return (['value', 'optimal', 'source_count', 'count_certified',
+                 'external_quantity', 'total_flow', 'support']
+                + [f'{kind}:{ing}'
+                   for kind, ing in sorted(set(self.externals.values()))])
+
+    def table(self) -> np.ndarray:
+        """One float row per point, in columns() order. support numbers the
+        distinct supports in order of appearance (-1: not optimal); the
+        flows of a point that did not solve are nan."""
+        flow_columns = sorted(set(self.externals.values()))
+        ids = {}
+        out = np.full((len(self.results), len(self.columns())), np.nan)
+        for i, (result, support) in enumerate(zip(self.results,
+                                                  self.supports())):
+            ok = result.status == 'optimal'
+            out[i, :7] = (self.values[i], ok, result.source_count,
+                          result.count_certified, result.external_quantity,
+                          result.total_flow,
+                          ids.setdefault(support, len(ids)) if ok else -1)
+            if ok:
+                flows = dict.fromkeys(flow_columns, 0.0)
+                for var, key in self.externals.items():
+                    flows[key] += result.values.get(var, 0.0)
+                out[i, 7:] = list(flows.values())
+        return out
+
+    def to_csv(self, path):
+        """table() plus the support spelled out, for plotting tools."""
+        with open(path, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(self.columns() + ['gated_sources', 'gated_sinks'])
+            for row, support in zip(self.table(), self.supports()):
+                sources, sinks = support or ((), ())
+                writer.writerow([f'{x:.12g}' for x in row]
+                                + [';'.join(sources), ';'.join(sinks)])
+
+
+@profiled()
+def sweep(system: System, parameter: tuple, values, backend: str = 'highs',
+          n_jobs: int = 1, **options) -> Sweep:
+    """Solve system at every value of parameter (see the module docstring),
+    in the given order. options go to solve_lexicographic. n_jobs > 1 fans
+    contiguous chunks of the values out to worker processes."""
+    values = list(values)
+    variant(system, parameter, values[0] if values else 0)   # validate
+    options = {'backend': backend, **options}
+    n_jobs = max(1, min(n_jobs or os.cpu_count() or 1, len(values)))
+    with span('sweep.solve', points=len(values), n_jobs=n_jobs):
+        if n_jobs == 1:
+            results = _solve_chunk(system, parameter, values, options)
+        else:
+            size = -(-len(values) // n_jobs)
+            chunks = [values[i:i + size] for i in range(0, len(values), size)]
+            with ProcessPoolExecutor(len(chunks),
+                                     mp_context=process_context()) as pool:
+                futures = [pool.submit(_solve_chunk, system, parameter, chunk,
+                                       options) for chunk in chunks]
+                results = [r for future in futures for r in future.result()]
+    externals = {info.name: (info.kind, info.ingredient)
+                 for info in system.variables.values()
+                 if info.kind in ('src', 'snk')}
+    return Sweep(parameter, np.array([float(v) for v in values]), results,
+                 externals)
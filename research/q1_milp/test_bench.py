@@ -0,0 +1,28 @@
+"""Benchmark report writers."""
+
+import csv
+
+from research.q1_milp.bench import CSV_FIELDS, write_machine_readable
+
+
+def test_csv_has_a_column_for_every_stage_any_row_timed(tmp_path):
+    """stage_walls keys depend on the solve path (exact, native, staged),
+    and a failed job has none: the CSV takes the union, sorted."""
+    rows = [
+        {'case': 'a', 'backend': 'highs', 'status': 'optimal', 'wall': 0.1,
+         'stage_walls': {'exact': 0.01, 'stage1': 0.02}},
+        {'case': 'b', 'backend': 'highs', 'status': 'optimal', 'wall': 0.2,
+         'stage_walls': {'native': 0.1, 'stage2': 0.05}},
+        {'case': 'c', 'backend': 'cbc', 'status': 'error', 'error': 'boom'},
+    ]
+    write_machine_readable(rows, tmp_path / 'bench.md')
+    with open(tmp_path / 'bench.csv', newline='') as f:
+        reader = csv.DictReader(f)
+        assert reader.fieldnames == CSV_FIELDS + ['exact', 'native',
+                                                  'stage1', 'stage2']
+        out = list(reader)
+    assert [row['case'] for row in out] == ['a', 'b', 'c']
+    assert out[0]['exact'] == '0.01' and out[0]['native'] == ''
+    assert out[1]['native'] == '0.1'
+    assert out[2]['status'] == 'error' and out[2]['stage1'] == ''
+    assert (tmp_path / 'bench.json').exists()
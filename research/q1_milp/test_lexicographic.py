@@ -2,15 +2,26 @@
 Phase 1). Run: uv run pytest research/ -q
 """
 
+import json
 import math
+import os
+from fractions import Fraction
+from pathlib import Path
 
+import networkx as nx
 import pytest
 
 from research.common.corpus import list_cases, load_case
 from research.common.matrix import rank_nullity
-from research.common.provenance import build_system
-from research.q1_milp.lexicographic import solve_lexicographic, edge_values
-from research.q1_milp.solvers import validate_solution
+from research.common.provenance import (Constraint, System, VariableInfo,
+                                        build_system)
+from research.q1_milp.cache import SolveCache, solve_cached, solve_key
+from research.q1_milp.decompose import solve_decomposed
+from research.q1_milp.lexicographic import (_base_model, _gate_map,
+                                            _set_big_m, edge_values,
+                                            solve_lexicographic)
+from research.q1_milp.propagate import propagate
+from research.q1_milp.solvers import HighsSession, solve, validate_solution
 
 BACKENDS = ['cbc', 'highs', 'scip']
 # Findings, not bugs here (see research.md): CBC returns a solution violating
@@ -19,6 +30,7 @@ BACKENDS = ['cbc', 'highs', 'scip']
 # floors are active (HiGHS solves it in ~2s).
 KNOWN_BAD = {('nanocircuits', 'cbc'), ('palladium', 'cbc'),
              ('palladium_line', 'cbc'), ('palladium_line', 'scip')}
+GOLDENS = Path(__file__).parents[1] / 'common' / 'goldens'
 
 
 def _solve(name, backend='highs', **kw):
@@ -185,3 +197,294 @@ def test_backends_agree_on_count(name):
         assert r.status == 'optimal'
         counts.add(r.source_count)
     assert len(counts) == 1, f'backends disagree on gated count for {name}'
+
+
+@pytest.mark.parametrize('name', [n for n in list_cases()
+                                  if (n, 'scip') not in KNOWN_BAD])
+def test_indicator_gates_reproduce_the_goldens(name):
+    """SCIP with native indicator gates (no big-M rows at all) must land on
+    the HiGHS big-M goldens."""
+    golden = json.loads(
+        (GOLDENS / f'{name.replace("/", "__")}.json').read_text())
+    system, r = _solve(name, 'scip', gate_encoding='indicator')
+    assert r.status == golden['status'] == 'optimal'
+    assert r.big_m == 0.0
+    assert not r.leak_detected
+    assert validate_solution(system, r.values)['ok']
+    if name == '230_platline':
+        # The golden is HiGHS's floored pass, which leaks one gate; without
+        # M the true optimum needs only the hydrogen source.
+        assert r.source_count < golden['source_count']
+        assert r.gated_sources == ['hydrogen'] and r.count_certified
+        return
+    assert r.source_count == golden['source_count']
+    assert sorted(r.gated_sources) == sorted(golden['gated_sources'])
+    assert sorted(r.gated_sinks) == sorted(golden['gated_sinks'])
+    assert r.external_quantity == pytest.approx(golden['external_quantity'],
+                                                rel=1e-6, abs=1e-9)
+
+
+@pytest.mark.parametrize('backend', ['highs', 'cbc', 'race'])
+def test_indicator_gates_need_a_supporting_backend(backend):
+    system = build_system(load_case('mk1').graph)
+    with pytest.raises(ValueError, match='indicator'):
+        solve_lexicographic(system, backend=backend, gate_encoding='indicator')
+
+
+def test_highs_session_deltas_match_a_rebuilt_model():
+    """The live HiGHS session must see exactly what a from-scratch build of
+    the same stage would: every delta kind, including removing a row."""
+    system, _ = _solve('testProjects/loopGraph')
+    gates = _gate_map(system)
+    session = HighsSession(_base_model(system, gates, 1e6))
+    ys = [g[k] for g in gates.values() for k in ('y_src', 'y_snk') if k in g]
+    external = system.external_vars()
+    session.set_objective({y: 1.0 for y in ys})
+    first = session.solve()
+    _set_big_m(session, gates, 1e7)
+    session.add_row({y: 1.0 for y in ys}, '<=', first.objective + 0.5,
+                    name='count_cap')
+    session.set_bounds({ys[0]: (0.0, 0.0)})
+    session.set_objective({v: 1.0 for v in external})
+    live = session.solve(presolve_off=True)
+    rebuilt = solve(session.current_model(presolve_off=True), 'highs')
+    assert live.status == rebuilt.status
+    assert live.objective == pytest.approx(rebuilt.objective, rel=1e-9)
+    session.remove_row('count_cap')
+    session.set_bounds({})
+    assert session.solve().objective == pytest.approx(
+        solve(session.current_model(), 'highs').objective, rel=1e-9)
+
+
+@pytest.mark.parametrize('name', ['jet_fuel', 'mk1', 'twoslack',
+                                  'nanocircuits', 'palladium'])
+def test_native_hierarchy_matches_the_goldens_in_one_call(name):
+    """lex_mode='native' answers from HiGHS's multi-objective solve alone
+    (no stage-2/3 solves) and lands on the staged goldens."""
+    golden = json.loads(
+        (GOLDENS / f'{name.replace("/", "__")}.json').read_text())
+    system, r = _solve(name, lex_mode='native', lp_fast_path=False,
+                       exact_path=False)
+    assert r.status == 'optimal'
+    assert 'native' in r.stage_walls and 'stage2' not in r.stage_walls
+    assert not r.leak_detected and r.count_certified
+    assert validate_solution(system, r.values)['ok']
+    assert r.source_count == golden['source_count']
+    assert sorted(r.gated_sources) == sorted(golden['gated_sources'])
+    assert sorted(r.gated_sinks) == sorted(golden['gated_sinks'])
+    assert r.external_quantity == pytest.approx(golden['external_quantity'],
+                                                rel=1e-6, abs=1e-9)
+    assert r.total_flow == pytest.approx(golden['total_flow'], rel=1e-6)
+
+
+@pytest.mark.parametrize('name', ['cetane', 'light_fuel', 'microsheep',
+                                  'nanocircuits'])
+def test_gateless_charts_skip_the_milp(name):
+    """Charts that need no intermediate gate are answered by the LP fast
+    path alone, with the same result as the full MILP stages."""
+    _, fast = _solve(name)
+    _, full = _solve(name, lp_fast_path=False)
+    assert fast.source_count == full.source_count == 0
+    assert fast.stage_walls['stage1'] == 0.0 and fast.big_m == 0.0
+    assert fast.count_certified and not fast.leak_detected
+    assert fast.machines_used == full.machines_used
+    assert fast.floors_used == full.floors_used
+    assert fast.external_quantity == pytest.approx(full.external_quantity,
+                                                   rel=1e-6)
+    assert fast.total_flow == pytest.approx(full.total_flow, rel=1e-6)
+
+
+@pytest.mark.parametrize('name', ['cetane', 'light_fuel', 'microsheep',
+                                  'nanocircuits', 'testProjects/simpleGraph'])
+def test_pin_determined_charts_solve_by_exact_propagation(name):
+    """No solver at all for charts the pins determine once gates are shut;
+    the answer must be the LP path's, and exact in every row."""
+    system, exact = _solve(name)
+    _, lp = _solve(name, exact_path=False)
+    assert 'exact' in exact.stage_walls and 'stage2' not in exact.stage_walls
+    assert exact.source_count == lp.source_count == 0
+    assert exact.count_certified and exact.machines_used == lp.machines_used
+    assert dict(exact.terminal_sources) == pytest.approx(
+        dict(lp.terminal_sources), rel=1e-9)
+    assert exact.external_quantity == pytest.approx(lp.external_quantity,
+                                                    rel=1e-9)
+    assert exact.total_flow == pytest.approx(lp.total_flow, rel=1e-9)
+    assert validate_solution(system, exact.values, tol=1e-9)['ok']
+
+
+def test_propagation_solves_stalled_loops_locally():
+    """A two-row cycle has no single-unknown row to start from: it is
+    handed to elimination as one piece, whose answer flows on; freedom or a
+    contradiction is reported, not guessed."""
+    one = Fraction(1)
+    variables = {v: VariableInfo(v, 'edge', (0, i), 'x', 0)
+                 for i, v in enumerate(('a', 'b', 'c'))}
+
+    def system(*rows):
+        return System([Constraint(tuple(terms), Fraction(rhs), ('t',))
+                       for terms, rhs in rows], variables, {}, nx.MultiDiGraph())
+
+    loop = propagate(system(([('a', one), ('b', -one)], 0),
+                            ([('a', one), ('b', one)], 2),
+                            ([('c', one), ('b', -2 * one)], 0)))
+    assert loop.determined and loop.local_solves == [2]
+    assert loop.values == {'a': 1, 'b': 1, 'c': 2}
+    free = propagate(system(([('a', one), ('b', -one)], 0)), {'c': 0})
+    assert free.consistent and not free.determined
+    clash = propagate(system(([('a', one), ('b', -one)], 0),
+                             ([('a', one), ('b', -one)], 1)), {'c': 0})
+    assert not clash.consistent
+
+
+def test_native_hierarchy_falls_back_to_the_stages():
+    """Backends without hierarchical objectives run the staged emulation,
+    and a HiGHS session is left with its ordinary objective afterwards."""
+    _, r = _solve('testProjects/loopGraph', 'scip', lex_mode='native')
+    assert r.status == 'optimal' and r.source_count == 1
+    assert 'native' not in r.stage_walls and 'stage3' in r.stage_walls
+
+    system, _ = _solve('testProjects/loopGraph')
+    gates = _gate_map(system)
+    session = HighsSession(_base_model(system, gates, 1e6))
+    external = {v: 1.0 for v in system.external_vars()}
+    session.solve_hierarchy([({g['y_src']: 1.0 for g in gates.values()
+                               if 'y_src' in g}, 0.5, 0.0), (external, 0, 0)])
+    session.set_objective(external)
+    assert session.solve().objective == pytest.approx(
+        solve(session.current_model(), 'highs').objective, rel=1e-9)
+
+
+def test_compiled_csr_reproduces_every_row():
+    """Backends read Model.compile(), never Model.rows: the CSR arrays must
+    carry each row's exact terms, sense and rhs, in var_names() order."""
+    system, _ = _solve('jet_fuel')
+    model = _base_model(system, _gate_map(system), 1e6)
+    compiled = model.compile()
+    assert compiled.names == model.var_names()
+    for i, row in enumerate(model.rows):
+        lo, hi = compiled.indptr[i], compiled.indptr[i + 1]
+        terms = {compiled.names[j]: c for j, c in
+                 zip(compiled.indices[lo:hi], compiled.data[lo:hi])}
+        assert terms == row.terms
+        assert (compiled.sense[i], compiled.rhs[i]) == (row.sense, row.rhs)
+    model.add({'x0': 1.0}, '<=', 5.0, name='extra')
+    assert model.compile().n_rows == compiled.n_rows + 1
+
+
+@pytest.mark.parametrize('name', ['testProjects/loopGraph', 'mk1'])
+def test_race_returns_a_validated_optimum(name):
+    """Whichever backend wins each stage, the answer is conservation-valid
+    and lexicographically equal to the HiGHS one."""
+    system, raced = _solve(name, 'race')
+    _, ref = _solve(name)
+    assert raced.status == 'optimal'
+    assert validate_solution(system, raced.values)['ok']
+    assert raced.source_count == ref.source_count
+    assert math.isclose(raced.external_quantity, ref.external_quantity,
+                        rel_tol=1e-6, abs_tol=1e-6)
+
+
+def test_disjoint_charts_decompose_and_stitch():
+    """Two unrelated charts on one canvas: two blocks, each solved exactly
+    as on its own, stitched into the monolithic optimum."""
+    loop, mk1 = load_case('testProjects/loopGraph'), load_case('mk1')
+    offset = max(loop.graph.nodes) + 1
+    graph = nx.union(loop.graph,
+                     nx.relabel_nodes(mk1.graph, lambda n: n + offset))
+    pins = [(p.edge, p.value) for p in loop.pins] + \
+        [((u + offset, v + offset), p.value) for p in mk1.pins
+         for u, v in [p.edge]]
+    system = build_system(graph, pins)
+    blocks = system.components()
+    assert len(blocks) == 2
+    assert sum(len(b.variables) for b in blocks) == len(system.variables)
+    assert sum(len(b.constraints) for b in blocks) == len(system.constraints)
+
+    whole = solve_lexicographic(system)
+    parts = [solve_lexicographic(b) for b in blocks]
+    stitched = solve_decomposed(system)
+    assert whole.status == stitched.status == 'optimal'
+    assert stitched.source_count == whole.source_count == \
+        sum(p.source_count for p in parts)
+    assert stitched.gated_sources == sorted(whole.gated_sources)
+    assert stitched.external_quantity == pytest.approx(whole.external_quantity,
+                                                       rel=1e-6)
+    assert stitched.total_flow == pytest.approx(whole.total_flow, rel=1e-6)
+    assert stitched.machines_total == whole.machines_total
+    assert validate_solution(system, stitched.values)['ok']
+
+
+def test_solve_cache_round_trip_and_invalidation(tmp_path, monkeypatch):
+    """A cache hit returns the stored result verbatim; a different pin,
+    backend or option is a different key; eviction keeps the newest."""
+    case = load_case('mk1')
+    pins = [(p.edge, p.value) for p in case.pins]
+    system = build_system(case.graph, pins)
+    cache = SolveCache(tmp_path)
+    fresh = solve_cached(system, cache=cache)
+    assert fresh.status == 'optimal'
+    assert cache.get(solve_key(system)) == fresh
+    assert solve_cached(system, cache=cache) == fresh
+
+    doubled = build_system(case.graph, [(e, 2 * v) for e, v in pins])
+    assert solve_key(doubled) != solve_key(system)
+    assert solve_key(system, 'scip') != solve_key(system)
+    assert solve_key(system, prefer_sinks=False) != solve_key(system)
+    assert solve_key(build_system(case.graph, pins)) == solve_key(system)
+
+    (entry,) = tmp_path.glob('*.json')
+    os.utime(entry, (0, 0))               # least recently used
+    small = SolveCache(tmp_path, max_bytes=entry.stat().st_size + 10)
+    small.put('newest', fresh)
+    assert [p.stem for p in tmp_path.glob('*.json')] == ['newest']
+
+    # Another process evicting the file between the read and the mtime
+    # refresh must not turn the hit into an error.
+    real_read_text = Path.read_text
+
+    def read_then_evict(path, *args, **kwargs):
+        text = real_read_text(path, *args, **kwargs)
+        path.unlink()
+        return text
+
+    monkeypatch.setattr(Path, 'read_text', read_then_evict)
+    assert small.get('newest') == fresh
+
+
+def test_pin_edits_retarget_the_cached_shape(tmp_path):
+    """A new target rate rescales the stored result with no solver; a
+    non-proportional multi-pin edit re-solves unless inherit_support asks
+    to keep the stored gate support; retarget=False is a fresh solve."""
+    case = load_case('mk1')
+    pins = [(p.edge, p.value) for p in case.pins]
+    cache = SolveCache(tmp_path)
+    base = solve_cached(build_system(case.graph, pins), cache=cache)
+
+    tripled = build_system(case.graph, [(e, 3 * v) for e, v in pins])
+    scaled = solve_cached(tripled, cache=cache)
+    fresh = solve_cached(tripled, cache=cache, retarget=False)
+    assert scaled.stage_walls == {} and fresh.stage_walls
+    assert scaled.big_m == base.big_m          # the M actually solved with
+    assert scaled.gate_m == {v: 3 * m for v, m in base.gate_m.items()}
+    assert scaled.gated_sinks == fresh.gated_sinks
+    assert scaled.external_quantity == pytest.approx(fresh.external_quantity,
+                                                     rel=1e-9)
+    assert scaled.values == pytest.approx(fresh.values, rel=1e-9, abs=1e-9)
+    assert validate_solution(tripled, scaled.values)['ok']
+
+    # A second pin on the light naquadah input makes a 2-sink chart; moving
+    # it alone is not a rescale.
+    solve_cached(build_system(case.graph, pins + [((5, 1), 19.5)]),
+                 cache=cache)
+    moved = build_system(case.graph, pins + [((5, 1), 21.0)])
+    fresh = solve_cached(moved, cache=cache)
+    assert fresh.stage_walls and not fresh.support_inherited
+    moved = build_system(case.graph, pins + [((5, 1), 22.0)])
+    inherited = solve_cached(moved, cache=cache, inherit_support=True)
+    fresh = solve_lexicographic(moved)
+    assert inherited.gated_sinks == fresh.gated_sinks
+    assert inherited.external_quantity == pytest.approx(
+        fresh.external_quantity, rel=1e-6)
+    assert inherited.count_certified and inherited.support_inherited
+    assert not fresh.support_inherited
+    assert validate_solution(moved, inherited.values)['ok']
@@ -7,7 +7,7 @@ from research.common.provenance import build_system
 from research.q1_milp.enumerate_optima import enumerate_optimal_supports
 from research.q1_milp.formulation_extent import (build_extent_system,
                                                  derived_edge_flows)
-from research.q1_milp.lexicographic import solve_lexicographic
+from research.q1_milp.lexicographic import _gate_map, solve_lexicographic
 from research.q1_milp.solvers import validate_solution
 
 
@@ -38,6 +38,21 @@ def test_mk1_has_exactly_the_two_mathmd_alternatives():
                       (('light naquadah fuel',), ())}
 
 
+def test_enumeration_builds_the_links_with_the_solves_ms():
+    """big_m=LexResult.gate_m: the solve's own support is among the optima,
+    and a gate whose M cannot carry its flow drops out of the list."""
+    case, pins = _pins('testProjects/loopGraph')
+    system = build_system(case.graph, pins)
+    r = solve_lexicographic(system)
+    sols = enumerate_optimal_supports(system, big_m=r.gate_m,
+                                      floors=r.floors, prefer_sinks=False)
+    assert {'sources': r.gated_sources, 'sinks': r.gated_sinks} in sols
+    choked = {**r.gate_m, _gate_map(system)['sulfuric acid']['src']: 1e-3}
+    sols = enumerate_optimal_supports(system, big_m=choked,
+                                      floors=r.floors, prefer_sinks=False)
+    assert sols == [{'sources': ['diluted sulfuric acid'], 'sinks': []}]
+
+
 @pytest.mark.parametrize('name', ['light_fuel', 'light_fuel_hydrogen_loop',
                                   'mk1', 'jet_fuel', 'cetane',
                                   'testProjects/loopGraph', 'nanocircuits'])
@@ -0,0 +1,63 @@
+"""Parametric sweeps: pin rescaling, support breakpoints, recipe edits."""
+
+import numpy as np
+import pytest
+
+from research.common.corpus import load_case
+from research.common.provenance import build_system
+from research.q1_milp.lexicographic import solve_lexicographic
+from research.q1_milp.sweep import sweep, variant
+
+
+def test_sweeping_the_only_pin_is_one_solve():
+    case = load_case('twoslack')
+    ((edge, value),) = [(p.edge, p.value) for p in case.pins]
+    system = build_system(case.graph, [(edge, value)])
+    result = sweep(system, ('pin', system.edge_to_var[edge]),
+                   [value / 10, value, value * 10])
+    assert [bool(r.stage_walls) for r in result.results] == [True, False, False]
+    assert result.breakpoints() == []
+    quantity = result.table()[:, result.columns().index('external_quantity')]
+    assert quantity == pytest.approx(quantity[0] * np.array([1, 10, 100]))
+
+
+def test_sweep_finds_support_breakpoints(tmp_path):
+    """A second pin moves the optimal support; every point matches a
+    fresh solve, in process or fanned out."""
+    case = load_case('twoslack')
+    system = build_system(case.graph, [(p.edge, p.value) for p in case.pins])
+    parameter = ('pin', system.edge_to_var[3, 1])
+    values = [40, 60, 80, 100]
+    result = sweep(system, parameter, values)
+    assert result.breakpoints()
+    for value, got, support in zip(values, result.results, result.supports()):
+        fresh = solve_lexicographic(variant(system, parameter, value))
+        assert support == (tuple(fresh.gated_sources),
+                           tuple(fresh.gated_sinks))
+        assert got.external_quantity == pytest.approx(fresh.external_quantity)
+    back = sweep(system, parameter, [40, 100, 40])     # any anchor, not the last
+    assert back.results[2].stage_walls == {}
+    assert back.supports()[2] == back.supports()[0] != back.supports()[1]
+    fanned = sweep(system, parameter, values, n_jobs=2)
+    assert fanned.supports() == result.supports()
+    np.testing.assert_allclose(fanned.table(), result.table())
+
+    result.to_csv(tmp_path / 'sweep.csv')
+    rows = (tmp_path / 'sweep.csv').read_text().splitlines()
+    assert len(rows) == 1 + len(values)
+    assert rows[0].startswith('value,optimal,source_count')
+
+
+def test_recipe_sweep_rebuilds_the_ratio_rows():
+    case = load_case('mk1')
+    system = build_system(case.graph, [(p.edge, p.value) for p in case.pins])
+    nobj = case.graph.nodes[0]['object']
+    parameter = ('recipe', 0, 'O', 'naquadah fuel mk1')
+    result = sweep(system, parameter, [50, 100, 200])
+    assert result.results[1].values == pytest.approx(
+        solve_lexicographic(system).values, rel=1e-9, abs=1e-9)
+    assert nobj.O['naquadah fuel mk1'] == 100       # the chart is untouched
+    quantity = [r.external_quantity for r in result.results]
+    assert quantity == sorted(quantity, reverse=True)
+    with pytest.raises(ValueError):
+        variant(system, ('recipe', 0, 'O', 'water'), 1)
@@ -13,7 +13,7 @@ from pathlib import Path
 
 from research.common.corpus import load_case
 from research.common.provenance import build_system
-from research.q1_milp.lexicographic import solve_lexicographic
+from research.q1_milp.cache import solve_cached
 from research.q1_milp.solvers import validate_solution
 from research.q2_diagnostics.rank_nullity import analyze
 
@@ -30,11 +30,11 @@ def main() -> str:
     pins = [(p.edge, p.value) for p in case.pins]
     system = build_system(case.graph, pins)
 
-    bare = load_case('palladium_line', with_externals=False)
+    bare = case.bare()
     bare_system = build_system(bare.graph, [(p.edge, p.value) for p in bare.pins])
     rank_report = analyze(bare_system)
 
-    result = solve_lexicographic(system, backend='highs')
+    result = solve_cached(system, backend='highs')
     check = validate_solution(system, result.values)
 
     n_machines = sum(1 for _, n in case.graph.nodes.items()
@@ -8,10 +8,9 @@ survives (see research.md Q2).
 
 from dataclasses import dataclass
 
-import sympy
-
-from research.common.corpus import Case, load_case
-from research.common.matrix import system_matrix
+from research.common.corpus import Case
+from research.common.elimination import eliminate
+from research.common.matrix import sparse_system_matrix
 from research.common.provenance import System, build_system
 
 
@@ -62,22 +61,22 @@ def analyze(case_or_system, pins=None) -> RankReport:
         system = case_or_system
     else:
         case = case_or_system
-        bare = load_case(case.name, with_externals=False)
+        bare = case.bare()
         system = build_system(bare.graph,
                               [(p.edge, p.value) for p in bare.pins])
 
-    A, b, var_order = system_matrix(system, include_kinds=('edge',))
-    aug = A.row_join(b)
-    rank = A.rank()
-    consistent = aug.rank() == rank
+    rows, rhs, var_order = sparse_system_matrix(system, include_kinds=('edge',))
+    echelon = eliminate(rows, rhs, len(var_order))
+    rank = echelon.rank
+    consistent = echelon.consistent
     nullity = len(var_order) - rank
 
     freedom_groups = []
     if consistent and nullity:
-        for basis_vec in A.nullspace():
+        for basis_vec in echelon.nullspace():
             edges = []
-            for i, val in enumerate(basis_vec):
-                if val != 0:
+            for i in sorted(basis_vec):
+                if basis_vec[i] != 0:
                     info = system.variables[var_order[i]]
                     direction = 'in' if info.edge[1] == info.machine_idx else 'out'
                     edges.append((info.name, info.ingredient,
@@ -92,7 +91,7 @@ def analyze(case_or_system, pins=None) -> RankReport:
         # minimal check is an LP; here we do the cheap certain case:
         # nullity == 0 and the unique solution has negative entries.
         if nullity == 0 and rank == len(var_order):
-            solution = A.solve(b)
+            solution = echelon.particular()
             for i, val in enumerate(solution):
                 if val < 0:
                     info = system.variables[var_order[i]]
@@ -1,9 +1,23 @@
 """Phase 3 acceptance tests: diagnostics explain broken/ambiguous input."""
 
-from research.common.corpus import load_case
+import contextlib
+import io
+
+import pytest
+import sympy
+
+from research.common.corpus import _case_path, load_case
+from research.common.elimination import eliminate
+from research.common.matrix import sparse_system_matrix, system_matrix
 from research.common.provenance import build_system
 from research.q2_diagnostics.iis import find_iis
 from research.q2_diagnostics.rank_nullity import analyze
+from src.core.addUserLocking import addSympyUserChosenQuantityFromFlow1Yaml
+from src.core.connectGraph import produceConnectedGraphFromDisjoint
+from src.core.flow1Compat import constructDisjointGraphFromFlow1Yaml
+from src.core.graphToEquations import constructSymPyFromGraph
+from src.core.preProcessing import removeIgnorableIngredients
+from sympy_solver import exactLinsolve, sparseLinsolve, sparseSystemFromGraph
 
 
 def _bare_system(name, extra_pins=()):
@@ -48,3 +62,91 @@ def test_iis_names_conflicting_pins():
     assert len(conflict.constraints) <= 6, 'IIS should be minimal, not the whole chart'
     text = conflict.human()
     assert 'cannot all hold' in text and 'Mitigations' in text
+
+
+@pytest.mark.parametrize('name', ['jet_fuel', 'testProjects/undeterminedMultiInput',
+                                  'testProjects/sideLockedMultiInput', 'mk1'])
+def test_sparse_elimination_agrees_with_dense_sympy(name):
+    """Same rank and consistency as sympy; the particular solution and every
+    nullspace vector check exactly against the dense matrix."""
+    system = _bare_system(name)
+    A, b, _ = system_matrix(system)
+    rows, rhs, var_order = sparse_system_matrix(system)
+    echelon = eliminate(rows, rhs, len(var_order))
+    assert echelon.rank == A.rank()
+    assert echelon.consistent == (A.row_join(b).rank() == A.rank())
+    if not echelon.consistent:
+        assert echelon.conflict_rows
+        return
+    x = echelon.particular()
+    for row, target in zip(rows, rhs):
+        assert sum(c * x[j] for j, c in row.items()) == target
+    basis = echelon.nullspace()
+    assert len(basis) == echelon.nullity
+    for vec in basis:
+        for row in rows:
+            assert sum(c * vec.get(j, 0) for j, c in row.items()) == 0
+
+
+def test_nanocircuits_rank_is_interactive():
+    """394 machines: dense sympy did not finish in 5 minutes."""
+    report = analyze(_bare_system('nanocircuits'))
+    assert report.consistent and report.rank == 1300
+
+
+def _sympy_solver_system(name):
+    path = _case_path(name)
+    G = constructDisjointGraphFromFlow1Yaml(path)
+    G = removeIgnorableIngredients(produceConnectedGraphFromDisjoint(G))
+    with contextlib.redirect_stdout(io.StringIO()):
+        eqs, edge_to_var, slack = constructSymPyFromGraph(G, construct_slack=True)
+        eqs = addSympyUserChosenQuantityFromFlow1Yaml(G, edge_to_var, eqs, path)
+    return eqs, list(edge_to_var.values()) + list(slack.values())
+
+
+@pytest.mark.parametrize('name', ['light_fuel_hydrogen_loop', 'jet_fuel',
+                                  'testProjects/sideLockedMultiInput'])
+def test_exact_linsolve_matches_sympy(name):
+    """Same determined values as sympy.linsolve; the parametrization (free
+    variables may differ) satisfies every equation identically."""
+    eqs, variables = _sympy_solver_system(name)
+    solution, conflict = exactLinsolve(eqs, variables)
+    (reference,) = sympy.linsolve(eqs, *variables)
+    assert not conflict
+    for ours, theirs in zip(solution, reference):
+        assert ours.is_Number == theirs.is_Number
+        if ours.is_Number:
+            assert ours == theirs
+    substitution = dict(zip(variables, solution))
+    for eq in eqs:
+        assert sympy.expand(sympy.sympify(eq).xreplace(substitution)) == 0
+
+
+def test_exact_linsolve_reports_conflicting_equations():
+    eqs, variables = _sympy_solver_system('light_fuel_hydrogen_loop')
+    pin = eqs[-1]                       # the chart's locked quantity
+    clash = pin - 1
+    solution, conflict = exactLinsolve(eqs + [clash], variables)
+    assert solution is None
+    assert pin in conflict and clash in conflict
+
+
+@pytest.mark.parametrize('name', ['light_fuel_hydrogen_loop', 'jet_fuel'])
+def test_sparse_rows_from_the_graph_match_the_sympy_equations(name):
+    """sympy_solver's expression-free path: same determined values, by
+    variable name, as solving the sympy equations."""
+    eqs, variables = _sympy_solver_system(name)
+    reference, _ = exactLinsolve(eqs, variables)
+    path = _case_path(name)
+    G = constructDisjointGraphFromFlow1Yaml(path)
+    G = removeIgnorableIngredients(produceConnectedGraphFromDisjoint(G))
+    with contextlib.redirect_stdout(io.StringIO()):
+        rows, rhs, columns, _, _ = sparseSystemFromGraph(G, path)
+    solution, conflict = sparseLinsolve(rows, rhs, columns)
+    assert not conflict
+    ours = {var.name: value for var, value in zip(columns, solution)}
+    theirs = {var.name: value for var, value in zip(variables, reference)}
+    assert ours.keys() == theirs.keys()
+    for name, value in theirs.items():
+        if value.is_Number:
+            assert ours[name] == value
@@ -2,6 +2,8 @@
 
 import pygraphviz as pgv
 
+from research.common.profiling import profiled
+
 POINTS_PER_INCH = 72.0
 
 
@@ -44,6 +46,7 @@ def _sample_bspline(ctrl, samples_per_seg=8):
     return out
 
 
+@profiled('layout.dot')
 def layout(graph_json: dict, style: str = 'layered') -> dict:
     if style != 'layered':
         raise ValueError('dot only does layered layout')
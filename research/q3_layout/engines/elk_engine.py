@@ -7,9 +7,12 @@ import json
 import subprocess
 from pathlib import Path
 
+from research.common.profiling import profiled
+
 RUNNER = Path(__file__).parent / 'elk_runner' / 'run_elk.mjs'
 
 
+@profiled('layout.elk')
 def layout(graph_json: dict, style: str = 'layered') -> dict:
     request = json.dumps({'graph': graph_json, 'style': style})
     proc = subprocess.run(['node', str(RUNNER)], input=request,
@@ -3,6 +3,8 @@
 from grandalf.graphs import Edge, Graph, Vertex
 from grandalf.layouts import SugiyamaLayout
 
+from research.common.profiling import profiled
+
 
 class _View:
     def __init__(self, w, h):
@@ -10,6 +12,7 @@ class _View:
         self.xy = (0, 0)
 
 
+@profiled('layout.grandalf')
 def layout(graph_json: dict, style: str = 'layered') -> dict:
     if style != 'layered':
         raise ValueError('grandalf only does layered layout')
@@ -12,6 +12,8 @@ import subprocess
 import sys
 from pathlib import Path
 
+from research.common.profiling import profiled
+
 REPO_ROOT = Path(__file__).resolve().parents[3]
 WORKER = 'research.q3_layout.engines.ogdf_worker'
 DEFAULT_TIMEOUT_S = 120
@@ -58,6 +60,7 @@ def _worker_call(request: dict, timeout_s: float) -> dict:
     return out
 
 
+@profiled('layout.ogdf')
 def layout(graph_json: dict, style: str = 'layered', opts: dict = None,
            timeout_s: float = DEFAULT_TIMEOUT_S) -> dict:
     opts = dict(opts or {})
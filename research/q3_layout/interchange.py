@@ -8,8 +8,10 @@ node style at the user's request.
 """
 
 from research.common.corpus import load_case
+from research.common.profiling import profiled
 from research.common.provenance import build_system
-from research.q1_milp.lexicographic import ZERO, solve_lexicographic
+from research.q1_milp.cache import solve_cached
+from research.q1_milp.lexicographic import ZERO
 from src.data.basicTypes import ExternalNode, IngredientNode, MachineNode
 
 CHAR_W = 6.6      # crude but engine-neutral text metrics (11px sans)
@@ -59,11 +61,12 @@ def solved_graph_json(name: str, backend: str = 'highs',
     """
     case = load_case(name)
     system = build_system(case.graph, [(p.edge, p.value) for p in case.pins])
-    result = solve_lexicographic(system, backend=backend)
+    result = solve_cached(system, backend=backend)
     assert result.status == 'optimal', f'{name}: {result.status}'
     return build_graph_json(case, system, result, lead=lead)
 
 
+@profiled()
 def build_graph_json(case, system, result, lead: str = None,
                      use_yaml_groups: bool = True,
                      auto_subgraphs: bool = False) -> dict:
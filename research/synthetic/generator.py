@@ -0,0 +1,149 @@
+"""Synthetic flow1-style charts for scaling experiments.
+
+Real charts top out at nanocircuits (394 machines). generate() builds
+GT-shaped production chains at any size: machines consume ingredients made
+by recent upstream machines (real chains are local — a step feeds the next
+few steps, not the whole factory), a recycle_density fraction of machines
+also consume something made downstream (loops like the hydrogen recycle in
+light_fuel_hydrogen_loop).
+
+Quantities follow real recipe data: each ingredient has a magnitude drawn
+log-uniform over the 0.05 (dusts) .. 20000 (fluids) spread that trips
+solver tolerances, and every recipe using it stays within a small factor of
+that magnitude. Chains are at most max_depth machines deep; big factories
+are wide, not deep. Independent random quantities along deep chains would
+compound into flows spanning e^100 — no real chart looks like that, and
+every solver reports such charts infeasible.
+
+Everything is seeded: the same SyntheticSpec always yields the same chart.
+"""
+
+import math
+import random
+import tempfile
+from dataclasses import dataclass
+from pathlib import Path
+
+import yaml
+
+from research.common.corpus import Case, load_case
+
+MACHINE_NAMES = ('mixer', 'chemical reactor', 'large chemical reactor',
+                 'centrifuge', 'electrolyzer', 'distillery',
+                 'distillation tower', 'assembler', 'fluid solidifier',
+                 'electric blast furnace')
+TIERS = (('LV', 30), ('MV', 120), ('HV', 480), ('EV', 1920), ('IV', 7680))
+
+
+@dataclass(frozen=True)
+class SyntheticSpec:
+    machines: int = 100
+    fan_in: int = 3               # inputs per machine: 1..fan_in
+    fan_out: int = 2              # outputs per machine: 1..fan_out
+    recycle_density: float = 0.05  # fraction of machines with a back edge
+    locality: int = 8             # inputs come from the last `locality` machines
+    raw_share: float = 0.15       # chance an input is a fresh raw material
+    max_depth: int = 12           # longest producer chain feeding a machine
+    jitter: float = 4.0           # recipe qty within magnitude / j .. * j
+    coeff_min: float = 0.05
+    coeff_max: float = 20000.0
+    pins: int = 1
+    pin_placement: str = 'sinks'  # 'sinks' (targets on the last machines)
+                                  # | 'spread' (number pins across the chart)
+    seed: int = 0
+
+
+def _magnitude(rng, spec):
+    return math.exp(rng.uniform(math.log(spec.coeff_min),
+                                math.log(spec.coeff_max)))
+
+
+def _quantity(rng, spec, magnitude):
+    """Per-craft quantity near the ingredient's magnitude, rounded like
+    recipe data."""
+    j = math.log(spec.jitter)
+    q = magnitude * math.exp(rng.uniform(-j, j))
+    return round(q, 2) if q < 10 else int(round(q))
+
+
+def generate(spec: SyntheticSpec) -> list:
+    """The chart as the list of machine dicts a flow1 YAML file holds."""
+    assert spec.pin_placement in ('sinks', 'spread')
+    assert 1 <= spec.pins <= spec.machines
+    rng = random.Random(spec.seed)
+    outputs = []          # machine index -> output ingredient names
+    depth = []            # machine index -> longest producer chain
+    magnitude = {}        # ingredient -> typical per-craft quantity
+    conf = []
+    n_raw = 0
+    for i in range(spec.machines):
+        inputs, d = set(), 1
+        for _ in range(rng.randint(1, spec.fan_in)):
+            upstream = (rng.randrange(max(0, i - spec.locality), i)
+                        if i else None)
+            if upstream is None or rng.random() < spec.raw_share or \
+                    depth[upstream] >= spec.max_depth:
+                ing = f'raw {n_raw}'
+                n_raw += 1
+                magnitude[ing] = _magnitude(rng, spec)
+            else:
+                ing = rng.choice(outputs[upstream])
+                d = max(d, depth[upstream] + 1)
+            inputs.add(ing)
+        made = [f'ingredient {i}.{k}' for k in range(rng.randint(1, spec.fan_out))]
+        for ing in made:
+            magnitude[ing] = _magnitude(rng, spec)
+        outputs.append(made)
+        depth.append(d)
+        tier, eut = rng.choice(TIERS)
+        conf.append({'m': rng.choice(MACHINE_NAMES), 'tier': tier,
+                     'I': {ing: _quantity(rng, spec, magnitude[ing])
+                           for ing in sorted(inputs)},
+                     'O': {ing: _quantity(rng, spec, magnitude[ing])
+                           for ing in made},
+                     'eut': eut, 'dur': rng.choice((1, 5, 10, 20, 40, 60, 120))})
+
+    # Recycle loops: an upstream machine also consumes a downstream product.
+    if spec.machines > 1:
+        for _ in range(int(spec.recycle_density * spec.machines)):
+            late = rng.randrange(1, spec.machines)
+            early = rng.randrange(max(0, late - spec.locality), late)
+            ing = rng.choice(outputs[late])
+            if ing not in conf[early]['O']:
+                conf[early]['I'][ing] = _quantity(rng, spec, magnitude[ing])
+
+    if spec.pin_placement == 'sinks':
+        for i in range(spec.machines - spec.pins, spec.machines):
+            product = outputs[i][0]
+            # Users pin a few machines' worth per second, not per craft.
+            rate = conf[i]['O'][product] * rng.choice((1, 2, 4, 8))
+            conf[i]['target'] = {product: float(f'{rate:.3g}')}
+    else:
+        step = spec.machines / spec.pins
+        for k in range(spec.pins):
+            conf[int(k * step)]['number'] = rng.choice((1, 2, 4, 8))
+    return conf
+
+
+def spec_name(spec: SyntheticSpec) -> str:
+    return (f'synthetic_{spec.machines}m_in{spec.fan_in}_out{spec.fan_out}_'
+            f'r{spec.recycle_density:g}_p{spec.pins}{spec.pin_placement}_'
+            f's{spec.seed}')
+
+
+def write_yaml(spec: SyntheticSpec, path) -> Path:
+    path = Path(path)
+    with open(path, 'w') as f:
+        yaml.safe_dump(generate(spec), f, sort_keys=False)
+    return path
+
+
+def synthetic_case(spec: SyntheticSpec, directory=None) -> Case:
+    """Generate, write and load through corpus.load_case, so the graph went
+    through exactly the pipeline a user's YAML would (water removal,
+    externals, pin resolution). directory=None uses a temp dir."""
+    if directory is None:
+        with tempfile.TemporaryDirectory() as tmp:
+            return synthetic_case(spec, tmp)
+    path = write_yaml(spec, Path(directory) / f'{spec_name(spec)}.yaml')
+    return load_case(str(path))
@@ -0,0 +1,219 @@
+"""Scaling benchmark: synthetic charts from 100 to 20,000 machines through
+every pipeline stage -> research/synthetic/scaling_results.md + .csv.
+
+Each size runs load_case -> build_system -> solve_decomposed ->
+build_graph_json in one child process that reports each stage as it
+finishes; each layout engine then runs in its own child on the exported
+graph JSON. A stage over --timeout seconds is killed and reported, so the
+run shows how far every stage got at every size. The markdown adds the
+empirical exponent k (t ~ n^k) between consecutive sizes: k near 1 is
+linear, k >= 2 is where users' mega-factories will hurt.
+
+Run: uv run python -m research.synthetic.scaling [--sizes 100,1000] [--timeout S]
+"""
+
+import argparse
+import csv
+import importlib
+import json
+import math
+import multiprocessing
+import tempfile
+import time
+from dataclasses import replace
+from pathlib import Path
+
+from research.synthetic.generator import SyntheticSpec, write_yaml
+
+SIZES = [100, 300, 1000, 3000, 10000, 20000]
+STAGE_TIMEOUT_S = 120
+OUT = Path(__file__).with_name('scaling_results.md')
+PIPELINE = ['generate', 'load_case', 'build_system', 'solve', 'graph_json']
+# engine -> (module, style); layered is the one style every engine has.
+LAYOUTS = {
+    'dot': ('research.q3_layout.engines.dot_engine', 'layered'),
+    'elk': ('research.q3_layout.engines.elk_engine', 'layered'),
+    'ogdf': ('research.q3_layout.engines.ogdf_engine', 'layered'),
+    'grandalf': ('research.q3_layout.engines.grandalf_engine', 'layered'),
+}
+
+
+def _pipeline_worker(conn, spec, work_dir):
+    """Runs the pipeline stages, sending (stage, status, seconds, info)
+    after each one."""
+    from research.common.corpus import load_case
+    from research.common.provenance import build_system
+    from research.q1_milp.decompose import solve_decomposed
+    from research.q3_layout.interchange import build_graph_json
+
+    def timed(fn, *args, **kw):
+        t0 = time.perf_counter()
+        out = fn(*args, **kw)
+        return out, time.perf_counter() - t0
+
+    try:
+        path, dt = timed(write_yaml, spec,
+                         Path(work_dir) / f'{spec.machines}.yaml')
+        conn.send(('generate', 'ok', dt, {}))
+        case, dt = timed(load_case, str(path))
+        conn.send(('load_case', 'ok', dt, {'nodes': case.graph.number_of_nodes(),
+                                           'edges': case.graph.number_of_edges()}))
+        pins = [(p.edge, p.value) for p in case.pins]
+        system, dt = timed(build_system, case.graph, pins)
+        conn.send(('build_system', 'ok', dt,
+                   {'variables': len(system.variables),
+                    'constraints': len(system.constraints)}))
+        result, dt = timed(solve_decomposed, system)
+        conn.send(('solve', result.status, dt,
+                   {'gates': result.source_count,
+                    'stage_walls': {k: round(v, 3)
+                                    for k, v in result.stage_walls.items()}}))
+        if result.status != 'optimal':
+            return
+        graph_json, dt = timed(build_graph_json, case, system,
+                               result)
+        (Path(work_dir) / f'{spec.machines}.json').write_text(
+            json.dumps(graph_json))
+        conn.send(('graph_json', 'ok', dt, {'nodes': len(graph_json['nodes'])}))
+    except Exception as exc:
+        conn.send((None, 'error', 0.0, {'error': f'{type(exc).__name__}: {exc}'}))
+    finally:
+        conn.close()
+
+
+def _layout_worker(conn, engine, graph_path):
+    try:
+        module, style = LAYOUTS[engine]
+        layout = importlib.import_module(module).layout
+        graph_json = json.loads(Path(graph_path).read_text())
+        t0 = time.perf_counter()
+        layout(graph_json, style)
+        conn.send((engine, 'ok', time.perf_counter() - t0, {}))
+    except Exception as exc:
+        conn.send((engine, 'error', 0.0,
+                   {'error': f'{type(exc).__name__}: {str(exc)[:200]}'}))
+    finally:
+        conn.close()
+
+
+def _run_streaming(target, args, stages, timeout) -> dict:
+    """Run `target` in a child that reports stages in order; kill it when
+    the stage in progress exceeds `timeout`. Returns stage -> row."""
+    recv, send = multiprocessing.Pipe(duplex=False)
+    proc = multiprocessing.Process(target=target, args=(send, *args))
+    proc.start()
+    send.close()
+    rows = {}
+    pending = list(stages)
+    started = time.monotonic()
+    while pending:
+        if not recv.poll(max(0.0, started + timeout - time.monotonic())):
+            proc.kill()
+            rows[pending[0]] = {'status': 'timeout', 'seconds': timeout}
+            break
+        try:
+            stage, status, seconds, info = recv.recv()
+        except EOFError:           # child exited (early return or crash)
+            break
+        stage = stage or pending[0]
+        rows[stage] = {'status': status, 'seconds': round(seconds, 4), **info}
+        pending = pending[pending.index(stage) + 1:]
+        if status not in ('ok', 'optimal'):
+            break
+        started = time.monotonic()
+    proc.join()
+    recv.close()
+    return rows
+
+
+def run(sizes, spec=SyntheticSpec(), engines=tuple(LAYOUTS),
+        timeout=STAGE_TIMEOUT_S) -> list:
+    rows = []
+    with tempfile.TemporaryDirectory() as work_dir:
+        for n in sizes:
+            stages = _run_streaming(_pipeline_worker,
+                                    (replace(spec, machines=n), work_dir),
+                                    PIPELINE, timeout)
+            graph_path = Path(work_dir) / f'{n}.json'
+            for engine in engines:
+                if graph_path.exists():
+                    stages.update(_run_streaming(
+                        _layout_worker, (engine, str(graph_path)),
+                        [engine], timeout))
+            for stage, row in stages.items():
+                rows.append({'machines': n, 'stage': stage, **row})
+                print(f'  {n:>6} {stage:<12} {row["status"]:<10} '
+                      f'{row["seconds"]:.3f}s')
+    return rows
+
+
+def _exponent(t1, n1, t2, n2):
+    if not (t1 and t2) or t1 <= 0 or t2 <= 0:
+        return None
+    return math.log(t2 / t1) / math.log(n2 / n1)
+
+
+def write_outputs(rows, sizes, stages, timeout=STAGE_TIMEOUT_S, path=OUT):
+    fields = ['machines', 'stage', 'status', 'seconds', 'nodes', 'edges',
+              'variables', 'constraints', 'gates', 'stage_walls', 'error']
+    with open(path.with_suffix('.csv'), 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=fields)
+        writer.writeheader()
+        for row in rows:
+            writer.writerow({k: row.get(k, '') for k in fields})
+
+    cell = {(r['machines'], r['stage']): r for r in rows}
+    lines = ['# Scaling benchmark (synthetic charts)', '',
+             'Seconds per pipeline stage; each layout engine runs its '
+             f'layered style. Stages over {timeout:g}s are killed. '
+             'k = empirical exponent between this size and the previous one '
+             '(t ~ n^k).', '',
+             '| machines | ' + ' | '.join(stages) + ' |',
+             '|---|' + '---|' * len(stages)]
+    for i, n in enumerate(sizes):
+        cells = []
+        for stage in stages:
+            row = cell.get((n, stage))
+            if row is None:
+                cells.append('—')
+                continue
+            if row['status'] not in ('ok', 'optimal'):
+                cells.append(f'{row["status"]}')
+                continue
+            text = f'{row["seconds"]:.3g}s'
+            prev = cell.get((sizes[i - 1], stage)) if i else None
+            if prev and prev['status'] in ('ok', 'optimal'):
+                k = _exponent(prev['seconds'], sizes[i - 1], row['seconds'], n)
+                if k is not None:
+                    text += f' (k={k:.2f})'
+            cells.append(text)
+        lines.append(f'| {n} | ' + ' | '.join(cells) + ' |')
+    path.write_text('\n'.join(lines) + '\n')
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', default=','.join(map(str, SIZES)),
+                        help='comma-separated machine counts')
+    parser.add_argument('--engines', default=','.join(LAYOUTS),
+                        help='comma-separated layout engines ("" for none)')
+    parser.add_argument('--timeout', type=float, default=STAGE_TIMEOUT_S,
+                        help='seconds before a stage is killed')
+    parser.add_argument('--recycle-density', type=float,
+                        default=SyntheticSpec.recycle_density)
+    parser.add_argument('--pins', type=int, default=SyntheticSpec.pins)
+    parser.add_argument('--pin-placement', choices=['sinks', 'spread'],
+                        default=SyntheticSpec.pin_placement)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    sizes = [int(s) for s in args.sizes.split(',')]
+    engines = [e for e in args.engines.split(',') if e]
+    spec = SyntheticSpec(recycle_density=args.recycle_density, pins=args.pins,
+                         pin_placement=args.pin_placement, seed=args.seed)
+    rows = run(sizes, spec, engines, args.timeout)
+    write_outputs(rows, sizes, PIPELINE + engines, args.timeout)
+    print(f'\nwrote {OUT} and {OUT.with_suffix(".csv")}')
+
+
+if __name__ == '__main__':
+    main()
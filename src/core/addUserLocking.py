@@ -2,11 +2,11 @@ from pathlib import Path
 from typing import Union
 
 import sympy
-import yaml
 from networkx import MultiDiGraph
 from pulp import LpProblem, LpVariable
 
-from src.data.basicTypes import IngredientNode, MachineNode
+from src.core.chartIndex import ChartIndex
+from src.core.sharedYamlLoad import loadYamlFile
 
 
 def addPulpUserChosenQuantityFromFlow1Yaml(
@@ -15,39 +15,24 @@ def addPulpUserChosenQuantityFromFlow1Yaml(
         problem: LpProblem,
         yaml_path: Union[str, Path]
     ):
-    with open(yaml_path, 'r') as f:
-        conf = yaml.safe_load(f)
-
-    # Create machine_index: node index mapping
-    machine_index_to_node_index = {}
-    machine_index = 0
-    for node_idx, node in G.nodes.items():
-        nobj = node['object']
-        if isinstance(nobj, MachineNode):
-            machine_index_to_node_index[machine_index] = node_idx
-            machine_index += 1
-
-    # Create ingredient name: node index mapping
-    ingredient_name_to_node_index = {}
-    for node_idx, node in G.nodes.items():
-        nobj = node['object']
-        if isinstance(nobj, IngredientNode):
-            ingredient_name_to_node_index[nobj.name] = node_idx
+    conf = loadYamlFile(yaml_path)
+
+    index = ChartIndex.of(G)
 
     # Add locking equation to LpProblem
     for machine_index, machine_dict in enumerate(conf):
-        node_idx = machine_index_to_node_index[machine_index]
+        node_idx = index.machine_nodes[machine_index]
         nobj = G.nodes[node_idx]['object']
         if 'number' in machine_dict:
             # Pick the first item quantity and lock it
             # I could lock everything, but the others can be inferred directly from the first
             if len(nobj.I) > 0:
                 ingredient_name = list(nobj.I.keys())[0]
-                edge = (ingredient_name_to_node_index[ingredient_name], node_idx)
+                edge = index.machineEdge(node_idx, 'I', ingredient_name)
                 problem += edge_to_variable[edge] == machine_dict['number'] # FIXME:
             elif len(nobj.O) > 0:
                 ingredient_name = list(nobj.O.keys())[0]
-                edge = (node_idx, ingredient_name_to_node_index[ingredient_name])
+                edge = index.machineEdge(node_idx, 'O', ingredient_name)
                 problem += edge_to_variable[edge] == machine_dict['number'] # FIXME:
             else:
                 raise RuntimeError('Attempt to lock machine that has no inputs or outputs')
@@ -66,10 +51,7 @@ def addPulpUserChosenQuantityFromFlow1Yaml(
             target = machine_dict['target']
             for target_name, target_quantity in target.items():
                 direction, base_quantity = ingredient_lookup[target_name]
-                if direction == 'I':
-                    edge = (ingredient_name_to_node_index[target_name], node_idx)
-                elif direction == 'O':
-                    edge = (node_idx, ingredient_name_to_node_index[target_name])
+                edge = index.machineEdge(node_idx, direction, target_name)
                 problem += edge_to_variable[edge] == target_quantity # FIXME:
             
             print(f'added "target" locking equation for "{target_name}" on {edge}')
@@ -77,53 +59,36 @@ def addPulpUserChosenQuantityFromFlow1Yaml(
     return problem
 
 
-def addSympyUserChosenQuantityFromFlow1Yaml(
+def userChosenQuantitiesFromFlow1Yaml(
         G: MultiDiGraph,
-        edge_to_variable,
-        system_of_equations,
         yaml_path: Union[str, Path]
     ):
-    with open(yaml_path, 'r') as f:
-        conf = yaml.safe_load(f)
-
-    # Create machine_index: node index mapping
-    machine_index_to_node_index = {}
-    machine_index = 0
-    for node_idx, node in G.nodes.items():
-        nobj = node['object']
-        if isinstance(nobj, MachineNode):
-            machine_index_to_node_index[machine_index] = node_idx
-            machine_index += 1
-
-    # Create ingredient name: node index mapping
-    ingredient_name_to_node_index = {}
-    for node_idx, node in G.nodes.items():
-        nobj = node['object']
-        if isinstance(nobj, IngredientNode):
-            ingredient_name_to_node_index[nobj.name] = node_idx
+    # The flow1 "number"/"target" locks as (edge, quantity) pairs
+    conf = loadYamlFile(yaml_path)
 
-    # Add locking equation to LpProblem
+    index = ChartIndex.of(G)
+
+    locks = []
     for machine_index, machine_dict in enumerate(conf):
         machine_attrs = ['m', 'I', 'O', 'eut', 'dur']
         if not all([x in machine_dict for x in machine_attrs]):
             # v2 style nodes
             continue
 
-        node_idx = machine_index_to_node_index[machine_index]
+        node_idx = index.machine_nodes[machine_index]
         nobj = G.nodes[node_idx]['object']
         if 'number' in machine_dict:
             # Pick the first item quantity and lock it
             # I could lock everything, but the others can be inferred directly from the first
             if len(nobj.I) > 0:
                 ingredient_name = list(nobj.I.keys())[0]
-                edge = (ingredient_name_to_node_index[ingredient_name], node_idx)
-                system_of_equations.append(edge_to_variable[edge] - machine_dict['number'])
+                edge = index.machineEdge(node_idx, 'I', ingredient_name)
             elif len(nobj.O) > 0:
                 ingredient_name = list(nobj.O.keys())[0]
-                edge = (node_idx, ingredient_name_to_node_index[ingredient_name])
-                system_of_equations.append(edge_to_variable[edge] - machine_dict['number'])
+                edge = index.machineEdge(node_idx, 'O', ingredient_name)
             else:
                 raise RuntimeError('Attempt to lock machine that has no inputs or outputs')
+            locks.append((edge, machine_dict['number']))
             print(f'added "number" locking equation for "{ingredient_name}" on {edge}')
 
         elif 'target' in machine_dict:
@@ -139,12 +104,21 @@ def addSympyUserChosenQuantityFromFlow1Yaml(
             target = machine_dict['target']
             for target_name, target_quantity in target.items():
                 direction, base_quantity = ingredient_lookup[target_name]
-                if direction == 'I':
-                    edge = (ingredient_name_to_node_index[target_name], node_idx)
-                elif direction == 'O':
-                    edge = (node_idx, ingredient_name_to_node_index[target_name])
-                system_of_equations.append(edge_to_variable[edge] - target_quantity)
+                edge = index.machineEdge(node_idx, direction, target_name)
+                locks.append((edge, target_quantity))
             
             print(f'added "target" locking equation for "{target_name}" on {edge}')
 
-    return system_of_equations
\ No newline at end of file
+    return locks
+
+
+def addSympyUserChosenQuantityFromFlow1Yaml(
+        G: MultiDiGraph,
+        edge_to_variable,
+        system_of_equations,
+        yaml_path: Union[str, Path]
+    ):
+    for edge, quantity in userChosenQuantitiesFromFlow1Yaml(G, yaml_path):
+        system_of_equations.append(edge_to_variable[edge] - quantity)
+
+    return system_of_equations
@@ -0,0 +1,54 @@
+import networkx as nx
+
+from src.data.basicTypes import ExternalNode, IngredientNode, MachineNode
+
+
+_CACHE_KEY = 'flow2.chart_index'
+
+
+class ChartIndex:
+    # Node lookups that locking, v2 options and the research loaders all
+    # need, built in one pass over a chart. Use ChartIndex.of(G): the index
+    # is cached on the graph and networkx drops it when the graph changes.
+
+    def __init__(self, G: nx.MultiDiGraph):
+        # Machine ordinal -> node index. Ordinals count MachineNodes in node
+        # order, which is the order of the machine entries in the flow1 YAML
+        # (ExternalNodes are MachineNodes too, but are always added last).
+        self.machine_nodes = []
+        # Ingredient name -> node index
+        self.ingredient_nodes = {}
+        # Node index -> 'machine' | 'ingredient' | 'external'
+        self.kind = {}
+        # Machine node index -> {('I' or 'O', ingredient name): (u, v)}
+        self.machine_edges = {}
+
+        for idx, nobj in G.nodes(data='object'):
+            if isinstance(nobj, MachineNode):
+                self.machine_nodes.append(idx)
+                self.kind[idx] = 'external' if isinstance(nobj, ExternalNode) else 'machine'
+                self.machine_edges[idx] = {}
+            elif isinstance(nobj, IngredientNode):
+                self.ingredient_nodes[nobj.name] = idx
+                self.kind[idx] = 'ingredient'
+
+        for name, idx in self.ingredient_nodes.items():
+            for u in G.pred[idx]:
+                if u in self.machine_edges:
+                    self.machine_edges[u][('O', name)] = (u, idx)
+            for v in G.succ[idx]:
+                if v in self.machine_edges:
+                    self.machine_edges[v][('I', name)] = (idx, v)
+
+    @classmethod
+    def of(cls, G: nx.MultiDiGraph) -> 'ChartIndex':
+        cache = G.__networkx_cache__
+        index = cache.get(_CACHE_KEY)
+        if index is None:
+            index = cache[_CACHE_KEY] = cls(G)
+        return index
+
+    def machineEdge(self, node_idx: int, direction: str, ingredient_name: str) -> tuple:
+        # The (u, v) edge carrying ingredient_name into ('I') or out of ('O')
+        # the machine; KeyError if the chart has no such edge (eg. water)
+        return self.machine_edges[node_idx][direction, ingredient_name]
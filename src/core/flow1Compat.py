@@ -41,6 +41,45 @@ def constructDisjointGraphFromFlow1Yaml(yaml_path: Union[str, Path], ) -> nx.Mul
     return G
 
 
+def constructConnectedGraphFromFlow1Conf(conf, ignored_ingredients=frozenset()) -> nx.MultiDiGraph:
+    # Single pass equivalent of constructDisjointGraphFromFlow1Yaml ->
+    # produceConnectedGraphFromDisjoint -> removeIgnorableIngredients (pass
+    # preProcessing.ignorable_ingredients to drop them). Node indices and edge
+    # order match that pipeline exactly: machines first, then one node per
+    # unique ingredient in order of first appearance (ignored ones still use
+    # up their index, as they did before being removed).
+    relevant_attrs = ['m', 'I', 'O', 'eut', 'dur']
+    machine_dicts = [x for x in conf if all(attr in x for attr in relevant_attrs)]
+
+    ingredient_idx = {}
+    node_id = len(machine_dicts)
+    for machine_dict in machine_dicts:
+        for direction in ['I', 'O']:
+            for ingredient_name in machine_dict[direction]:
+                if ingredient_name not in ingredient_idx:
+                    ingredient_idx[ingredient_name] = node_id
+                    node_id += 1
+
+    G = nx.MultiDiGraph()
+    for machine_node_id, machine_dict in enumerate(machine_dicts):
+        G.add_node(machine_node_id, object=MachineNode(*[machine_dict[x] for x in relevant_attrs]))
+    for ingredient_name, idx in ingredient_idx.items():
+        if ingredient_name not in ignored_ingredients:
+            G.add_node(idx, object=IngredientNode(ingredient_name, -1, '', -1))
+
+    for machine_node_id, machine_dict in enumerate(machine_dicts):
+        for direction in ['I', 'O']:
+            for ingredient_name in machine_dict[direction]:
+                if ingredient_name in ignored_ingredients:
+                    continue
+                if direction == 'I':
+                    G.add_edge(ingredient_idx[ingredient_name], machine_node_id, object=EdgeData(ingredient_name, -1))
+                elif direction == 'O':
+                    G.add_edge(machine_node_id, ingredient_idx[ingredient_name], object=EdgeData(ingredient_name, -1))
+
+    return G
+
+
 def getGroupsFromFlow1Yaml(yaml_path: Union[str, Path]) -> dict:
     conf = loadYamlFile(yaml_path)
 
@@ -5,8 +5,9 @@ import networkx as nx
 from networkx import MultiDiGraph
 from typing import Union
 
+from src.core.chartIndex import ChartIndex
 from src.core.sharedYamlLoad import loadYamlFile
-from src.data.basicTypes import EdgeData, IngredientNode, MachineNode
+from src.data.basicTypes import EdgeData, MachineNode
 
 
 def applyNoSource(
@@ -17,14 +18,14 @@ def applyNoSource(
         user_dict: dict,
     ): # outputs system of equations
 
+    ingredient_nodes = ChartIndex.of(G).ingredient_nodes
     for no_source_ingredient in user_dict['no_source']:
-        for idx, node in G.nodes.items():
-            nobj = node['object']
-            if isinstance(nobj, IngredientNode):
-                if nobj.name == no_source_ingredient and nobj.associated_slack_variable is not None:
-                    system_of_equations.append(
-                        nobj.associated_slack_variable # = 0
-                    )
+        if no_source_ingredient in ingredient_nodes:
+            nobj = G.nodes[ingredient_nodes[no_source_ingredient]]['object']
+            if nobj.associated_slack_variable is not None:
+                system_of_equations.append(
+                    nobj.associated_slack_variable # = 0
+                )
     
     return system_of_equations
 
@@ -37,13 +38,13 @@ def applyWhitelistedSlackVariables(
         user_dict: dict,
     ):
     # Set all slack variables other than user defined to 0
-    for idx, node in G.nodes.items():
-        nobj = node['object']
-        if isinstance(nobj, IngredientNode):
-            if nobj.associated_slack_variable is not None and nobj.name not in user_dict['whitelisted_slack_variables']:
-                system_of_equations.append(
-                    nobj.associated_slack_variable # = 0
-                )
+    whitelist = set(user_dict['whitelisted_slack_variables'])
+    for idx in ChartIndex.of(G).ingredient_nodes.values():
+        nobj = G.nodes[idx]['object']
+        if nobj.associated_slack_variable is not None and nobj.name not in whitelist:
+            system_of_equations.append(
+                nobj.associated_slack_variable # = 0
+            )
     
     return system_of_equations
 
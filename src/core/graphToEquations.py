@@ -1,11 +1,130 @@
+from dataclasses import dataclass, field
+
 import networkx as nx
 import sympy
-from pulp import LpProblem, LpMaximize, LpMinimize, LpVariable
+from pulp import (LpAffineExpression, LpConstraint, LpConstraintEQ, LpProblem,
+                  LpMaximize, LpMinimize, LpVariable)
 
 from src.data.basicTypes import EdgeData, ExternalNode, IngredientNode, MachineNode
 
 
-def constructPuLPFromGraph(G: nx.MultiDiGraph) -> LpProblem:
+EQUATION_FORMS = ('pairwise', 'star', 'extent')
+
+
+@dataclass
+class SparseEquations:
+    # Every row is sum(coeff * column) == 0, stored as {column: coeff} with the
+    # recipe numbers as written (int or float).
+    # 'pairwise' and 'star' have one column per edge (x0, x1, ... in the same
+    # order as the term-by-term builders); 'extent' has one column per machine
+    # (t{node idx}, crafts) plus one per ExternalNode edge.
+    columns: list
+    # (u, v) -> (column, multiplier): the edge's flow is multiplier * column
+    edge_to_column: dict
+    rows: list = field(default_factory=list)
+    # ('ratio', machine node idx) or ('balance', ingredient node idx) per row
+    row_tags: list = field(default_factory=list)
+    # column -> coefficient of the flow1 objective (see constructPuLPFromGraph)
+    objective: dict = field(default_factory=dict)
+
+
+def constructSparseEquationsFromGraph(G: nx.MultiDiGraph, form: str = 'star') -> SparseEquations:
+    # Same system as the term-by-term builders, with fewer rows:
+    #   'pairwise' |I|*|O| ratio rows per machine, x_in * O/I - x_out == 0
+    #   'star'     |I|+|O|-1 rows per machine, each edge against the first one:
+    #              x_e * qty_ref - x_ref * qty_e == 0 (no division)
+    #   'extent'   no ratio rows: every machine edge flow is qty * t_machine
+    # Like the originals, 'pairwise' and 'star' leave a machine whose inputs or
+    # outputs are all removed (eg. water) uncoupled; 'extent' always couples.
+    if form not in EQUATION_FORMS:
+        raise ValueError(f'unknown equation form {form!r}, expected one of {EQUATION_FORMS}')
+    eq = SparseEquations([], {})
+    edge_to_column = eq.edge_to_column
+
+    def addColumn(name):
+        eq.columns.append(name)
+        return len(eq.columns) - 1
+
+    # Per-craft quantity and ingredient of each machine edge, in edge order
+    machine_edges = {}
+    for idx, nobj in G.nodes(data='object'):
+        if not isinstance(nobj, MachineNode):
+            continue
+        edges = []
+        for u, v, eobj in G.in_edges(idx, data='object'):
+            edges.append(((u, v), nobj.I.get(eobj.name, 0), 'I'))
+        n_in = len(edges)
+        for u, v, eobj in G.out_edges(idx, data='object'):
+            edges.append(((u, v), nobj.O.get(eobj.name, 0), 'O'))
+        machine_edges[idx] = (edges, n_in)
+
+        if form == 'extent' and not isinstance(nobj, ExternalNode):
+            column = addColumn(f't{idx}')
+            for edge, qty, _ in edges:
+                edge_to_column[edge] = (column, qty)
+        else:
+            for edge, _, _ in edges:
+                edge_to_column[edge] = (addColumn(f'x{len(eq.columns)}'), 1)
+
+    if form != 'extent':
+        for idx, (edges, n_in) in machine_edges.items():
+            if n_in == 0 or n_in == len(edges):
+                continue
+            if form == 'pairwise':
+                for in_edge, in_qty, _ in edges[:n_in]:
+                    for out_edge, out_qty, _ in edges[n_in:]:
+                        eq.rows.append({edge_to_column[in_edge][0]: out_qty / in_qty,
+                                        edge_to_column[out_edge][0]: -1})
+                        eq.row_tags.append(('ratio', idx))
+            else:
+                ref_edge, ref_qty, _ = edges[0]
+                ref_column = edge_to_column[ref_edge][0]
+                for edge, qty, _ in edges[1:]:
+                    eq.rows.append({edge_to_column[edge][0]: ref_qty, ref_column: -qty})
+                    eq.row_tags.append(('ratio', idx))
+
+    objective = eq.objective
+    for idx, nobj in G.nodes(data='object'):
+        if not isinstance(nobj, IngredientNode):
+            continue
+        in_edges = list(G.in_edges(idx))
+        out_edges = list(G.out_edges(idx))
+        if len(in_edges) == 0 or len(out_edges) == 0:
+            continue
+
+        row = {}
+        for edge, sign in [(e, 1) for e in in_edges] + [(e, -1) for e in out_edges]:
+            column, multiplier = edge_to_column[edge]
+            row[column] = row.get(column, 0) + sign * multiplier
+        row = {column: coeff for column, coeff in row.items() if coeff != 0}
+        if row:
+            eq.rows.append(row)
+            eq.row_tags.append(('balance', idx))
+
+        # Objective weights as in constructPuLPFromGraph
+        external_in = [e for e in in_edges if isinstance(G.nodes[e[0]]['object'], ExternalNode)]
+        external_out = [e for e in out_edges if isinstance(G.nodes[e[1]]['object'], ExternalNode)]
+        source_coeff = 1e9 if len(external_in) < len(in_edges) else 1e3
+        sink_coeff = 1e9 if len(external_out) < len(out_edges) else 1e3
+        for edge, coeff in [(e, source_coeff) for e in external_in] + [(e, sink_coeff) for e in external_out]:
+            column, multiplier = edge_to_column[edge]
+            objective[column] = objective.get(column, 0) + coeff * multiplier
+
+    # Maximum flow term: every internal edge
+    for u, v in G.edges():
+        if not isinstance(G.nodes[u]['object'], ExternalNode) and not isinstance(G.nodes[v]['object'], ExternalNode):
+            column, multiplier = edge_to_column[u, v]
+            objective[column] = objective.get(column, 0) + multiplier
+
+    return eq
+
+
+def constructPuLPFromGraph(G: nx.MultiDiGraph, form: str = 'pairwise') -> LpProblem:
+    # form: see constructSparseEquationsFromGraph. 'pairwise' is the original
+    # flow1 system; with 'extent', edge_to_variable maps edges to expressions.
+    if form != 'pairwise':
+        return constructPuLPFromSparseEquations(constructSparseEquationsFromGraph(G, form))
+
     problem = LpProblem('GTNH_Flowchart', LpMinimize)
     objective_function = 0
 
@@ -27,8 +146,6 @@ def constructPuLPFromGraph(G: nx.MultiDiGraph) -> LpProblem:
             if len(in_edges) == 0 or len(out_edges) == 0:
                 continue
 
-            print(in_edges)
-
             for in_edge in in_edges:
                 for out_edge in out_edges:
                     # Look up relationship in Machine node
@@ -121,7 +238,42 @@ def constructPuLPFromGraph(G: nx.MultiDiGraph) -> LpProblem:
     return problem, edge_to_variable
 
 
-def constructSymPyFromGraph(G: nx.MultiDiGraph, construct_slack: bool=True):
+def constructPuLPFromSparseEquations(eq: SparseEquations):
+    problem = LpProblem('GTNH_Flowchart', LpMinimize)
+    variables = [LpVariable(name, lowBound=0, cat='Continuous') for name in eq.columns]
+
+    edge_to_variable = {}
+    for edge, (column, multiplier) in eq.edge_to_column.items():
+        if multiplier == 1:
+            edge_to_variable[edge] = variables[column]
+        else:
+            edge_to_variable[edge] = LpAffineExpression([(variables[column], multiplier)])
+
+    for row in eq.rows:
+        expression = LpAffineExpression([(variables[column], coeff) for column, coeff in row.items()])
+        problem.addConstraint(LpConstraint(expression, LpConstraintEQ, rhs=0))
+
+    if eq.objective:
+        problem += LpAffineExpression([(variables[column], coeff) for column, coeff in eq.objective.items()])
+
+    return problem, edge_to_variable
+
+
+def _sympyNumber(value):
+    # YAML floats are decimal literals; str() keeps them exact
+    if isinstance(value, float):
+        return sympy.Rational(str(value))
+    return sympy.Integer(value)
+
+
+def constructSymPyFromGraph(G: nx.MultiDiGraph, construct_slack: bool=True, form: str = 'pairwise'):
+    # form: 'pairwise' (original) or 'star'; see constructSparseEquationsFromGraph.
+    # 'extent' has no per-edge symbols, which sympy_solver indexes by name.
+    if form == 'extent':
+        raise ValueError("constructSymPyFromGraph needs one symbol per edge; use 'pairwise' or 'star'")
+    if form != 'pairwise':
+        return constructSymPyFromSparseEquations(G, constructSparseEquationsFromGraph(G, form), construct_slack)
+
     system_of_equations = []
     variable_index = 0
     edge_to_variable = {}
@@ -189,3 +341,24 @@ def constructSymPyFromGraph(G: nx.MultiDiGraph, construct_slack: bool=True):
             )
 
     return system_of_equations, edge_to_variable, ingredient_to_slack_variable
+
+
+def constructSymPyFromSparseEquations(G: nx.MultiDiGraph, eq: SparseEquations, construct_slack: bool=True):
+    symbols = [sympy.symbols(name, positive=True, real=True) for name in eq.columns]
+    edge_to_variable = {edge: symbols[column] for edge, (column, _) in eq.edge_to_column.items()}
+
+    system_of_equations = []
+    ingredient_to_slack_variable = {}
+    variable_index = len(symbols)
+    for row, (kind, idx) in zip(eq.rows, eq.row_tags):
+        equation = sympy.Add(*[_sympyNumber(coeff) * symbols[column] for column, coeff in row.items()])
+        if kind == 'balance' and construct_slack:
+            nobj = G.nodes[idx]['object']
+            slack_variable = sympy.symbols(f's{variable_index}', real=True)
+            ingredient_to_slack_variable[nobj.name] = slack_variable
+            nobj.associated_slack_variable = slack_variable
+            variable_index += 1
+            equation += slack_variable
+        system_of_equations.append(equation)
+
+    return system_of_equations, edge_to_variable, ingredient_to_slack_variable
@@ -3,6 +3,12 @@ import networkx as nx
 from src.data.basicTypes import EdgeData, ExternalNode, IngredientNode, MachineNode
 
 
+# Extremely common / ignorable resources, like water
+ignorable_ingredients = {
+    'water'
+}
+
+
 def addExternalNodes(G: nx.MultiDiGraph, excluded_sources=set()) -> nx.MultiDiGraph:
     # For each ingredient, add an external source and sink
     # (Mutates existing graph)
@@ -14,8 +20,6 @@ def addExternalNodes(G: nx.MultiDiGraph, excluded_sources=set()) -> nx.MultiDiGr
         if isinstance(nobj, IngredientNode):
             # All nodes need corresponding sink/source connections.
             # Whether they are used or not is governed by the solver and the objective function.
-            in_edges = G.in_edges(ingnode_idx)
-            out_edges = G.out_edges(ingnode_idx)
 
             # Source
             if nobj.name not in excluded_sources:
@@ -39,10 +43,6 @@ def removeIgnorableIngredients(G: nx.MultiDiGraph) -> nx.MultiDiGraph:
 
     # (Mutates existing graph)
 
-    ignorable_ingredients = {
-        'water'
-    }
-
     removal_nodes = []
     for ingnode_idx, node in G.nodes.items():
         nobj = node['object']
@@ -1,20 +1,92 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
 from pathlib import Path
 from typing import Union
 
 import yaml
 
+try:
+    from yaml import CSafeLoader as YamlLoader  # libyaml, ~10x faster
+except ImportError:
+    from yaml import SafeLoader as YamlLoader
 
-cached_yaml_loads = {}
 
+# Parsed files, least recently used first:
+# str path -> (mtime_ns, size, sha256 of the bytes, frozen conf)
+cached_yaml_loads = OrderedDict()
+MAX_CACHED_FILES = 32
+_cache_lock = threading.Lock()
 
-def loadYamlFile(yaml_path: Union[str, Path]) -> dict:
+
+class FrozenDict(dict):
+    # A dict that refuses mutation, so one cached parse can be handed to every
+    # caller. Still a dict for isinstance checks and json; thaw() for a copy.
+    def _readonly(self, *args, **kwargs):
+        raise TypeError('cached YAML is read-only; use thaw() for a mutable copy')
+
+    __setitem__ = __delitem__ = __ior__ = _readonly
+    clear = pop = popitem = setdefault = update = _readonly
+
+    def __reduce__(self):
+        return (FrozenDict, (dict(self),))
+
+
+class FrozenList(list):
+    # The list counterpart: callers still get a list (== a plain list, same
+    # isinstance answers as an uncached parse), just not a mutable one.
+    def _readonly(self, *args, **kwargs):
+        raise TypeError('cached YAML is read-only; use thaw() for a mutable copy')
+
+    __setitem__ = __delitem__ = __iadd__ = __imul__ = _readonly
+    append = extend = insert = pop = remove = clear = sort = reverse = _readonly
+
+    def __reduce__(self):
+        return (FrozenList, (list(self),))
+
+
+def freeze(obj):
+    if isinstance(obj, dict):
+        return FrozenDict((k, freeze(v)) for k, v in obj.items())
+    if isinstance(obj, list):
+        return FrozenList(freeze(v) for v in obj)
+    return obj
+
+
+def thaw(obj):
+    if isinstance(obj, dict):
+        return {k: thaw(v) for k, v in obj.items()}
+    if isinstance(obj, list):
+        return [thaw(v) for v in obj]
+    return obj
+
+
+def loadYamlFile(yaml_path: Union[str, Path]):
+    # Returns a frozen view (FrozenList, FrozenDict) shared by all callers.
+    # An unchanged (mtime, size) is trusted; otherwise the bytes are
+    # re-hashed, so a touched-but-identical file is not re-parsed while an
+    # edited one is.
     yaml_path_str = str(yaml_path)
+    stat = os.stat(yaml_path)
 
-    if yaml_path_str in cached_yaml_loads:
-        return cached_yaml_loads[yaml_path_str]
+    with _cache_lock:
+        entry = cached_yaml_loads.get(yaml_path_str)
+        if entry is not None and entry[:2] == (stat.st_mtime_ns, stat.st_size):
+            cached_yaml_loads.move_to_end(yaml_path_str)
+            return entry[3]
 
+    with open(yaml_path, 'rb') as f:
+        data = f.read()
+    digest = hashlib.sha256(data).hexdigest()
+    if entry is not None and entry[2] == digest:
+        conf = entry[3]
     else:
-        with open(yaml_path, 'r') as f:
-            conf = yaml.safe_load(f)
-        cached_yaml_loads[yaml_path_str] = conf
-        return conf
\ No newline at end of file
+        conf = freeze(yaml.load(data, Loader=YamlLoader))
+
+    with _cache_lock:
+        cached_yaml_loads[yaml_path_str] = (stat.st_mtime_ns, stat.st_size, digest, conf)
+        cached_yaml_loads.move_to_end(yaml_path_str)
+        while len(cached_yaml_loads) > MAX_CACHED_FILES:
+            cached_yaml_loads.popitem(last=False)
+    return conf
@@ -0,0 +1,176 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Union
+
+import highspy
+import numpy as np
+from pulp import LpConstraintGE, LpConstraintLE
+
+from src.core.addUserLocking import addPulpUserChosenQuantityFromFlow1Yaml
+from src.core.connectGraph import produceConnectedGraphFromDisjoint
+from src.core.flow1Compat import constructDisjointGraphFromFlow1Yaml
+from src.core.graphToEquations import constructPuLPFromGraph
+from src.core.preProcessing import addExternalNodes, removeIgnorableIngredients
+from src.data.basicTypes import ExternalNode, IngredientNode
+
+
+# Flow below this counts as unused
+USED_EPS = 1e-6
+
+
+class SourceExclusionEngine:
+    # pulp_solver's source-exclusion search on one model. The chart is loaded,
+    # built with every source and pinned once, then translated into a single
+    # HiGHS instance. Excluding a source sets its column's upper bound to 0
+    # (the same LP as removing the source node), and each re-solve starts
+    # from the previous basis instead of a fresh CBC run.
+
+    def __init__(self, yaml_path: Union[str, Path], form: str = 'star'):
+        self.yaml_path = yaml_path
+        self.form = form
+
+        G = constructDisjointGraphFromFlow1Yaml(yaml_path)
+        G = produceConnectedGraphFromDisjoint(G)
+        G = removeIgnorableIngredients(G) # eg water
+        G = addExternalNodes(G, set())
+        problem, edge_to_variable = constructPuLPFromGraph(G, form)
+        problem = addPulpUserChosenQuantityFromFlow1Yaml(G, edge_to_variable, problem, yaml_path)
+        self.G = G
+
+        variables = problem.variables()
+        column = {var.name: i for i, var in enumerate(variables)}
+
+        # Edge flows as (column, coeff) terms, for counting used edges
+        self.edge_terms = []
+        for edge, expression in edge_to_variable.items():
+            if hasattr(expression, 'items'):
+                self.edge_terms.append([(column[var.name], coeff) for var, coeff in expression.items()])
+            else:
+                self.edge_terms.append([(column[expression.name], 1)])
+
+        # Ingredient name -> its source columns, and the objective weight
+        # pulp_solver sorts candidates by (1e9 if also made internally)
+        self.source_columns = {}
+        self.source_coeff = {}
+        for idx, nobj in G.nodes(data='object'):
+            if not isinstance(nobj, IngredientNode):
+                continue
+            in_edges = list(G.in_edges(idx))
+            external = [e for e in in_edges if isinstance(G.nodes[e[0]]['object'], ExternalNode)]
+            self.source_columns[nobj.name] = [column[edge_to_variable[e].name] for e in external]
+            self.source_coeff[nobj.name] = 1e9 if len(external) < len(in_edges) else 1e3
+
+        self.h = highspy.Highs()
+        self.h.setOptionValue('output_flag', False)
+        inf = highspy.kHighsInf
+        costs = np.zeros(len(variables))
+        if problem.objective is not None:
+            for var, coeff in problem.objective.items():
+                costs[column[var.name]] += coeff
+        self.h.addCols(len(variables), costs, np.zeros(len(variables)),
+                       np.full(len(variables), inf), 0, [], [], [])
+        for constraint in problem.constraints.values():
+            rhs = -constraint.constant
+            lower = -inf if constraint.sense == LpConstraintLE else rhs
+            upper = inf if constraint.sense == LpConstraintGE else rhs
+            terms = list(constraint.items())
+            self.h.addRow(lower, upper, len(terms),
+                          np.array([column[var.name] for var, _ in terms], dtype=np.int32),
+                          np.array([coeff for _, coeff in terms], dtype=float))
+        self.excluded = frozenset()
+
+    def solve(self, excluded_sources=frozenset()):
+        # Column values with these sources excluded, or None if not optimal
+        excluded_sources = frozenset(excluded_sources)
+        for name in self.excluded ^ excluded_sources:
+            upper = 0 if name in excluded_sources else highspy.kHighsInf
+            for col in self.source_columns.get(name, ()):
+                self.h.changeColBounds(col, 0, upper)
+        self.excluded = excluded_sources
+
+        self.h.run()
+        if self.h.getModelStatus() != highspy.HighsModelStatus.kOptimal:
+            return None
+        return self.h.getSolution().col_value
+
+    def sourceUsage(self, values, source_name: str) -> float:
+        return sum(values[col] for col in self.source_columns.get(source_name, ()))
+
+    def usedVariables(self, values) -> int:
+        # Edges carrying flow; pulp_solver's count_used_variables
+        return sum(1 for terms in self.edge_terms
+                   if abs(sum(values[col] * coeff for col, coeff in terms)) >= USED_EPS)
+
+    def evaluate(self, excluded_sources):
+        # (feasible, used edge count) with these sources excluded
+        values = self.solve(excluded_sources)
+        if values is None:
+            return False, 0
+        return True, self.usedVariables(values)
+
+
+_worker_engine = None
+
+
+def _initWorker(yaml_path, form):
+    global _worker_engine
+    _worker_engine = SourceExclusionEngine(yaml_path, form)
+
+
+def _evaluateInWorker(excluded_sources):
+    return _worker_engine.evaluate(excluded_sources)
+
+
+def findExcludableSources(engine: SourceExclusionEngine, n_jobs: int = 1, verbose: bool = False):
+    # Greedily exclude sources, highest objective weight first, while the
+    # problem stays feasible and strictly more edges carry flow. Returns the
+    # excluded set, or None if the unexcluded problem has no solution.
+    #
+    # Every candidate of a round is tried against the same accepted set, and
+    # the round takes the first one (in order) that passes, so candidates can
+    # be evaluated n_jobs at a time without changing the result.
+    values = engine.solve()
+    if values is None:
+        return None
+    last_num_used_variables = engine.usedVariables(values)
+    source_names = sorted(engine.source_columns, key=lambda name: -engine.source_coeff[name])
+    excluded_sources = frozenset()
+
+    pool = None
+    if n_jobs > 1:
+        pool = ProcessPoolExecutor(n_jobs, mp_context=multiprocessing.get_context('forkserver'),
+                                   initializer=_initWorker, initargs=(engine.yaml_path, engine.form))
+    try:
+        while True:
+            values = engine.solve(excluded_sources)
+            # Only try removing sources that are currently in use
+            candidates = [name for name in source_names
+                          if engine.sourceUsage(values, name) >= USED_EPS]
+
+            accepted = None
+            for start in range(0, len(candidates), n_jobs if pool else 1):
+                chunk = candidates[start:start + (n_jobs if pool else 1)]
+                trials = [excluded_sources | {name} for name in chunk]
+                results = pool.map(_evaluateInWorker, trials) if pool else map(engine.evaluate, trials)
+                for source_name, (feasible, num_used_variables) in zip(chunk, results):
+                    if verbose:
+                        print(source_name, feasible, num_used_variables)
+                    if feasible and num_used_variables > last_num_used_variables:
+                        accepted = source_name
+                        last_num_used_variables = num_used_variables
+                        break
+                if accepted is not None:
+                    break
+
+            if accepted is None:
+                break
+            excluded_sources |= {accepted}
+            source_names.remove(accepted)
+            if verbose:
+                print(f'Excluded {accepted}.')
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    return set(excluded_sources)
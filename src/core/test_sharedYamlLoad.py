@@ -0,0 +1,41 @@
+import os
+import pickle
+
+import pytest
+
+from src.core.sharedYamlLoad import FrozenList, loadYamlFile, thaw
+
+
+def test_yaml_cache_shares_frozen_parse_and_sees_edits(tmp_path):
+    path = tmp_path / 'chart.yaml'
+    path.write_text('- {m: mixer, I: {a: 1}, O: {b: 2}, eut: 30, dur: 5}\n')
+    conf = loadYamlFile(path)
+    assert loadYamlFile(str(path)) is conf
+    with pytest.raises(TypeError):
+        conf[0]['I']['a'] = 5
+    mutable = thaw(conf)
+    mutable[0]['I']['a'] = 5
+    assert conf[0]['I']['a'] == 1
+
+    os.utime(path, ns=(0, 0))               # touched, same bytes: no re-parse
+    assert loadYamlFile(path) is conf
+    path.write_text('- {m: mixer, I: {a: 3}, O: {b: 2}, eut: 30, dur: 5}\n')
+    assert loadYamlFile(path)[0]['I'] == {'a': 3}
+
+
+def test_frozen_lists_stay_lists(tmp_path):
+    # Cached values keep the types of an uncached parse: only mutation fails.
+    path = tmp_path / 'options.yaml'
+    path.write_text('- {v2_node_options: {no_source: [a, b]}}\n')
+    conf = loadYamlFile(path)
+    no_source = conf[0]['v2_node_options']['no_source']
+    assert isinstance(conf, list) and isinstance(no_source, list)
+    assert no_source == ['a', 'b']
+    for mutate in (lambda: no_source.append('c'),
+                   lambda: no_source.__setitem__(0, 'c'),
+                   lambda: no_source.sort()):
+        with pytest.raises(TypeError):
+            mutate()
+    assert pickle.loads(pickle.dumps(conf)) == conf
+    assert type(thaw(conf)) is list
+    assert isinstance(pickle.loads(pickle.dumps(no_source)), FrozenList)
@@ -3,7 +3,7 @@ from dataclasses import dataclass
 from typing import Any, Optional
 
 
-@dataclass
+@dataclass(slots=True)
 class MachineNode:
     m: str
     I: dict
@@ -11,7 +11,7 @@ class MachineNode:
     eut: int
     dur: int
 
-@dataclass
+@dataclass(slots=True)
 class IngredientNode:
     name: str
     base_quant: int
@@ -21,10 +21,10 @@ class IngredientNode:
 
     associated_slack_variable: Any = None # FIXME: This is sympy symbol
 
-@dataclass
+@dataclass(slots=True)
 class EdgeData:
     name: str
     base_quant: int
 
 class ExternalNode(MachineNode):
-    pass
\ No newline at end of file
+    __slots__ = ()
\ No newline at end of file
@@ -1,4 +1,5 @@
 from collections import defaultdict
+from fractions import Fraction
 from math import copysign
 from pathlib import Path
 
@@ -6,11 +7,13 @@ import networkx as nx
 import numpy as np
 import sympy
 
-from src.core.addUserLocking import addSympyUserChosenQuantityFromFlow1Yaml
+from research.common.elimination import eliminate
+from research.common.provenance import to_frac
+from src.core.addUserLocking import userChosenQuantitiesFromFlow1Yaml
 from src.core.connectGraph import produceConnectedGraphFromDisjoint
 from src.core.flow1Compat import constructDisjointGraphFromFlow1Yaml, getGroupsFromFlow1Yaml
 from src.core.flow2Syntax import applyV2UserOptions
-from src.core.graphToEquations import constructSymPyFromGraph
+from src.core.graphToEquations import constructSparseEquationsFromGraph
 from src.core.postProcessing import pruneZeroEdges
 from src.core.preProcessing import addExternalNodes, removeIgnorableIngredients
 from src.data.basicTypes import ExternalNode, IngredientNode, MachineNode
@@ -21,6 +24,98 @@ def sympyVarToIndex(var):
     return int(var.name[1:])
 
 
+def sympyToFraction(number):
+    if isinstance(number, sympy.Rational):
+        return Fraction(int(number.p), int(number.q))
+    # Floats come from YAML decimals (locked quantities); keep the decimal
+    return to_frac(float(number))
+
+
+def sympyToSparseRows(system_of_equations, all_variables):
+    # Each equation is a linear expression that must equal 0. Returns rows as
+    # {column: Fraction} dicts (column = position in all_variables) and rhs.
+    column = {var: i for i, var in enumerate(all_variables)}
+    rows, rhs = [], []
+    for eq in system_of_equations:
+        row, constant = {}, Fraction(0)
+        for term, coeff in sympy.sympify(eq).as_coefficients_dict().items():
+            if term == 1:
+                constant += sympyToFraction(coeff)
+            elif term in column:
+                row[column[term]] = row.get(column[term], 0) + sympyToFraction(coeff)
+            else:
+                raise ValueError(f'{eq} is not linear in the system variables')
+        rows.append(row)
+        rhs.append(-constant)
+    return rows, rhs
+
+
+def sparseSystemFromGraph(G: nx.MultiDiGraph, yaml_path):
+    # The solver's system as sparse {column: Fraction} rows == rhs, built
+    # straight from the graph: star ratio rows (no division, so the recipe
+    # numbers stay exact), one slack column per balance row, the user's
+    # locked quantities and the v2 options' zeroed slacks. The sympy symbols
+    # only name the columns (x{i} per edge, then s{i} per slack).
+    eq = constructSparseEquationsFromGraph(G, 'star')
+    all_variables = [sympy.symbols(name, positive=True, real=True) for name in eq.columns]
+    edge_to_variable = {edge: all_variables[column] for edge, (column, _) in eq.edge_to_column.items()}
+    ingredient_to_slack_variable = {}
+    rows, rhs = [], []
+    for row, (kind, idx) in zip(eq.rows, eq.row_tags):
+        row = {column: to_frac(coeff) for column, coeff in row.items()}
+        if kind == 'balance':
+            nobj = G.nodes[idx]['object']
+            slack_variable = sympy.symbols(f's{len(all_variables)}', real=True)
+            ingredient_to_slack_variable[nobj.name] = slack_variable
+            nobj.associated_slack_variable = slack_variable
+            row[len(all_variables)] = Fraction(1)
+            all_variables.append(slack_variable)
+        rows.append(row)
+        rhs.append(Fraction(0))
+
+    for edge, quantity in userChosenQuantitiesFromFlow1Yaml(G, yaml_path):
+        column, multiplier = eq.edge_to_column[edge]
+        rows.append({column: to_frac(multiplier)})
+        rhs.append(to_frac(quantity))
+
+    # v2 options only ever pin slack variables to 0
+    column = {var: i for i, var in enumerate(all_variables)}
+    for slack_variable in applyV2UserOptions(G, edge_to_variable, [], yaml_path):
+        rows.append({column[slack_variable]: Fraction(1)})
+        rhs.append(Fraction(0))
+
+    return rows, rhs, all_variables, edge_to_variable, ingredient_to_slack_variable
+
+
+def sparseRowToString(row, rhs, all_variables):
+    terms = ' + '.join(f'{coeff}*{all_variables[column]}' for column, coeff in row.items())
+    return f'{terms} = {rhs}'
+
+
+def sparseLinsolve(rows, rhs, all_variables):
+    # sympy.linsolve's answer via sparse Fraction elimination: a tuple with one
+    # expression per variable, each a number or in terms of free variables
+    # (which stand for themselves). Instead of an empty set, returns
+    # (None, indices of conflicting rows) when the system has no solution.
+    echelon = eliminate(rows, rhs, len(all_variables))
+    if not echelon.consistent:
+        return None, echelon.conflict_rows
+    solution = []
+    for constant, free_terms in echelon.parametrization():
+        solution.append(sympy.Add(sympy.Rational(constant.numerator, constant.denominator),
+                                  *[sympy.Rational(coeff.numerator, coeff.denominator) * all_variables[f]
+                                    for f, coeff in free_terms.items()]))
+    return tuple(solution), []
+
+
+def exactLinsolve(system_of_equations, all_variables):
+    # sparseLinsolve for a system that is already sympy expressions (each
+    # equal to 0); conflicts come back as the equations themselves.
+    rows, rhs = sympyToSparseRows(system_of_equations, all_variables)
+    solution, conflict_rows = sparseLinsolve(rows, rhs, all_variables)
+    return solution, [system_of_equations[i] for i in conflict_rows]
+
+
 if __name__ == '__main__':
     # flow_projects_path = Path('~/Dropbox/OrderedSetCode/game-optimization/minecraft/flow/projects').expanduser()
     # yaml_path = flow_projects_path / 'power/oil/light_fuel_hydrogen_loop.yaml'
@@ -32,12 +127,8 @@ if __name__ == '__main__':
     for idx, node in G.nodes.items():
         print(idx, node)
 
-    # Construct SymPy representation of graph
-    system_of_equations, edge_to_variable, ingredient_to_slack_variable = constructSymPyFromGraph(G, construct_slack=True)
-    system_of_equations = addSympyUserChosenQuantityFromFlow1Yaml(G, edge_to_variable, system_of_equations, yaml_path)
-    all_variables = list(edge_to_variable.values()) + list(ingredient_to_slack_variable.values())
-
-    system_of_equations = applyV2UserOptions(G, edge_to_variable, system_of_equations, yaml_path)
+    # Sparse exact rows of the graph, locks and v2 options
+    rows, rhs, all_variables, edge_to_variable, ingredient_to_slack_variable = sparseSystemFromGraph(G, yaml_path)
 
     # Compute how over or underdetermined the system is
     # Can't just compare number of equations to number of variables because some equations are linear combinations of others
@@ -84,33 +175,29 @@ if __name__ == '__main__':
 
     print()
     print('=====PROBLEM=====')
-    for eq in system_of_equations:
-        print(f'{eq} = 0')
+    for row, b in zip(rows, rhs):
+        print(sparseRowToString(row, b, all_variables))
     print()
 
-    res = sympy.linsolve(system_of_equations, *all_variables)
-
-    if res == sympy.EmptySet:
-        # TODO: Try doing binary search over subproblems to find problematic equation
-        pass
+    solution, conflicting_rows = sparseLinsolve(rows, rhs, all_variables)
 
     print('=====SOLUTION=====')
     augmented_solution = None
-    if len(res) > 0:
-        for idx, eq in enumerate(res.args[0]):
+    if solution is not None:
+        for idx, eq in enumerate(solution):
             if idx < len(edge_to_variable):
                 print(f'x{idx} = {eq}')
             else:
                 print(f's{idx} = {eq}')
 
         # Add source/sink nodes based on slack variables
-        augmented_solution = list(res.args[0])
+        augmented_solution = list(solution)
         new_var_index = len(all_variables)
         for ingredient_node_idx, node in list(G.nodes.items()):
             nobj = node['object']
             if isinstance(nobj, IngredientNode):
                 if nobj.associated_slack_variable is not None:
-                    slack_value = res.args[0][sympyVarToIndex(nobj.associated_slack_variable)]
+                    slack_value = solution[sympyVarToIndex(nobj.associated_slack_variable)]
                     if isinstance(slack_value, sympy.core.numbers.Number) and slack_value != 0:
                         # Add source or sink node
                         if slack_value > 0:
@@ -128,7 +215,9 @@ if __name__ == '__main__':
                         augmented_solution.append(slack_value * sympy.core.numbers.Integer(copysign(1, slack_value)))
                         new_var_index += 1
     else:
-        print('No solution')
+        print('No solution. These equations cannot all hold:')
+        for i in conflicting_rows:
+            print(f'    {sparseRowToString(rows[i], rhs[i], all_variables)}')
 
     # Determine subgraphs based on groups
     # NOTE: Can only draw subgraphs around machine nodes, ingredient nodes are ambiguous